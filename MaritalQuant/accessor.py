@@ -0,0 +1,96 @@
+"""
+MaritalQuant pandas accessor.
+
+Importing this module registers `DataFrame.mq`, which runs the
+vectorised batch engine over whole columns, with no row-wise apply:
+
+  import accessor  # noqa: F401  (registers .mq)
+  df.mq.simulate(jurisdictions=["CN", "UK"])
+  df.mq.simulate(columns={"total_assets": "assets_rmb"},
+                 husband_has_fault=False)
+
+Each calculate_outcomes parameter is read from the column of the same
+name, from the column named in `columns`, or from a keyword constant.
+Results are added to the frame in place as cn_<field> / uk_<field>
+columns (descriptive fields as Categoricals), plus `gap` and
+`insight_flags` when both jurisdictions are simulated.
+"""
+
+import numpy as np
+import pandas as pd
+
+from batch import (
+    TEXT_CODES, as_columns, calculate_china_batch, calculate_uk_batch,
+    insight_flags_batch,
+)
+from engine import SCENARIO_FIELDS, ChinaResult, UKResult
+
+
+_CALCULATORS = {
+    "CN": ("cn", calculate_china_batch, ChinaResult),
+    "UK": ("uk", calculate_uk_batch, UKResult),
+}
+
+
+def _categorical(name, codes):
+    categories = [member.text for member in TEXT_CODES[name]]
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+@pd.api.extensions.register_dataframe_accessor("mq")
+class MaritalQuantAccessor:
+    def __init__(self, df):
+        self._df = df
+
+    def inputs(self, columns=None, **constants) -> dict:
+        """Resolve the seven engine inputs to NumPy columns."""
+        columns = columns or {}
+        unknown = (set(columns) | set(constants)) - set(SCENARIO_FIELDS)
+        if unknown:
+            raise TypeError(f"unknown parameters: {', '.join(sorted(unknown))}")
+        values, missing = [], []
+        for name in SCENARIO_FIELDS:
+            if name in constants:
+                values.append(constants[name])
+            elif columns.get(name, name) in self._df.columns:
+                values.append(self._df[columns.get(name, name)].to_numpy())
+            else:
+                missing.append(columns.get(name, name))
+        if missing:
+            raise KeyError(f"DataFrame has no column(s): {', '.join(missing)}")
+        inputs = as_columns(*values)
+        if len(inputs["total_assets"]) != len(self._df):
+            # All inputs were constants: broadcast to the frame length.
+            inputs = {name: np.broadcast_to(col, len(self._df))
+                      for name, col in inputs.items()}
+        return inputs
+
+    def simulate(self, jurisdictions=("CN", "UK"), columns=None,
+                 **constants) -> pd.DataFrame:
+        """Add outcome columns for each jurisdiction; returns the frame."""
+        jurisdictions = [j.upper() for j in jurisdictions]
+        unknown = [j for j in jurisdictions if j not in _CALCULATORS]
+        if unknown:
+            raise ValueError(f"unsupported jurisdictions: {unknown}; "
+                             f"choose from {sorted(_CALCULATORS)}")
+        inputs = self.inputs(columns, **constants)
+        args = tuple(inputs.values())
+        results = {}
+        new_columns = {}
+        for code in jurisdictions:
+            prefix, calculate, record_type = _CALCULATORS[code]
+            result = results[code] = calculate(*args)
+            for name in record_type._fields:
+                values = result[name]
+                if name in record_type._text_fields:
+                    values = _categorical(name, values)
+                new_columns[f"{prefix}_{name}"] = values
+        if "CN" in results and "UK" in results:
+            cn, uk = results["CN"], results["UK"]
+            new_columns["gap"] = uk["total"] - cn["total"]
+            new_columns["insight_flags"] = insight_flags_batch(
+                cn, uk, inputs["wife_is_homemaker"], inputs["has_children"],
+                inputs["marriage_years"])
+        for name, values in new_columns.items():
+            self._df[name] = values
+        return self._df
@@ -0,0 +1,494 @@
+"""
+MaritalQuant local HTTP API.
+
+A dependency-free asyncio HTTP/1.1 service that exposes the engine to
+other internal systems (CRM, intake forms) without the Streamlit UI.
+
+Endpoints (JSON in, JSON out):
+  GET  /healthz              liveness plus queue depth
+  POST /v1/outcomes          one scenario object -> {"cn", "uk", "gap",
+                             "insight_flags"[, "insights"]}
+  POST /v1/outcomes/bulk     {"scenarios": [...][, "format": "columns"]}
+                             -> {"results": [...]} (one object per
+                             scenario) or, with "format": "columns",
+                             {"results": {"cn": {field: [...]}, ...}}
+
+A scenario object carries the seven calculate_outcomes inputs by name
+(see engine.SCENARIO_FIELDS).  Add "insights": true to a single request
+to receive rendered Master Translator markdown as well as the flags.
+
+Concurrent single requests are coalesced into micro-batches (up to
+--max-batch scenarios or --max-wait-ms, whichever comes first) and
+evaluated on the backend backends.select_backend picks for the batch
+size (MARITALQUANT_BACKEND=table serves them from the lookup table).  Backpressure: at most
+--max-pending scenarios may be queued; beyond that the service answers
+503 with Retry-After instead of growing memory or latency unboundedly.
+Bulk requests above --max-bulk scenarios, or bodies larger than
+MAX_SCENARIO_BYTES per allowed scenario, are rejected with 413.  Bulk
+requests run on their own pool of --max-bulk-concurrent threads, one
+request per thread; while every slot is busy further bulk requests get
+503 with Retry-After rather than queueing.
+
+Scenarios are validated before they join a batch (finite amounts up to
+MAX_TOTAL_ASSETS, years in 0..100), so a bad request gets a 400 of its
+own.  If a batch still fails, its scenarios are re-evaluated one by one
+and only the failing request gets a JSON 500.
+
+Service targets (one process, one core, localhost, keep-alive clients):
+  single endpoint   p50 <= 5 ms, p99 <= 25 ms at 2,000 requests/s
+  bulk, rows        >= 25,000 scenarios/s end to end (JSON included)
+  bulk, columns     >= 40,000 scenarios/s end to end (JSON included)
+JSON encoding and decoding dominate the bulk path; the engine itself
+evaluates millions of scenarios per second.
+Load-test against these with `python api.py loadgen`.
+
+Usage (from the MaritalQuant directory):
+  python api.py serve --port 8765
+  python api.py loadgen --port 8765 --clients 64 --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from backends import calculate
+from batch import insight_flags_batch, to_dicts, to_python_columns
+from engine import SCENARIO_FIELDS, ChinaResult, UKResult, render_insights
+
+
+_BOOL_FIELDS = {"has_children", "wife_is_homemaker",
+                "home_in_husband_name", "husband_has_fault"}
+_INT_FIELDS = {"marriage_years", "homemaker_years"}
+MAX_TOTAL_ASSETS = 1e15
+# Request bodies may hold up to this many bytes per allowed bulk scenario.
+MAX_SCENARIO_BYTES = 512
+
+log = logging.getLogger("api")
+
+
+class ApiError(Exception):
+    """Error reported to the client with an HTTP status."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+# ===================================================
+# SCENARIO VALIDATION & SERIALISATION
+# ===================================================
+
+def parse_scenario(obj) -> tuple:
+    """Validate one scenario object; return the engine argument tuple."""
+    if not isinstance(obj, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "scenario must be an object")
+    missing = [name for name in SCENARIO_FIELDS if name not in obj]
+    if missing:
+        raise ApiError(HTTPStatus.BAD_REQUEST,
+                       f"missing fields: {', '.join(missing)}")
+    values = []
+    for name in SCENARIO_FIELDS:
+        value = obj[name]
+        if name in _BOOL_FIELDS:
+            if not isinstance(value, bool):
+                raise ApiError(HTTPStatus.BAD_REQUEST,
+                               f"{name} must be a boolean")
+        elif name in _INT_FIELDS:
+            if isinstance(value, bool) or not isinstance(value, int) \
+                    or not 0 <= value <= 100:
+                raise ApiError(HTTPStatus.BAD_REQUEST,
+                               f"{name} must be an integer in 0..100")
+        # The range check also rejects NaN, infinity and ints too large
+        # for a float (json.loads accepts all three).
+        elif isinstance(value, bool) or not isinstance(value, (int, float)) \
+                or not 0 <= value <= MAX_TOTAL_ASSETS:
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           f"{name} must be a finite number in "
+                           f"0..{MAX_TOTAL_ASSETS:g}")
+        values.append(value)
+    return tuple(values)
+
+
+def evaluate_columns(scenarios):
+    """Run argument tuples through the selected compute backend."""
+    columns = list(zip(*scenarios))
+    cn, uk = calculate(*columns)
+    flags = insight_flags_batch(cn, uk, columns[3], columns[2], columns[1])
+    return cn, uk, flags
+
+
+def evaluate(scenarios):
+    """Evaluate argument tuples; return one result dict per scenario."""
+    cn, uk, flags = evaluate_columns(scenarios)
+    gaps = (uk["total"] - cn["total"]).tolist()
+    return [
+        {"cn": cn_row, "uk": uk_row, "gap": gap, "insight_flags": flag}
+        for cn_row, uk_row, gap, flag in zip(
+            to_dicts(cn, ChinaResult), to_dicts(uk, UKResult),
+            gaps, flags.tolist())
+    ]
+
+
+def evaluate_each(scenarios):
+    """evaluate() one scenario at a time: a result or exception each."""
+    outcomes = []
+    for scenario in scenarios:
+        try:
+            outcomes.append(evaluate([scenario])[0])
+        except Exception as exc:  # noqa: BLE001 - returned to its caller
+            outcomes.append(exc)
+    return outcomes
+
+
+def evaluate_columnar(scenarios):
+    """Evaluate argument tuples; return column lists (the fast format)."""
+    cn, uk, flags = evaluate_columns(scenarios)
+    return {
+        "cn": to_python_columns(cn, ChinaResult),
+        "uk": to_python_columns(uk, UKResult),
+        "gap": (uk["total"] - cn["total"]).tolist(),
+        "insight_flags": flags.tolist(),
+    }
+
+
+# ===================================================
+# MICRO-BATCHER
+# ===================================================
+
+class MicroBatcher:
+    """Coalesce concurrent single-scenario calls into batch evaluations."""
+
+    def __init__(self, max_batch=1024, max_wait_ms=2.0, max_pending=8192):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_pending = max_pending
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._task = None
+        self.batches = 0
+        self.scenarios = 0
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, scenario):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((scenario, future))
+        except asyncio.QueueFull:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE,
+                           "server busy, retry shortly",
+                           {"Retry-After": "1"}) from None
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(
+                        self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            scenarios = [scenario for scenario, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, evaluate,
+                                                     scenarios)
+            except Exception:  # noqa: BLE001 - isolated below
+                # Retry one by one so only the failing requests fail.
+                log.warning("batch of %d failed; evaluating singly",
+                            len(batch), exc_info=True)
+                results = await loop.run_in_executor(None, evaluate_each,
+                                                     scenarios)
+            self.batches += 1
+            self.scenarios += len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+# ===================================================
+# HTTP SERVER
+# ===================================================
+
+class ApiServer:
+    def __init__(self, batcher, max_bulk=100_000, max_bulk_concurrent=2):
+        self.batcher = batcher
+        self.max_bulk = max_bulk
+        self.max_body = max(64 * 1024, max_bulk * MAX_SCENARIO_BYTES)
+        self._bulk_slots = asyncio.Semaphore(max_bulk_concurrent)
+        self._bulk_pool = ThreadPoolExecutor(max_bulk_concurrent,
+                                             thread_name_prefix="bulk")
+
+    def close(self):
+        self._bulk_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                try:
+                    status, payload = await self.dispatch(method, path, body)
+                    extra = {}
+                except ApiError as err:
+                    status, payload = err.status, {"error": err.message}
+                    extra = err.headers
+                except Exception:  # noqa: BLE001 - this request only
+                    log.exception("unhandled error serving %s %s",
+                                  method, path)
+                    status, payload = (HTTPStatus.INTERNAL_SERVER_ERROR,
+                                       {"error": "internal error"})
+                    extra = {}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, extra,
+                                     keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ApiError as err:
+            self._write_response(writer, err.status, {"error": err.message},
+                                 err.headers, keep_alive=False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as exc:
+            if exc.partial:
+                raise
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           "malformed request line") from None
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+        if length > self.max_body:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                           "request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    def _write_response(self, writer, status, payload, extra_headers,
+                        keep_alive):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        status = HTTPStatus(status)
+        head = [f"HTTP/1.1 {status.value} {status.phrase}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{name}: {value}" for name, value in extra_headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+    async def dispatch(self, method, path, body):
+        if path == "/healthz":
+            if method != "GET":
+                raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "use GET")
+            return HTTPStatus.OK, {"status": "ok",
+                                   "pending": self.batcher.pending,
+                                   "batches": self.batcher.batches,
+                                   "scenarios": self.batcher.scenarios}
+        if path not in ("/v1/outcomes", "/v1/outcomes/bulk"):
+            raise ApiError(HTTPStatus.NOT_FOUND, f"no route for {path}")
+        if method != "POST":
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "use POST")
+        if path == "/v1/outcomes":
+            data = self._json(body)
+            scenario = parse_scenario(data)
+            result = await self.batcher.submit(scenario)
+            if data.get("insights"):
+                result["insights"] = render_insights(
+                    result["insight_flags"], result["cn"], result["uk"],
+                    scenario[1])
+            return HTTPStatus.OK, result
+
+        # Checked before the body is parsed, so a saturated server sheds
+        # bulk load without spending the event loop on it.
+        if self._bulk_slots.locked():
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE,
+                           "bulk capacity busy, retry later",
+                           {"Retry-After": "1"})
+        async with self._bulk_slots:
+            return await self._bulk(self._json(body))
+
+    @staticmethod
+    def _json(body):
+        try:
+            return json.loads(body or b"null")
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "body is not valid JSON") \
+                from None
+
+    async def _bulk(self, data):
+        scenarios = data.get("scenarios") if isinstance(data, dict) else None
+        if not isinstance(scenarios, list):
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           "body must be {\"scenarios\": [...]}")
+        if len(scenarios) > self.max_bulk:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                           f"at most {self.max_bulk} scenarios per request")
+        columnar = data.get("format", "rows") == "columns"
+        if data.get("format", "rows") not in ("rows", "columns"):
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           "format must be \"rows\" or \"columns\"")
+        if not scenarios:
+            return HTTPStatus.OK, {"results": []}
+        parsed = [parse_scenario(obj) for obj in scenarios]
+        # Bulk requests are already batches; evaluate off the event loop.
+        run = evaluate_columnar if columnar else evaluate
+        results = await asyncio.get_running_loop().run_in_executor(
+            self._bulk_pool, run, parsed)
+        return HTTPStatus.OK, {"results": results}
+
+
+async def serve(host, port, max_batch, max_wait_ms, max_pending, max_bulk,
+                max_bulk_concurrent=2):
+    batcher = MicroBatcher(max_batch, max_wait_ms, max_pending)
+    batcher.start()
+    api = ApiServer(batcher, max_bulk, max_bulk_concurrent)
+    server = await asyncio.start_server(api.handle_connection, host, port)
+    print(f"MaritalQuant API listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+        api.close()
+
+
+# ===================================================
+# LOAD GENERATOR
+# ===================================================
+
+_SAMPLE_SCENARIO = {
+    "total_assets": 5_000_000, "marriage_years": 12, "has_children": True,
+    "wife_is_homemaker": True, "homemaker_years": 8,
+    "home_in_husband_name": True, "husband_has_fault": False,
+}
+
+
+async def loadgen(host, port, clients, requests):
+    """Closed-loop keep-alive clients hammering /v1/outcomes."""
+    body = json.dumps(_SAMPLE_SCENARIO).encode("utf-8")
+    request = (f"POST /v1/outcomes HTTP/1.1\r\nHost: {host}\r\n"
+               f"Content-Type: application/json\r\n"
+               f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+    latencies = []
+    statuses = {}
+    per_client = max(1, requests // clients)
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for _ in range(per_client):
+                started = time.perf_counter()
+                writer.write(request)
+                head = await reader.readuntil(b"\r\n\r\n")
+                status = int(head.split(b" ", 2)[1])
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    print(f"{len(latencies)} requests in {wall:.2f}s "
+          f"({len(latencies) / wall:,.0f} req/s), statuses {statuses}")
+    print(f"latency ms: p50 {statistics.median(latencies) * 1e3:.2f}  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e3:.2f}  "
+          f"max {latencies[-1] * 1e3:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_p = sub.add_parser("serve", help="run the API server")
+    serve_p.add_argument("--host", default="127.0.0.1")
+    serve_p.add_argument("--port", type=int, default=8765)
+    serve_p.add_argument("--max-batch", type=int, default=1024)
+    serve_p.add_argument("--max-wait-ms", type=float, default=2.0)
+    serve_p.add_argument("--max-pending", type=int, default=8192)
+    serve_p.add_argument("--max-bulk", type=int, default=100_000)
+    serve_p.add_argument("--max-bulk-concurrent", type=int, default=2,
+                         help="bulk requests evaluated at once")
+
+    load_p = sub.add_parser("loadgen", help="load-test a running server")
+    load_p.add_argument("--host", default="127.0.0.1")
+    load_p.add_argument("--port", type=int, default=8765)
+    load_p.add_argument("--clients", type=int, default=64)
+    load_p.add_argument("--requests", type=int, default=20_000)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "serve":
+            asyncio.run(serve(args.host, args.port, args.max_batch,
+                              args.max_wait_ms, args.max_pending,
+                              args.max_bulk, args.max_bulk_concurrent))
+        else:
+            asyncio.run(loadgen(args.host, args.port, args.clients,
+                                args.requests))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
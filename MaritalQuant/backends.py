@@ -0,0 +1,289 @@
+"""
+MaritalQuant compute backends.
+
+Interchangeable implementations of calculate_outcomes over columns,
+all returning the batch engine's (cn_columns, uk_columns):
+
+  python  the scalar calculate_china / calculate_uk, row by row
+  numpy   batch.outcome_columns (vectorised)
+  numba   a single fused JIT-compiled loop; only if numba is installed
+  table   lookup.OutcomeTable row lookups (explicit selection only;
+          scenarios off the table's grid fall back to numpy)
+
+calculate(...) picks one automatically from the batch size and what is
+installed; pass backend="..." or set MARITALQUANT_BACKEND to override.
+calculate_one(...) does the same for a single scenario and returns
+records.  The API's micro-batcher and the dashboard's dataflow graph
+evaluate through these, so one setting switches every caller.
+
+`python backends.py check` runs a differential check that every
+available backend agrees with the scalar engine to the cent;
+tests/test_backends.py runs the same comparison under pytest on a
+seeded grid and on the rules' edge cases.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from batch import (
+    as_columns, china_record, outcome_columns, uk_record,
+)
+from engine import (
+    UK_NEEDS_THRESHOLD, ChinaResult, Driver, Housing, Mingling, NeedsBasis,
+    UKResult, calculate_china, calculate_outcomes, calculate_uk, uk_homemaker_rate,
+)
+from lookup import get_table
+
+try:
+    import numba
+except ImportError:  # optional accelerator
+    numba = None
+
+
+# Below this many rows NumPy's per-call overhead outweighs vectorising.
+PYTHON_MAX_ROWS = 32
+# Above this many rows the JIT's fused loop beats NumPy's temporaries.
+NUMBA_MIN_ROWS = 50_000
+ENV_VAR = "MARITALQUANT_BACKEND"
+
+
+# ===================================================
+# BACKENDS
+# ===================================================
+
+def _python_backend(inputs):
+    rows = list(zip(*(col.tolist() for col in inputs.values())))
+    cn_rows = [calculate_china(*row) for row in rows]
+    uk_rows = [calculate_uk(*row[:5]) for row in rows]
+
+    def columns(records, record_type):
+        out = {}
+        for i, name in enumerate(record_type._fields):
+            dtype = np.int8 if name in record_type._text_fields else np.float64
+            out[name] = np.fromiter((r[i] for r in records), dtype=dtype,
+                                    count=len(records))
+        return out
+    return columns(cn_rows, ChinaResult), columns(uk_rows, UKResult)
+
+
+def _numpy_backend(inputs):
+    return outcome_columns(inputs)
+
+
+def _make_numba_kernel():
+    housing_loses = int(Housing.WIFE_LOSES_HOME)
+    housing_standard = int(Housing.STANDARD)
+    housing_keeps = int(Housing.WIFE_KEEPS_HOME)
+    housing_equitable = int(Housing.EQUITABLE)
+    driver_needs = int(Driver.NEEDS)
+    driver_comp = int(Driver.COMPENSATION)
+    all_matrimonial = int(Mingling.ALL_MATRIMONIAL)
+    ring_fenced = int(Mingling.RING_FENCED)
+    needs_override = int(NeedsBasis.NEEDS_OVERRIDE)
+    sharing = int(NeedsBasis.SHARING)
+    needs_threshold = float(UK_NEEDS_THRESHOLD)
+
+    @numba.njit(cache=True, nogil=True)
+    def kernel(assets, years, children, homemaker, hm_years, home, fault,
+               uk_rate, cn_out, cn_housing, uk_out, uk_codes):
+        # Same operation order as engine.calculate_china/calculate_uk.
+        for i in range(assets.shape[0]):
+            pool = assets[i]
+            base = pool * 0.50
+            discount = base * 0.20 if home[i] else 0.0
+            effective = base - discount
+            comp = hm_years[i] * 5_000.0 \
+                if homemaker[i] and hm_years[i] > 0 else 0.0
+            fault_adj = pool * 0.05 if fault[i] else 0.0
+            child_adj = pool * 0.03 if children[i] else 0.0
+            cn_out[0, i] = pool
+            cn_out[1, i] = base
+            cn_out[2, i] = discount
+            cn_out[3, i] = effective
+            cn_out[4, i] = comp
+            cn_out[5, i] = fault_adj
+            cn_out[6, i] = child_adj
+            cn_out[7, i] = effective + comp + fault_adj + child_adj
+            cn_housing[i] = housing_loses if home[i] else housing_standard
+
+            if children[i] and pool < needs_threshold:
+                needs = pool * 0.60
+                uk_codes[2, i] = needs_override
+            else:
+                needs = base
+                uk_codes[2, i] = sharing
+            uk_comp = hm_years[i] * uk_rate \
+                if homemaker[i] and hm_years[i] > 0 else 0.0
+            hm_outcome = base + uk_comp
+            total = needs if needs >= hm_outcome else hm_outcome
+            uk_out[0, i] = pool
+            uk_out[1, i] = base
+            uk_out[2, i] = needs
+            uk_out[3, i] = uk_comp
+            uk_out[4, i] = hm_outcome
+            uk_out[5, i] = total if total <= pool else pool
+            uk_codes[0, i] = driver_needs if needs >= hm_outcome \
+                else driver_comp
+            uk_codes[1, i] = all_matrimonial if years[i] > 10 \
+                else ring_fenced
+            uk_codes[3, i] = housing_keeps if children[i] \
+                else housing_equitable
+    return kernel
+
+
+_numba_kernel = None
+
+
+def _numba_backend(inputs):
+    global _numba_kernel
+    if _numba_kernel is None:
+        _numba_kernel = _make_numba_kernel()
+    size = len(inputs["total_assets"])
+    cn_out = np.empty((8, size))
+    cn_housing = np.empty(size, np.int8)
+    uk_out = np.empty((6, size))
+    uk_codes = np.empty((4, size), np.int8)
+    _numba_kernel(*(np.ascontiguousarray(col) for col in inputs.values()),
+                  uk_homemaker_rate(), cn_out, cn_housing, uk_out, uk_codes)
+    cn = dict(zip(ChinaResult._fields[:8], cn_out))
+    cn["housing"] = cn_housing
+    uk = dict(zip(UKResult._fields[:6], uk_out))
+    uk.update(zip(UKResult._fields[6:], uk_codes))
+    return cn, uk
+
+
+def _table_backend(inputs):
+    return get_table().outcomes(*inputs.values())
+
+
+BACKENDS = {
+    "python": _python_backend,
+    "numpy": _numpy_backend,
+    "table": _table_backend,
+}
+if numba is not None:
+    BACKENDS["numba"] = _numba_backend
+
+
+# ===================================================
+# SELECTION
+# ===================================================
+
+def available_backends():
+    return tuple(BACKENDS)
+
+
+def select_backend(size, backend=None) -> str:
+    """Backend name for a batch of `size` rows.
+
+    An explicit `backend` wins, then the MARITALQUANT_BACKEND
+    environment variable, then the size-based default.
+    """
+    name = backend or os.environ.get(ENV_VAR)
+    if name:
+        if name not in BACKENDS:
+            raise ValueError(f"backend {name!r} is not available; "
+                             f"choose from {available_backends()}")
+        return name
+    if size <= PYTHON_MAX_ROWS:
+        return "python"
+    if size >= NUMBA_MIN_ROWS and "numba" in BACKENDS:
+        return "numba"
+    return "numpy"
+
+
+def calculate(total_assets, marriage_years, has_children,
+              wife_is_homemaker, homemaker_years,
+              home_in_husband_name, husband_has_fault, backend=None):
+    """calculate_outcomes over columns on the selected backend."""
+    inputs = as_columns(total_assets, marriage_years, has_children,
+                        wife_is_homemaker, homemaker_years,
+                        home_in_husband_name, husband_has_fault)
+    name = select_backend(len(inputs["total_assets"]), backend)
+    return BACKENDS[name](inputs)
+
+
+def calculate_one(total_assets, marriage_years, has_children,
+                  wife_is_homemaker, homemaker_years,
+                  home_in_husband_name, husband_has_fault, backend=None):
+    """(ChinaResult, UKResult) for one scenario on the selected backend."""
+    args = (total_assets, marriage_years, has_children, wife_is_homemaker,
+            homemaker_years, home_in_husband_name, husband_has_fault)
+    name = select_backend(1, backend)
+    if name == "python":
+        return calculate_outcomes(*args)
+    cn, uk = BACKENDS[name](as_columns(*args))
+    return china_record(cn, 0), uk_record(uk, 0)
+
+
+# ===================================================
+# DIFFERENTIAL CHECK
+# ===================================================
+
+def random_inputs(size, seed=0):
+    """Random scenario columns biased towards the rules' edge cases."""
+    rng = np.random.default_rng(seed)
+    assets = rng.integers(0, 1_001, size) * 100_000.0
+    edge = rng.random(size) < 0.2
+    assets[edge] = rng.choice([0.0, UK_NEEDS_THRESHOLD - 0.01,
+                               UK_NEEDS_THRESHOLD, UK_NEEDS_THRESHOLD + 0.01,
+                               1e12], edge.sum())
+    years = rng.integers(0, 51, size)
+    years[rng.random(size) < 0.1] = 10
+    homemaker = rng.random(size) < 0.5
+    return (assets, years, rng.random(size) < 0.6, homemaker,
+            rng.integers(0, 51, size), rng.random(size) < 0.5,
+            rng.random(size) < 0.3)
+
+
+def compare_columns(expected, actual, tolerance=0.005):
+    """Names of columns that differ by more than `tolerance` (or code)."""
+    bad = []
+    for name, values in expected.items():
+        other = actual[name]
+        if values.dtype.kind == "f":
+            if not np.all(np.abs(values - other) <= tolerance):
+                bad.append(name)
+        elif not np.array_equal(values, other):
+            bad.append(name)
+    return bad
+
+
+def check_backends(size=200_000, seed=0, tolerance=0.005):
+    """Run every backend on the same inputs; return {backend: mismatches}."""
+    inputs = as_columns(*random_inputs(size, seed))
+    reference = _python_backend(inputs)
+    report = {}
+    for name, run in BACKENDS.items():
+        started = time.perf_counter()
+        cn, uk = run(inputs)
+        elapsed = time.perf_counter() - started
+        mismatches = ([f"cn.{n}" for n in compare_columns(reference[0], cn,
+                                                          tolerance)]
+                      + [f"uk.{n}" for n in compare_columns(reference[1], uk,
+                                                            tolerance)])
+        report[name] = mismatches
+        status = "OK" if not mismatches else "MISMATCH " + ", ".join(mismatches)
+        print(f"{name:<8} {elapsed * 1e3:>9.1f} ms  {status}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    check_p = sub.add_parser("check", help="differential check of backends")
+    check_p.add_argument("--size", type=int, default=200_000)
+    check_p.add_argument("--seed", type=int, default=0)
+    check_p.add_argument("--tolerance", type=float, default=0.005,
+                         help="maximum absolute difference (default: half a cent)")
+    args = parser.parse_args(argv)
+    report = check_backends(args.size, args.seed, args.tolerance)
+    return 1 if any(report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
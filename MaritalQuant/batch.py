@@ -0,0 +1,302 @@
+"""
+MaritalQuant vectorised batch engine.
+
+NumPy column versions of calculate_china, calculate_uk and the Master
+Translator's insight flags.  Every function takes the seven scenario
+inputs as scalars or equal-length arrays (broadcast together) and
+returns a dict of columns named after the ChinaResult / UKResult
+fields.  Amounts are float64; descriptive fields are int8 TextCode
+values and insight flags are a single Insight bitmask column.
+
+Arithmetic is performed in the same order as the scalar engine so the
+two agree exactly, not just to rounding.
+
+Callers that already hold as_columns output (backends, jurisdictions,
+streaming) use china_columns / uk_columns / outcome_columns, which skip
+the normalisation the public *_batch functions do.
+"""
+
+from collections import namedtuple
+from collections.abc import Mapping
+from itertools import islice
+from operator import itemgetter
+
+import numpy as np
+
+from engine import (
+    SCENARIO_FIELDS, YEARS_ERROR, ChinaResult, Driver, Housing, Insight,
+    UK_NEEDS_THRESHOLD, Mingling, NeedsBasis, UKResult, compensation_note,
+    uk_homemaker_rate,
+)
+
+
+def _whole_years(values) -> np.ndarray:
+    """int64 years; ValueError for fractional or non-finite values."""
+    values = np.asarray(values)
+    if values.dtype.kind == "f" and not np.all(
+            np.isfinite(values) & (np.floor(values) == values)):
+        raise ValueError(YEARS_ERROR)
+    return values.astype(np.int64, copy=False)
+
+
+def as_columns(total_assets, marriage_years, has_children,
+               wife_is_homemaker, homemaker_years,
+               home_in_husband_name, husband_has_fault) -> dict:
+    """Broadcast the scenario inputs to typed 1-D columns.
+
+    Years must be whole, as in the scalar engine: 7.5 raises ValueError
+    rather than being truncated.
+    """
+    arrays = np.broadcast_arrays(
+        np.asarray(total_assets, dtype=np.float64),
+        _whole_years(marriage_years),
+        np.asarray(has_children, dtype=bool),
+        np.asarray(wife_is_homemaker, dtype=bool),
+        _whole_years(homemaker_years),
+        np.asarray(home_in_husband_name, dtype=bool),
+        np.asarray(husband_has_fault, dtype=bool),
+    )
+    return {name: np.atleast_1d(arr)
+            for name, arr in zip(SCENARIO_FIELDS, arrays)}
+
+
+def china_columns(s) -> dict:
+    """calculate_china_batch over prepared as_columns() output."""
+    pool = s["total_assets"]
+    base_share = pool * 0.50
+    liquidity_discount = np.where(s["home_in_husband_name"],
+                                  base_share * 0.20, 0.0)
+    effective_share = base_share - liquidity_discount
+    compensation = np.where(
+        s["wife_is_homemaker"] & (s["homemaker_years"] > 0),
+        s["homemaker_years"] * 5_000.0, 0.0)
+    fault_adjustment = np.where(s["husband_has_fault"], pool * 0.05, 0.0)
+    children_adjustment = np.where(s["has_children"], pool * 0.03, 0.0)
+    total = effective_share + compensation + fault_adjustment + children_adjustment
+    housing = np.where(s["home_in_husband_name"],
+                       np.int8(Housing.WIFE_LOSES_HOME),
+                       np.int8(Housing.STANDARD))
+    return {
+        "pool": pool,
+        "base_share": base_share,
+        "liquidity_discount": liquidity_discount,
+        "effective_share": effective_share,
+        "compensation": compensation,
+        "fault_adjustment": fault_adjustment,
+        "children_adjustment": children_adjustment,
+        "total": total,
+        "housing": housing,
+    }
+
+
+def uk_columns(s) -> dict:
+    """calculate_uk_batch over prepared as_columns() output.
+
+    Only the first five inputs are read.
+    """
+    assets = s["total_assets"]
+    sharing_base = assets * 0.50
+    mingling = np.where(s["marriage_years"] > 10,
+                        np.int8(Mingling.ALL_MATRIMONIAL),
+                        np.int8(Mingling.RING_FENCED))
+    needs_override = s["has_children"] & (assets < UK_NEEDS_THRESHOLD)
+    needs_outcome = np.where(needs_override, assets * 0.60, sharing_base)
+    needs_basis = np.where(needs_override,
+                           np.int8(NeedsBasis.NEEDS_OVERRIDE),
+                           np.int8(NeedsBasis.SHARING))
+    compensation = np.where(
+        s["wife_is_homemaker"] & (s["homemaker_years"] > 0),
+        s["homemaker_years"] * uk_homemaker_rate(), 0.0)
+    homemaker_outcome = sharing_base + compensation
+    total = np.minimum(np.maximum(needs_outcome, homemaker_outcome), assets)
+    driver = np.where(needs_outcome >= homemaker_outcome,
+                      np.int8(Driver.NEEDS), np.int8(Driver.COMPENSATION))
+    housing = np.where(s["has_children"], np.int8(Housing.WIFE_KEEPS_HOME),
+                       np.int8(Housing.EQUITABLE))
+    return {
+        "pool": assets,
+        "sharing_base": sharing_base,
+        "needs_outcome": needs_outcome,
+        "compensation": compensation,
+        "homemaker_outcome": homemaker_outcome,
+        "total": total,
+        "driver": driver,
+        "mingling_note": mingling,
+        "needs_note": needs_basis,
+        "housing": housing,
+    }
+
+
+def outcome_columns(s):
+    """(cn_columns, uk_columns) over prepared as_columns() output."""
+    return china_columns(s), uk_columns(s)
+
+
+def calculate_china_batch(total_assets, marriage_years, has_children,
+                          wife_is_homemaker, homemaker_years,
+                          home_in_husband_name, husband_has_fault) -> dict:
+    return china_columns(as_columns(
+        total_assets, marriage_years, has_children, wife_is_homemaker,
+        homemaker_years, home_in_husband_name, husband_has_fault))
+
+
+def calculate_uk_batch(total_assets, marriage_years, has_children,
+                       wife_is_homemaker, homemaker_years,
+                       home_in_husband_name=False,
+                       husband_has_fault=False) -> dict:
+    return uk_columns(as_columns(
+        total_assets, marriage_years, has_children, wife_is_homemaker,
+        homemaker_years, home_in_husband_name, husband_has_fault))
+
+
+def calculate_outcomes_batch(total_assets, marriage_years, has_children,
+                             wife_is_homemaker, homemaker_years,
+                             home_in_husband_name, husband_has_fault):
+    """Vectorised calculate_outcomes: returns (cn_columns, uk_columns)."""
+    return outcome_columns(as_columns(
+        total_assets, marriage_years, has_children, wife_is_homemaker,
+        homemaker_years, home_in_husband_name, husband_has_fault))
+
+
+def insight_flags_batch(cn, uk, wife_is_homemaker, has_children,
+                        marriage_years) -> np.ndarray:
+    """Insight bitmask per scenario as one uint8 column."""
+    flags = np.where(uk["total"] - cn["total"] > 100_000,
+                     np.uint8(Insight.CN_COMPENSATION_GAP), np.uint8(0))
+    flags |= np.where(np.asarray(wife_is_homemaker, dtype=bool),
+                      np.uint8(Insight.UK_NON_FINANCIAL), np.uint8(0))
+    flags |= np.where(np.asarray(has_children, dtype=bool),
+                      np.uint8(Insight.CHILDREN_WELFARE), np.uint8(0))
+    flags |= np.where(np.asarray(marriage_years) > 10,
+                      np.uint8(Insight.LONG_MARRIAGE), np.uint8(0))
+    flags |= np.where(cn["fault_adjustment"] > 0,
+                      np.uint8(Insight.FAULT), np.uint8(0))
+    return flags
+
+
+def record_at(columns, index, record_type):
+    """Materialise row `index` of a result column dict as a record."""
+    values = []
+    for name in record_type._fields:
+        value = columns[name][index]
+        if name in record_type._text_fields:
+            value = TEXT_CODES[name](int(value))
+        else:
+            value = float(value)
+        values.append(value)
+    return record_type(*values)
+
+
+def to_python_columns(columns, record_type) -> dict:
+    """Plain-list columns keyed and valued like record.to_dict().
+
+    Text codes become their display text and derived fields are filled
+    in, so `dict(zip(keys, row))` over the lists reproduces to_dict()
+    for every row without building intermediate records.
+    """
+    size = len(columns["total"])
+    out = {}
+    for key in record_type._keys:
+        if key in record_type._text_fields:
+            texts = [member.text for member in TEXT_CODES[key]]
+            out[key] = [texts[code] for code in columns[key].tolist()]
+        elif key in columns:
+            out[key] = columns[key].tolist()
+        elif key == "enforcement_rate":
+            out[key] = [record_type.enforcement_rate] * size
+        elif key == "comp_note":
+            out[key] = [compensation_note(value)
+                        for value in columns["compensation"].tolist()]
+        else:
+            raise KeyError(f"no column rule for derived field {key!r}")
+    return out
+
+
+def to_dicts(columns, record_type) -> list:
+    """One to_dict()-equivalent dict per row."""
+    lists = to_python_columns(columns, record_type)
+    keys = tuple(lists)
+    return [dict(zip(keys, row)) for row in zip(*lists.values())]
+
+
+def to_records(columns, record_type) -> list:
+    """One record per row, built from whole-column list conversions."""
+    lists = []
+    for name in record_type._fields:
+        values = columns[name].tolist()
+        if name in record_type._text_fields:
+            members = list(TEXT_CODES[name])
+            values = [members[code] for code in values]
+        lists.append(values)
+    return list(map(record_type._make, zip(*lists)))
+
+
+def china_record(cn, index) -> ChinaResult:
+    return record_at(cn, index, ChinaResult)
+
+
+def uk_record(uk, index) -> UKResult:
+    return record_at(uk, index, UKResult)
+
+
+TEXT_CODES = {
+    "housing": Housing,
+    "driver": Driver,
+    "mingling_note": Mingling,
+    "needs_note": NeedsBasis,
+}
+
+
+# ===================================================
+# STREAMING
+# ===================================================
+# Any iterable of scenarios (generator, DB cursor, file reader) is
+# consumed in fixed-size chunks, so memory stays bounded by chunk_size
+# however many rows flow through.
+
+DEFAULT_CHUNK_SIZE = 65_536
+
+OutcomeChunk = namedtuple("OutcomeChunk", "inputs cn uk flags")
+OutcomeChunk.__doc__ = (
+    "Column dicts for one chunk: inputs (as_columns), cn, uk, and the "
+    "insight flag column.")
+
+_scenario_from_mapping = itemgetter(*SCENARIO_FIELDS)
+
+
+def _scenario_tuple(scenario):
+    if isinstance(scenario, Mapping):
+        return _scenario_from_mapping(scenario)
+    return scenario
+
+
+def iter_outcome_chunks(scenarios, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield an OutcomeChunk per `chunk_size` scenarios from any iterable.
+
+    Scenarios are argument tuples in calculate_outcomes order or
+    mappings keyed by SCENARIO_FIELDS.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    iterator = iter(scenarios)
+    while True:
+        chunk = [_scenario_tuple(s) for s in islice(iterator, chunk_size)]
+        if not chunk:
+            return
+        inputs = as_columns(*zip(*chunk))
+        cn, uk = outcome_columns(inputs)
+        flags = insight_flags_batch(
+            cn, uk, inputs["wife_is_homemaker"], inputs["has_children"],
+            inputs["marriage_years"])
+        yield OutcomeChunk(inputs, cn, uk, flags)
+
+
+def iter_outcomes(scenarios, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Lazily yield (cn, uk) records, one pair per input scenario.
+
+    Equivalent to `(calculate_outcomes(*s) for s in scenarios)` but
+    evaluated chunk by chunk on the vectorised engine.
+    """
+    for chunk in iter_outcome_chunks(scenarios, chunk_size):
+        yield from zip(to_records(chunk.cn, ChinaResult),
+                       to_records(chunk.uk, UKResult))
@@ -0,0 +1,395 @@
+"""
+MaritalQuant benchmark suite.
+
+Times the calculation engine, the Master Translator, both chart
+builders, the knowledge-base helpers and module import cost, and
+stores the results as JSON so runs can be compared over time.
+
+Usage (from the MaritalQuant directory):
+  python bench.py run --out bench_results.json
+  python bench.py compare baseline.json bench_results.json --threshold 0.10
+
+`compare` exits with status 1 when any benchmark is slower than the
+baseline by more than the threshold, or is in the baseline but missing
+from the current run, so it can gate CI.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCHMARKS = {}
+SEED = 20250101
+BATCH_SIZES = (1_000, 100_000, 1_000_000)
+
+
+def benchmark(name, ops=1, self_timed=False):
+    """Register a benchmark factory; `ops` is the work done per call.
+
+    A self-timed benchmark's callable returns its own duration instead
+    of being timed by the runner (used for subprocess import timing).
+    """
+    def decorator(factory):
+        BENCHMARKS[name] = (factory, ops, self_timed)
+        return factory
+    return decorator
+
+
+def random_scenarios(count, seed=SEED):
+    """Deterministic list of calculate_outcomes argument tuples."""
+    rng = random.Random(seed)
+    scenarios = []
+    for _ in range(count):
+        marriage_years = rng.randint(0, 50)
+        wife_is_homemaker = rng.random() < 0.5
+        scenarios.append((
+            rng.randrange(0, 100_000_001, 100_000),
+            marriage_years,
+            rng.random() < 0.6,
+            wife_is_homemaker,
+            rng.randint(0, marriage_years) if wife_is_homemaker else 0,
+            rng.random() < 0.5,
+            rng.random() < 0.3,
+        ))
+    return scenarios
+
+
+# ===================================================
+# BENCHMARK DEFINITIONS
+# ===================================================
+
+@benchmark("engine.calculate_outcomes", ops=1_000)
+def bench_calculate_outcomes():
+    from engine import calculate_outcomes
+    scenarios = random_scenarios(1_000)
+
+    def run():
+        for args in scenarios:
+            calculate_outcomes(*args)
+    return run
+
+
+@benchmark("engine.get_legal_insight", ops=1_000)
+def bench_get_legal_insight():
+    from engine import calculate_outcomes, get_legal_insight
+    prepared = []
+    for args in random_scenarios(1_000):
+        cn, uk = calculate_outcomes(*args)
+        prepared.append((cn, uk, args[3], args[2], args[1]))
+
+    def run():
+        for cn, uk, homemaker, children, years in prepared:
+            get_legal_insight(cn, uk, homemaker, children, years)
+    return run
+
+
+def random_columns(count, seed=SEED):
+    """Deterministic NumPy input columns for the batch engine."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    marriage_years = rng.integers(0, 51, count)
+    homemaker = rng.random(count) < 0.5
+    return (
+        rng.integers(0, 1_001, count) * 100_000.0,
+        marriage_years,
+        rng.random(count) < 0.6,
+        homemaker,
+        np.where(homemaker, rng.integers(0, marriage_years + 1), 0),
+        rng.random(count) < 0.5,
+        rng.random(count) < 0.3,
+    )
+
+
+def _batch_benchmark(count):
+    def factory():
+        from batch import calculate_outcomes_batch, insight_flags_batch
+        cols = random_columns(count)
+
+        def run():
+            cn, uk = calculate_outcomes_batch(*cols)
+            insight_flags_batch(cn, uk, cols[3], cols[2], cols[1])
+        return run
+    return factory
+
+
+for _size in BATCH_SIZES:
+    benchmark(f"batch.calculate_outcomes_batch[{_size}]",
+              ops=_size)(_batch_benchmark(_size))
+
+
+def _backend_benchmark(name, count):
+    def factory():
+        from backends import calculate
+        cols = random_columns(count)
+        calculate(*(col[:100] for col in cols), backend=name)  # JIT warm-up
+
+        def run():
+            calculate(*cols, backend=name)
+        return run
+    return factory
+
+
+for _name in ("numpy", "numba"):
+    if _name == "numba" and importlib.util.find_spec("numba") is None:
+        continue
+    benchmark(f"backends.{_name}[1000000]",
+              ops=1_000_000)(_backend_benchmark(_name, 1_000_000))
+
+
+@benchmark("lookup.totals[1000000]", ops=1_000_000)
+def bench_lookup_totals():
+    from lookup import get_table
+    table = get_table()
+    cols = random_columns(1_000_000)
+
+    def run():
+        table.totals(*cols)
+    return run
+
+
+@benchmark("batch.iter_outcomes[100000]", ops=100_000)
+def bench_iter_outcomes():
+    from batch import iter_outcomes
+    scenarios = random_scenarios(1_000) * 100
+
+    def run():
+        for _ in iter_outcomes(scenarios, chunk_size=16_384):
+            pass
+    return run
+
+
+@benchmark("engine.render_insight.cold", ops=1_000)
+def bench_render_insight_cold():
+    from engine import calculate_outcomes, get_legal_insight, render_insight
+    prepared = []
+    for args in random_scenarios(1_000):
+        cn, uk = calculate_outcomes(*args)
+        prepared.append((cn, uk, args[3], args[2], args[1]))
+
+    def run():
+        render_insight.cache_clear()
+        for cn, uk, homemaker, children, years in prepared:
+            get_legal_insight(cn, uk, homemaker, children, years)
+    return run
+
+
+@benchmark("charts.build_comparison_chart", ops=10)
+def bench_comparison_chart():
+    from charts import build_comparison_chart
+    from jurisdictions import summaries
+    results = [summaries(*args) for args in random_scenarios(10)]
+
+    def run():
+        for outcomes in results:
+            build_comparison_chart(outcomes)
+    return run
+
+
+@benchmark("charts.build_breakdown_chart", ops=10)
+def bench_breakdown_chart():
+    from charts import build_breakdown_chart
+    from jurisdictions import summaries
+    results = [summaries(*args) for args in random_scenarios(10)]
+
+    def run():
+        for outcomes in results:
+            build_breakdown_chart(outcomes)
+    return run
+
+
+@benchmark("legal_data.search_by_tag", ops=100)
+def bench_search_by_tag():
+    from legal_data import search_by_tag
+    tags = ["Housework Compensation", "Clean Break", "Property Division",
+            "children's welfare", "no-such-tag"] * 20
+
+    def run():
+        for tag in tags:
+            search_by_tag(tag)
+    return run
+
+
+@benchmark("legal_data.get_case", ops=1_000)
+def bench_get_case():
+    from legal_data import get_case
+    keys = [("CN", "Xie_v_He"), ("UK", "White_v_White"),
+            ("UK", "Stack_v_Dowden"), ("UK", "missing"),
+            ("XX", "missing")] * 200
+
+    def run():
+        for jurisdiction, key in keys:
+            get_case(jurisdiction, key)
+    return run
+
+
+def _import_benchmark(module):
+    def factory():
+        code = ("import time; t = time.perf_counter(); "
+                f"import {module}; print(time.perf_counter() - t)")
+
+        def run():
+            out = subprocess.run(
+                [sys.executable, "-c", code], check=True,
+                capture_output=True, text=True, cwd=HERE,
+            )
+            return float(out.stdout.strip().splitlines()[-1])
+        return run
+    return factory
+
+
+for _module in ("legal_data", "engine", "batch", "charts"):
+    benchmark(f"import.{_module}", self_timed=True)(_import_benchmark(_module))
+
+
+# ===================================================
+# RUNNER
+# ===================================================
+
+def time_benchmark(factory, ops, self_timed, repeat, min_time):
+    """Return per-op timings (seconds) over `repeat` samples."""
+    run = factory()
+    run()  # warm-up: imports, caches, first-call allocation
+    if self_timed:
+        return [run() / ops for _ in range(repeat)]
+
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        samples.append((time.perf_counter() - start) / (loops * ops))
+    return samples
+
+
+def run_benchmarks(selected=None, repeat=5, min_time=0.2):
+    results = {}
+    for name, (factory, ops, self_timed) in BENCHMARKS.items():
+        if selected and not any(s in name for s in selected):
+            continue
+        samples = time_benchmark(factory, ops, self_timed, repeat, min_time)
+        results[name] = {
+            "ops": ops,
+            "best_s": min(samples),
+            "median_s": statistics.median(samples),
+            "samples_s": samples,
+        }
+        print(f"{name:<40} {min(samples) * 1e6:>12.3f} us/op "
+              f"(median {statistics.median(samples) * 1e6:.3f})")
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "commit": commit,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print a comparison table; return (regressed, missing) names.
+
+    `missing` lists baseline benchmarks the current run did not report;
+    benchmarks new in the current run are shown but never fail.
+    """
+    regressions, missing = [], []
+    base = baseline["results"]
+    cur = current["results"]
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name in sorted(set(base) | set(cur)):
+        if name not in cur:
+            print(f"{name:<40} MISSING from current")
+            missing.append(name)
+            continue
+        if name not in base:
+            print(f"{name:<40} new (not in baseline)")
+            continue
+        before = base[name]["best_s"]
+        after = cur[name]["best_s"]
+        change = after / before - 1 if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  improved"
+        print(f"{name:<40} {before * 1e6:>10.3f}us {after * 1e6:>10.3f}us "
+              f"{change:>+8.1%}{flag}")
+    return regressions, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="run benchmarks and write JSON")
+    run_p.add_argument("--out", default="bench_results.json")
+    run_p.add_argument("--repeat", type=int, default=5)
+    run_p.add_argument("--min-time", type=float, default=0.2,
+                       help="minimum seconds per timing sample")
+    run_p.add_argument("-k", dest="selected", action="append",
+                       help="only run benchmarks whose name contains this")
+
+    cmp_p = sub.add_parser("compare", help="compare two result files")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--threshold", type=float, default=0.10,
+                       help="relative slowdown that counts as a regression")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_benchmarks(args.selected, args.repeat, args.min_time)
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump({"meta": environment(), "results": results}, fh,
+                      indent=2)
+        print(f"\nWrote {len(results)} results to {args.out}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    with open(args.current, encoding="utf-8") as fh:
+        current = json.load(fh)
+    regressions, missing = compare(baseline, current, args.threshold)
+    if missing:
+        print(f"\n{len(missing)} benchmark(s) missing from "
+              f"{args.current}: {', '.join(missing)}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above "
+              f"{args.threshold:.0%}: {', '.join(regressions)}")
+    if missing or regressions:
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+MaritalQuant Plotly chart builders.
+
+Figures shared by the dashboard and any offline tooling that needs
+the same cross-jurisdiction visualisations.  Jurisdictions are keyed
+by their jurisdictions.JURISDICTIONS code, which supplies labels and
+colours.
+Amounts arrive in CNY; `display` (an fx.Display) chooses the currency
+they are shown in.
+"""
+
+import plotly.graph_objects as go
+
+from fx import BASE_DISPLAY
+from jurisdictions import JURISDICTIONS, label
+
+
+# ===================================================
+# PLOTLY CHART BUILDER
+# ===================================================
+
+def build_comparison_chart(outcomes, display=BASE_DISPLAY):
+    """Horizontal grouped bar: total share per jurisdiction.
+
+    `outcomes` maps registry codes to anything with a "total" entry,
+    in display order.
+    """
+    fig = go.Figure()
+
+    for code, outcome in outcomes.items():
+        jurisdiction = JURISDICTIONS[code]
+        total = outcome["total"] / display.rate
+        fig.add_trace(go.Bar(
+            y=["Wife's Total Share"],
+            x=[total],
+            name=label(code),
+            orientation="h",
+            marker=dict(
+                color=jurisdiction.colors[2],
+                opacity=0.85,
+                line=dict(color=jurisdiction.colors[2], width=1.5),
+            ),
+            text=[f"{display.symbol}{total:,.0f}"],
+            textposition="inside",
+            textfont=dict(color="white", size=14, family="Inter, sans-serif"),
+        ))
+
+    fig.update_layout(
+        barmode="group",
+        height=120 + 20 * len(outcomes),
+        margin=dict(l=0, r=20, t=10, b=10),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        legend=dict(
+            orientation="h", yanchor="bottom", y=1.02,
+            xanchor="center", x=0.5,
+            font=dict(size=13, family="Inter, sans-serif"),
+        ),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor="rgba(226,232,240,0.6)",
+            tickprefix=display.symbol,
+            tickformat=",",
+            tickfont=dict(size=11, color="#64748b"),
+        ),
+        yaxis=dict(showticklabels=False),
+    )
+    return fig
+
+
+def build_breakdown_chart(outcomes, display=BASE_DISPLAY):
+    """Stacked bar showing component breakdown for each jurisdiction.
+
+    `outcomes` maps registry codes to the jurisdictions.SUMMARY_FIELDS
+    components (sharing, compensation, adjustments).
+    """
+    categories = ["Base / Sharing", "Compensation", "Adjustments"]
+    components = ["sharing", "compensation", "adjustments"]
+
+    fig = go.Figure()
+
+    for i, (cat, component) in enumerate(zip(categories, components)):
+        for j, (code, outcome) in enumerate(outcomes.items()):
+            value = max(0, outcome[component]) / display.rate
+            fig.add_trace(go.Bar(
+                x=[label(code)], y=[value],
+                name=cat, marker_color=JURISDICTIONS[code].colors[i],
+                text=[f"{display.symbol}{value:,.0f}" if value > 0 else ""],
+                textposition="inside",
+                textfont=dict(color="white", size=11),
+                showlegend=(j == 0),
+                legendgroup=cat,
+            ))
+
+    fig.update_layout(
+        barmode="stack",
+        height=340,
+        margin=dict(l=0, r=10, t=10, b=40),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        legend=dict(
+            orientation="h", yanchor="bottom", y=1.02,
+            xanchor="center", x=0.5,
+            font=dict(size=12, family="Inter, sans-serif"),
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor="rgba(226,232,240,0.5)",
+            tickprefix=display.symbol,
+            tickformat=",",
+            tickfont=dict(size=11, color="#64748b"),
+        ),
+        xaxis=dict(
+            tickfont=dict(size=13, family="Inter, sans-serif"),
+        ),
+    )
+    return fig
+
+
+def build_cashflow_chart(cn_flows, uk_flows, cn_realised=None,
+                         uk_realised=None, display=BASE_DISPLAY):
+    """Cumulative receipts by year after divorce, CN vs UK.
+
+    The optional realised series (expected receipts after collection
+    risk, one value per year) are drawn as dashed lines.
+    """
+    years = list(range(len(cn_flows.total)))
+    hover = f"Year %{{x}}: {display.symbol}%{{y:,.0f}}<extra></extra>"
+    fig = go.Figure()
+
+    for flows, realised, name, color in (
+            (cn_flows, cn_realised, "\U0001f1e8\U0001f1f3 China",
+             "rgba(234, 88, 12, 0.9)"),
+            (uk_flows, uk_realised, "\U0001f1ec\U0001f1e7 UK",
+             "rgba(22, 163, 74, 0.9)")):
+        fig.add_trace(go.Scatter(
+            x=years, y=flows.total.cumsum() / display.rate,
+            name=name, mode="lines+markers",
+            line=dict(color=color, width=3),
+            marker=dict(size=5),
+            hovertemplate=hover,
+        ))
+        if realised is not None:
+            fig.add_trace(go.Scatter(
+                x=years, y=realised.cumsum() / display.rate,
+                name=f"{name} (realised)", mode="lines",
+                line=dict(color=color, width=2, dash="dash"),
+                hovertemplate=hover,
+            ))
+
+    fig.update_layout(
+        height=320,
+        margin=dict(l=0, r=10, t=10, b=40),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        legend=dict(
+            orientation="h", yanchor="bottom", y=1.02,
+            xanchor="center", x=0.5,
+            font=dict(size=12, family="Inter, sans-serif"),
+        ),
+        xaxis=dict(
+            title="Years after divorce",
+            tickfont=dict(size=11, color="#64748b"),
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor="rgba(226,232,240,0.5)",
+            tickprefix=display.symbol,
+            tickformat=",",
+            tickfont=dict(size=11, color="#64748b"),
+        ),
+    )
+    return fig
@@ -0,0 +1,151 @@
+"""
+MaritalQuant columnar output.
+
+Turns batch-engine chunks into typed Arrow record batches and streams
+them to Parquet or Arrow IPC files.  Amounts are float64, descriptive
+fields (housing, driver, notes) are dictionary-encoded so pandas reads
+them straight into Categoricals, and the Master Translator insights
+are a single uint8 bitmask column.
+
+Column names are the scenario inputs followed by `cn_<field>` and
+`uk_<field>` for every ChinaResult / UKResult field, then `gap` and
+`insight_flags`.
+
+Usage:
+  from columnar import write_parquet, read_pandas
+  write_parquet(scenarios, "sweep.parquet")     # any iterable, streamed
+  df = read_pandas("sweep.parquet")
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from batch import DEFAULT_CHUNK_SIZE, TEXT_CODES, iter_outcome_chunks
+from engine import SCENARIO_FIELDS, ChinaResult, UKResult
+
+
+def _text_type():
+    return pa.dictionary(pa.int8(), pa.string())
+
+
+def _schema():
+    fields = [
+        pa.field("total_assets", pa.float64()),
+        pa.field("marriage_years", pa.int16()),
+        pa.field("has_children", pa.bool_()),
+        pa.field("wife_is_homemaker", pa.bool_()),
+        pa.field("homemaker_years", pa.int16()),
+        pa.field("home_in_husband_name", pa.bool_()),
+        pa.field("husband_has_fault", pa.bool_()),
+    ]
+    for prefix, record_type in (("cn", ChinaResult), ("uk", UKResult)):
+        for name in record_type._fields:
+            kind = (_text_type() if name in record_type._text_fields
+                    else pa.float64())
+            fields.append(pa.field(f"{prefix}_{name}", kind))
+    fields.append(pa.field("gap", pa.float64()))
+    fields.append(pa.field("insight_flags", pa.uint8()))
+    return pa.schema(fields)
+
+
+SCHEMA = _schema()
+
+# Dictionaries are fixed per field so every batch (and every file)
+# shares the same category codes: code == TextCode value.
+_DICTIONARIES = {
+    name: pa.array([member.text for member in codes], pa.string())
+    for name, codes in TEXT_CODES.items()
+}
+
+
+def _text_array(name, codes):
+    return pa.DictionaryArray.from_arrays(
+        pa.array(codes, pa.int8()), _DICTIONARIES[name])
+
+
+def chunk_to_record_batch(chunk) -> pa.RecordBatch:
+    """Convert a batch.OutcomeChunk into a RecordBatch matching SCHEMA."""
+    arrays = []
+    for name in SCENARIO_FIELDS:
+        arrays.append(pa.array(chunk.inputs[name],
+                               SCHEMA.field(name).type))
+    for prefix, columns, record_type in (("cn", chunk.cn, ChinaResult),
+                                         ("uk", chunk.uk, UKResult)):
+        for name in record_type._fields:
+            if name in record_type._text_fields:
+                arrays.append(_text_array(name, columns[name]))
+            else:
+                arrays.append(pa.array(columns[name], pa.float64()))
+    arrays.append(pa.array(chunk.uk["total"] - chunk.cn["total"],
+                           pa.float64()))
+    arrays.append(pa.array(chunk.flags, pa.uint8()))
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+
+def iter_record_batches(scenarios, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Lazily evaluate any iterable of scenarios into RecordBatches."""
+    for chunk in iter_outcome_chunks(scenarios, chunk_size):
+        yield chunk_to_record_batch(chunk)
+
+
+def write_parquet(scenarios, path, chunk_size=DEFAULT_CHUNK_SIZE,
+                  compression="zstd") -> int:
+    """Stream scenarios into a Parquet file; return the row count.
+
+    One row group is written per chunk, so memory stays bounded by
+    chunk_size regardless of input length.
+    """
+    rows = 0
+    with pq.ParquetWriter(path, SCHEMA, compression=compression) as writer:
+        for record_batch in iter_record_batches(scenarios, chunk_size):
+            writer.write_batch(record_batch)
+            rows += record_batch.num_rows
+    return rows
+
+
+def write_arrow(scenarios, path, chunk_size=DEFAULT_CHUNK_SIZE) -> int:
+    """Stream scenarios into an Arrow IPC file; return the row count.
+
+    IPC files can be memory-mapped back with read_arrow without copying.
+    """
+    rows = 0
+    with pa.OSFile(str(path), "wb") as sink, \
+            pa.ipc.new_file(sink, SCHEMA) as writer:
+        for record_batch in iter_record_batches(scenarios, chunk_size):
+            writer.write_batch(record_batch)
+            rows += record_batch.num_rows
+    return rows
+
+
+def read_arrow(path) -> pa.Table:
+    """Memory-map an Arrow IPC file written by write_arrow (zero copy)."""
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def to_pandas(table):
+    """Arrow table -> DataFrame avoiding block-consolidation copies.
+
+    Each column becomes its own block (split_blocks), numeric buffers
+    are handed over rather than copied where Arrow's layout allows, and
+    dictionary columns become Categoricals sharing the category codes.
+    """
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def read_pandas(path, columns=None):
+    """Load a Parquet file written by write_parquet into pandas."""
+    return to_pandas(pq.read_table(path, columns=columns))
+
+
+def column_view(table, name) -> np.ndarray:
+    """NumPy view of a null-free numeric column.
+
+    Zero copy when the column is a single chunk (e.g. one record batch);
+    multi-chunk columns are concatenated once.
+    """
+    column = table.column(name)
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=True)
+    return column.combine_chunks().to_numpy(zero_copy_only=True)
@@ -0,0 +1,346 @@
+"""
+MaritalQuant incremental dataflow graph.
+
+The dashboard's derived values (the CN and UK records and their
+components, a summary per registered jurisdiction, the insight
+bitmask, every insight and both charts) are nodes in a small
+dependency graph.  A node records which inputs or
+other nodes it reads; after an input change only nodes downstream of
+it are re-evaluated, and a node whose value comes out unchanged stops
+the change from propagating further (early cut-off).
+
+For example, toggling husband_has_fault re-fetches the CN/UK records
+from session_store.RESULT_STORE (shared by every session, computed
+there on a miss) and re-derives the CN summary from the new CN record
+(no other jurisdiction reads that input).  The UK record comes back unchanged, and of the CN
+component nodes only fault_adjustment and total change.  So the
+breakdown chart, the comparison chart, the insight bitmask and the
+Fault insight are rebuilt, while the other jurisdictions' results, the
+other insights and anything reading only unchanged components are
+reused.  Changing only the "jurisdictions" selection rebuilds just the
+two charts; changing the "display" currency (an fx.Display) also
+re-renders the compensation-gap insight, whose text quotes amounts.
+Outcomes are always computed in CNY.
+
+Graphs hold plain values only.  A chart node's value is a small
+hashable spec of what the chart shows; figure(spec) builds the Plotly
+figure through a process-wide LRU, so sessions showing the same chart
+share one figure and none is kept per session.
+
+Graph state is per session and lives in the process-wide
+SESSION_GRAPHS store, keyed by Streamlit session id.  Idle sessions are
+evicted like RESULT_STORE's, and the least recently used ones beyond
+max_sessions are evicted too.
+
+Usage:
+  evaluation = SESSION_GRAPHS.get(session_id)
+  evaluation.set(**dict(zip(SCENARIO_FIELDS, key)),
+                 jurisdictions=("CN", "UK", "HK"),
+                 display=get_table().display("GBP"))
+  fig = figure(evaluation.get("chart.comparison"))
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, partial
+from operator import itemgetter
+
+from charts import build_breakdown_chart, build_comparison_chart
+from engine import (
+    SCENARIO_FIELDS, ChinaResult, Insight, UKResult, insight_flags,
+    render_insight,
+)
+from jurisdictions import (
+    JURISDICTIONS, SUMMARY_FIELDS, record_summary, summary,
+)
+from legal_data import KB_VERSION
+from session_store import RESULT_STORE, deep_sizeof, scenario_key
+
+
+# ===================================================
+# GRAPH
+# ===================================================
+
+class Graph:
+    """Node definitions: name -> (dependency names, function)."""
+
+    def __init__(self, inputs):
+        self.inputs = tuple(inputs)
+        self.nodes = {}
+
+    def node(self, name, *deps):
+        """Register `fn(*dep_values)` as node `name`."""
+        unknown = [dep for dep in deps
+                   if dep not in self.nodes and dep not in self.inputs]
+        if unknown:
+            raise ValueError(f"node {name!r} depends on undefined "
+                             f"{', '.join(unknown)}")
+
+        def decorator(fn):
+            self.nodes[name] = (deps, fn)
+            return fn
+        return decorator
+
+    def downstream(self, name) -> set:
+        """Every node that transitively reads `name`."""
+        found, frontier = set(), {name}
+        while frontier:
+            frontier = {node for node, (deps, _) in self.nodes.items()
+                        if node not in found and frontier.intersection(deps)}
+            found |= frontier
+        return found
+
+
+class Evaluation:
+    """One session's values for a Graph, recomputed lazily on demand.
+
+    Each value carries the revision it last changed at and the revision
+    it was last verified at; a node is only re-run when a dependency
+    changed after it was verified.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.revision = 0
+        self._values = {}
+        self._changed_at = {}
+        self._verified_at = {}
+        self.recomputed = []   # node names re-run since the last set()
+
+    def set(self, **inputs) -> list:
+        """Update input values; return the names that actually changed."""
+        unknown = set(inputs) - set(self.graph.inputs)
+        if unknown:
+            raise KeyError(f"not graph inputs: {', '.join(sorted(unknown))}")
+        changed = [name for name, value in inputs.items()
+                   if name not in self._values or self._values[name] != value]
+        if changed:
+            self.revision += 1
+            for name in changed:
+                self._values[name] = inputs[name]
+                self._changed_at[name] = self.revision
+        self.recomputed = []
+        return changed
+
+    def provide(self, name, value):
+        """Accept a known value for node `name` at the current inputs.
+
+        For values loaded from a store (see history.py): get() serves
+        it without running the node, and downstream nodes see a change
+        only if it differs from what they last read.
+        """
+        if name not in self.graph.nodes:
+            raise KeyError(f"not a graph node: {name}")
+        if name not in self._values or self._values[name] != value:
+            self._values[name] = value
+            self._changed_at[name] = self.revision
+        self._verified_at[name] = self.revision
+
+    def get(self, name):
+        if name in self.graph.inputs:
+            return self._values[name]
+        if self._verified_at.get(name) == self.revision:
+            return self._values[name]
+        deps, fn = self.graph.nodes[name]
+        args = [self.get(dep) for dep in deps]
+        stale = name not in self._values or any(
+            self._changed_at[dep] > self._verified_at[name] for dep in deps)
+        if stale:
+            value = fn(*args)
+            self.recomputed.append(name)
+            if name not in self._values or self._values[name] != value:
+                self._values[name] = value
+                self._changed_at[name] = self.revision
+        self._verified_at[name] = self.revision
+        return self._values[name]
+
+
+# ===================================================
+# OUTCOME GRAPH
+# ===================================================
+
+# "jurisdictions" is the tuple of registry codes selected for display;
+# "display" is the fx.Display the chart amounts are shown in.
+OUTCOME_GRAPH = Graph(SCENARIO_FIELDS + ("jurisdictions", "display"))
+_node = OUTCOME_GRAPH.node
+
+# The (cn, uk) records come from the shared RESULT_STORE, which
+# computes misses with backends.calculate_one.  Early cut-off keeps a
+# record that comes back unchanged (the UK one when only the home or
+# fault input changed) from re-running anything downstream.
+@_node("records", *SCENARIO_FIELDS)
+def _records(*inputs):
+    return RESULT_STORE.results(scenario_key(*inputs))
+
+
+_node("cn", "records")(itemgetter(0))
+_node("uk", "records")(itemgetter(1))
+
+
+def _component(record, field):
+    def project(result):
+        return result[field]
+    return _node(f"{record}.{field}", record)(project)
+
+
+for _field in ChinaResult._keys:
+    _component("cn", _field)
+for _field in UKResult._keys:
+    _component("uk", _field)
+
+
+@_node("insight_flags", "cn.total", "uk.total", "cn.fault_adjustment",
+       "wife_is_homemaker", "has_children", "marriage_years")
+def _insight_flags(cn_total, uk_total, fault_adjustment,
+                   wife_is_homemaker, has_children, marriage_years):
+    return insight_flags({"total": cn_total,
+                          "fault_adjustment": fault_adjustment},
+                         {"total": uk_total}, wife_is_homemaker,
+                         has_children, marriage_years)
+
+
+# Each insight re-renders only when its own bit or the numbers its text
+# quotes change; these mirror engine.insight_params.
+_INSIGHT_PARAMS = {
+    Insight.CN_COMPENSATION_GAP: ("cn.compensation", "uk.compensation"),
+    Insight.LONG_MARRIAGE: ("marriage_years",),
+}
+# Insights whose text quotes scenario amounts, shown per "display".
+_INSIGHT_AMOUNTS = {Insight.CN_COMPENSATION_GAP}
+
+
+def _insight_node(code):
+    @_node(f"flag.{code.name}", "insight_flags")
+    def applies(flags):
+        return bool(flags & code)
+
+    amounts = code in _INSIGHT_AMOUNTS
+
+    @_node(f"insight.{code.name}", f"flag.{code.name}",
+           *_INSIGHT_PARAMS.get(code, ()), *(("display",) if amounts else ()))
+    def render(flag, *params):
+        if not flag:
+            return None
+        display = params[-1] if amounts else None
+        return render_insight(int(code), params[:-1] if amounts else params,
+                              KB_VERSION, display)
+    return render
+
+
+for _code in Insight:
+    _insight_node(_code)
+
+
+@_node("insights", *(f"insight.{code.name}" for code in Insight))
+def _insights(*rendered):
+    return [dict(insight) for insight in rendered if insight is not None]
+
+
+# One summary node per registered jurisdiction; the charts show the
+# selected subset in order.  CN and UK summarise the records above, so
+# each jurisdiction is computed once per evaluation; the others read
+# only the inputs their calculator takes.
+_RECORD_NODES = {"CN": "cn", "UK": "uk"}
+
+for _code, _jurisdiction in JURISDICTIONS.items():
+    if _code in _RECORD_NODES:
+        _node(f"outcome.{_code}", _RECORD_NODES[_code])(
+            partial(record_summary, _code))
+    else:
+        _node(f"outcome.{_code}", *_jurisdiction.inputs)(
+            partial(summary, _code))
+    _component(f"outcome.{_code}", "total")
+
+
+# Chart nodes return (kind, display, rows) specs; see figure().
+@_node("chart.comparison", "jurisdictions", "display",
+       *(f"outcome.{code}.total" for code in JURISDICTIONS))
+def _comparison_chart(selected, display, *totals):
+    totals = dict(zip(JURISDICTIONS, totals))
+    return ("comparison", display,
+            tuple((code, totals[code]) for code in selected))
+
+
+@_node("chart.breakdown", "jurisdictions", "display",
+       *(f"outcome.{code}" for code in JURISDICTIONS))
+def _breakdown_chart(selected, display, *outcomes):
+    outcomes = dict(zip(JURISDICTIONS, outcomes))
+    return ("breakdown", display, tuple(
+        (code, tuple(outcomes[code][field] for field in SUMMARY_FIELDS))
+        for code in selected))
+
+
+@lru_cache(maxsize=256)
+def figure(spec):
+    """The Plotly figure for a chart node's value, shared process-wide."""
+    kind, display, rows = spec
+    if kind == "comparison":
+        return build_comparison_chart(
+            {code: {"total": total} for code, total in rows}, display)
+    return build_breakdown_chart(
+        {code: dict(zip(SUMMARY_FIELDS, values)) for code, values in rows},
+        display)
+
+
+# ===================================================
+# SESSION STORE
+# ===================================================
+
+class SessionGraphs:
+    """Process-wide Evaluation per session id.
+
+    Sessions idle for idle_seconds are evicted, and so are the least
+    recently used ones beyond max_sessions.
+    """
+
+    def __init__(self, graph=OUTCOME_GRAPH, idle_seconds=30 * 60,
+                 sweep_interval=60, max_sessions=1024):
+        self.graph = graph
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self.max_sessions = max_sessions
+        # session id -> [evaluation, last_seen], least recent first
+        self._sessions = OrderedDict()
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def get(self, session_id, now=None) -> Evaluation:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = [
+                    Evaluation(self.graph), now]
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            entry[1] = now
+        if now - self._last_sweep >= self.sweep_interval:
+            self.evict_idle(now)
+        return entry[0]
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self, now=None) -> int:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            idle = [sid for sid, (_, seen) in self._sessions.items()
+                    if now - seen > self.idle_seconds]
+            for sid in idle:
+                del self._sessions[sid]
+        return len(idle)
+
+    def memory_report(self) -> dict:
+        with self._lock:
+            evaluations = [entry[0] for entry in self._sessions.values()]
+        return {
+            "session_count": len(evaluations),
+            "bytes_total": sum(deep_sizeof(ev._values) for ev in evaluations),
+        }
+
+
+SESSION_GRAPHS = SessionGraphs()
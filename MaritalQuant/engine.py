@@ -0,0 +1,511 @@
+"""
+MaritalQuant calculation engine.
+
+Scalar property-division calculators for China and England & Wales,
+plus the Master Translator that maps a scenario onto legal insights
+drawn from the knowledge base.  Kept free of Streamlit so the same
+rules can be imported by the dashboard, benchmarks and batch tools.
+"""
+
+from collections import namedtuple
+from enum import IntEnum, IntFlag
+from functools import lru_cache
+from operator import attrgetter
+
+from legal_data import KB_VERSION, LEGAL_KNOWLEDGE_BASE
+
+
+# ===================================================
+# RESULT RECORDS
+# ===================================================
+# Results are immutable slotted tuples.  Repeated descriptive strings
+# are stored as small enum codes and only turned into text on access,
+# so batch and cache-heavy callers do not allocate them per scenario.
+
+class TextCode(IntEnum):
+    """Integer code carrying the display text it stands for."""
+
+    def __new__(cls, value, text):
+        member = int.__new__(cls, value)
+        member._value_ = value
+        member.text = text
+        return member
+
+    def __str__(self):
+        return self.text
+
+
+class Housing(TextCode):
+    STANDARD = 0, "Standard division"
+    WIFE_LOSES_HOME = 1, "Wife LOSES home -> cash discount"
+    WIFE_KEEPS_HOME = 2, "Wife KEEPS home for children"
+    EQUITABLE = 3, "Equitable division of housing"
+
+
+class Driver(TextCode):
+    NEEDS = 0, "Needs (children's housing)"
+    COMPENSATION = 1, "Compensation (career sacrifice)"
+
+
+class Mingling(TextCode):
+    RING_FENCED = 0, "Short marriage - pre-marital assets may be ring-fenced"
+    ALL_MATRIMONIAL = 1, "All assets treated as matrimonial (White v White)"
+
+
+class NeedsBasis(TextCode):
+    SHARING = 0, "Standard 50% sharing applies"
+    NEEDS_OVERRIDE = 1, ("Needs override: 60% to wife for children's "
+                         "housing security")
+
+
+class _ResultRecord:
+    """Dict-style read access for the result tuples used by the dashboard.
+
+    `record["housing"]` returns display text, `record.housing` the code.
+    `in`, len() and iteration follow the dict too (over the keys); use
+    tuple.__iter__(record) or record._asdict() for the raw field values.
+    """
+
+    __slots__ = ()
+    _text_fields = ()
+    _derived_fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # One C-level getter per key keeps record["total"] close to the
+        # cost of a dict lookup.
+        getters = {}
+        for name in cls._fields + cls._derived_fields:
+            if name in cls._text_fields:
+                getters[name] = _text_getter(attrgetter(name))
+            else:
+                getters[name] = attrgetter(name)
+        cls._getters = getters
+
+    def __getitem__(self, key):
+        if key.__class__ is not str:
+            return tuple.__getitem__(self, key)
+        try:
+            getter = self._getters[key]
+        except KeyError:
+            raise KeyError(key) from None
+        return getter(self)
+
+    def get(self, key, default=None):
+        getter = self._getters.get(key)
+        return default if getter is None else getter(self)
+
+    def __contains__(self, key):
+        return key in self._getters
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def keys(self):
+        return self._keys
+
+    def values(self):
+        return [self[key] for key in self._keys]
+
+    def items(self):
+        return [(key, self[key]) for key in self._keys]
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    # namedtuple's own helpers iterate the tuple; with the dict-style
+    # __iter__ above they must walk the stored fields explicitly.
+    @classmethod
+    def _make(cls, iterable):
+        result = tuple.__new__(cls, iterable)
+        if tuple.__len__(result) != len(cls._fields):
+            raise TypeError(f"Expected {len(cls._fields)} arguments, "
+                            f"got {tuple.__len__(result)}")
+        return result
+
+    def __getnewargs__(self):
+        return tuple(tuple.__iter__(self))
+
+    def _asdict(self) -> dict:
+        return dict(zip(self._fields, tuple.__iter__(self)))
+
+    def _replace(self, **changes):
+        values = self._asdict()
+        unknown = set(changes) - set(values)
+        if unknown:
+            raise ValueError(f"got unexpected field names: {sorted(unknown)}")
+        values.update(changes)
+        return self._make(values.values())
+
+
+def _text_getter(get_code):
+    def getter(record):
+        return get_code(record).text
+    return getter
+
+
+class ChinaResult(_ResultRecord, namedtuple("ChinaResult", (
+        "pool", "base_share", "liquidity_discount", "effective_share",
+        "compensation", "fault_adjustment", "children_adjustment",
+        "total", "housing"))):
+    __slots__ = ()
+    _text_fields = ("housing",)
+    _derived_fields = ("enforcement_rate",)
+    _keys = ("pool", "base_share", "liquidity_discount", "effective_share",
+             "compensation", "fault_adjustment", "children_adjustment",
+             "total", "enforcement_rate", "housing")
+
+    enforcement_rate = 0.30
+
+
+class UKResult(_ResultRecord, namedtuple("UKResult", (
+        "pool", "sharing_base", "needs_outcome", "compensation",
+        "homemaker_outcome", "total", "driver", "mingling_note",
+        "needs_note", "housing"))):
+    __slots__ = ()
+    _text_fields = ("driver", "mingling_note", "needs_note", "housing")
+    _derived_fields = ("comp_note", "enforcement_rate")
+    _keys = ("pool", "sharing_base", "needs_outcome", "compensation",
+             "homemaker_outcome", "total", "driver", "mingling_note",
+             "needs_note", "comp_note", "enforcement_rate", "housing")
+
+    enforcement_rate = 0.78
+
+    @property
+    def comp_note(self):
+        return compensation_note(self.compensation)
+
+
+# The UK replacement cost of a homemaker year is a sterling figure.
+# The engines work in CNY, so it is converted at the FX table's latest
+# GBP rate, once per process: every result (and every cache keyed on
+# the inputs) then uses the same rate.
+UK_HOMEMAKER_RATE_GBP = 100_000
+
+# Below this pool (CNY) a wife caring for children gets 60% on needs.
+UK_NEEDS_THRESHOLD = 10_000_000
+
+
+@lru_cache(maxsize=None)
+def gbp_to_cny() -> float:
+    """CNY per GBP; fx (and pandas) load on first use."""
+    from fx import get_table
+    return float(get_table().lookup("GBP"))
+
+
+def uk_homemaker_rate() -> float:
+    """UK_HOMEMAKER_RATE_GBP in CNY."""
+    return UK_HOMEMAKER_RATE_GBP * gbp_to_cny()
+
+
+@lru_cache(maxsize=256)
+def compensation_note(compensation):
+    """UK homemaker compensation explanation for a compensation amount."""
+    if not compensation:
+        return "No homemaker compensation"
+    rate = uk_homemaker_rate()
+    return (f"Replacement cost: {compensation / rate:g} yrs "
+            f"x \u00a3{UK_HOMEMAKER_RATE_GBP:,} (\u00a5{rate:,.0f}) "
+            f"= \u00a5{compensation:,.0f}")
+
+
+# ===================================================
+# CALCULATION ENGINE
+# ===================================================
+
+SCENARIO_FIELDS = (
+    "total_assets", "marriage_years", "has_children",
+    "wife_is_homemaker", "homemaker_years",
+    "home_in_husband_name", "husband_has_fault",
+)
+
+
+# Years are whole numbers in every engine (batch.as_columns rejects
+# fractions too).  x % 1 is NaN, which is truthy, for NaN and infinity.
+YEARS_ERROR = "marriage_years and homemaker_years must be whole years"
+
+
+def calculate_china(total_assets, marriage_years, has_children,
+                    wife_is_homemaker, homemaker_years,
+                    home_in_husband_name, husband_has_fault):
+    if marriage_years % 1 or homemaker_years % 1:
+        raise ValueError(YEARS_ERROR)
+    pool = total_assets
+    base_share = pool * 0.50
+
+    if home_in_husband_name:
+        liquidity_discount = base_share * 0.20
+    else:
+        liquidity_discount = 0
+
+    effective_share = base_share - liquidity_discount
+
+    if wife_is_homemaker and homemaker_years > 0:
+        compensation = homemaker_years * 5_000
+    else:
+        compensation = 0
+
+    fault_adjustment = pool * 0.05 if husband_has_fault else 0
+    children_adjustment = pool * 0.03 if has_children else 0
+    total = effective_share + compensation + fault_adjustment + children_adjustment
+
+    return ChinaResult(
+        pool, base_share, liquidity_discount, effective_share,
+        compensation, fault_adjustment, children_adjustment, total,
+        Housing.WIFE_LOSES_HOME if home_in_husband_name else Housing.STANDARD,
+    )
+
+
+def calculate_uk(total_assets, marriage_years, has_children,
+                 wife_is_homemaker, homemaker_years):
+    if marriage_years % 1 or homemaker_years % 1:
+        raise ValueError(YEARS_ERROR)
+    sharing_base = total_assets * 0.50
+
+    if marriage_years > 10:
+        pool = total_assets
+        mingling = Mingling.ALL_MATRIMONIAL
+    else:
+        pool = total_assets
+        mingling = Mingling.RING_FENCED
+
+    if has_children and total_assets < UK_NEEDS_THRESHOLD:
+        needs_outcome = total_assets * 0.60
+        needs_basis = NeedsBasis.NEEDS_OVERRIDE
+    else:
+        needs_outcome = sharing_base
+        needs_basis = NeedsBasis.SHARING
+
+    if wife_is_homemaker and homemaker_years > 0:
+        compensation = homemaker_years * uk_homemaker_rate()
+        homemaker_outcome = sharing_base + compensation
+    else:
+        compensation = 0
+        homemaker_outcome = sharing_base
+
+    total = max(needs_outcome, homemaker_outcome)
+    total = min(total, total_assets)
+
+    if needs_outcome >= homemaker_outcome:
+        driver = Driver.NEEDS
+    else:
+        driver = Driver.COMPENSATION
+
+    return UKResult(
+        pool, sharing_base, needs_outcome, compensation, homemaker_outcome,
+        total, driver, mingling, needs_basis,
+        Housing.WIFE_KEEPS_HOME if has_children else Housing.EQUITABLE,
+    )
+
+
+def calculate_outcomes(total_assets, marriage_years, has_children,
+                       wife_is_homemaker, homemaker_years,
+                       home_in_husband_name, husband_has_fault):
+    cn = calculate_china(
+        total_assets, marriage_years, has_children,
+        wife_is_homemaker, homemaker_years,
+        home_in_husband_name, husband_has_fault,
+    )
+    uk = calculate_uk(
+        total_assets, marriage_years, has_children,
+        wife_is_homemaker, homemaker_years,
+    )
+    return cn, uk
+
+
+# ===================================================
+# MASTER TRANSLATOR
+# ===================================================
+
+class Insight(IntFlag):
+    """Bit for each Master Translator insight, in display order."""
+    CN_COMPENSATION_GAP = 1
+    UK_NON_FINANCIAL = 2
+    CHILDREN_WELFARE = 4
+    LONG_MARRIAGE = 8
+    FAULT = 16
+
+
+# Plain-int copies of the bits: IntFlag arithmetic is several times
+# slower than int arithmetic and these run once per scenario.
+_GAP, _NON_FINANCIAL, _CHILDREN, _LONG_MARRIAGE, _FAULT = (
+    int(code) for code in Insight)
+_DISPLAY_ORDER = tuple(int(code) for code in Insight)
+
+
+def insight_flags(cn_result, uk_result, wife_is_homemaker,
+                  has_children, marriage_years) -> int:
+    """Insight bitmask of the insights that apply, without rendering text."""
+    flags = 0
+    if uk_result["total"] - cn_result["total"] > 100_000:
+        flags |= _GAP
+    if wife_is_homemaker:
+        flags |= _NON_FINANCIAL
+    if has_children:
+        flags |= _CHILDREN
+    if marriage_years > 10:
+        flags |= _LONG_MARRIAGE
+    if cn_result.get("fault_adjustment", 0) > 0:
+        flags |= _FAULT
+    return flags
+
+
+def insight_params(code, cn_result, uk_result, marriage_years) -> tuple:
+    """The scenario numbers an insight's text depends on (hashable)."""
+    if code == _GAP:
+        return (cn_result.get("compensation", 0),
+                uk_result.get("compensation", 0))
+    if code == _LONG_MARRIAGE:
+        return (marriage_years,)
+    return ()
+
+
+def _insight_money(amount, display):
+    """A scenario amount in an insight: CNY, or as fx.Display shows it."""
+    if display is None:
+        return f"\u00a5{amount:,.0f}"
+    from fx import format_money
+    return format_money(amount, display)
+
+
+@lru_cache(maxsize=4096)
+def render_insight(code, params=(), kb_version=KB_VERSION,
+                   display=None) -> dict:
+    """Markdown for one insight, memoised per (code, params, KB version).
+
+    Scenario amounts quoted in the text are shown per `display` (an
+    fx.Display; CNY if None).  The KB's own figures, such as typical
+    court awards, stay in the currency they were reported in.
+    """
+    # kb_version is unused in the body; it only partitions the cache.
+    kb = LEGAL_KNOWLEDGE_BASE
+    code = Insight(code)
+
+    if code == Insight.CN_COMPENSATION_GAP:
+        cn_comp, uk_comp = params
+        cn_money, uk_money, gap_money = (
+            _insight_money(amount, display)
+            for amount in (cn_comp, uk_comp, uk_comp - cn_comp))
+        art1088 = kb["CN"]["Statutes"]["Art_1088"]
+        return {
+            "level": "warning",
+            "label": "[Core Logic] CN Housework Compensation Gap",
+            "body": (
+                f"Your asset risk is high.  In China, despite **{art1088['title']}** "
+                f"(Civil Code Art 1088), housework compensation is often "
+                f"symbolic \u2014 averaging approx. \u00a530,000\u201380,000, with only a "
+                f"26.92% court-approval rate.\n\n"
+                f"In your scenario the CN system awards **{cn_money}** "
+                f"for homemaking, while the UK framework values the same "
+                f"contribution at **{uk_money}** \u2014 a "
+                f"**{gap_money}** compensation gap.\n\n"
+                f"**[Case Precedent]** *Guiding Case No. 66 (Lei v Song)* \u2014 "
+                f"even when misconduct is proven, CN courts still apply "
+                f"narrow statutory caps rather than equitable redistribution."
+            ),
+        }
+
+    if code == Insight.UK_NON_FINANCIAL:
+        white = kb["UK"]["Cases"]["White_v_White"]
+        return {
+            "level": "success",
+            "label": "[Core Logic] UK Non-financial Contribution Protection",
+            "body": (
+                f"UK law protects your non-financial contribution.  As "
+                f"established in **{white['name']}**, *\"{white['quote']}\"* "
+                f"({white['quote_attribution']}).\n\n"
+                f"The **Miller/McFarlane** framework further ensures that "
+                f"career sacrifice is compensated through the **three strands "
+                f"of fairness**: Needs, Compensation, and Sharing.\n\n"
+                f"**[Case Precedent]** In *McFarlane*, a solicitor-turned-"
+                f"homemaker was awarded **\u00a3250,000/year** in periodical "
+                f"payments \u2014 not as maintenance, but as *compensation* "
+                f"for her foregone career."
+            ),
+        }
+
+    if code == Insight.CHILDREN_WELFARE:
+        mca25 = kb["UK"]["Statutes"]["MCA_Sec25"]
+        children_act = kb["UK"]["Statutes"]["Children_Act_1989"]
+        return {
+            "level": "info",
+            "label": "[Core Logic] Children's Welfare & the Needs Principle",
+            "body": (
+                f"Both jurisdictions prioritise children \u2014 but with very "
+                f"different teeth.\n\n"
+                f"\U0001f1ec\U0001f1e7 **UK \u2014 MCA 1973 s.25(1):** *'{mca25['title']}'* "
+                f"mandates that the **first** consideration is the welfare "
+                f"of any minor child.  In practice, this often pushes the "
+                f"primary carer's share to **55\u201365%** to secure housing "
+                f"stability for children.  The **{children_act['title']}** "
+                f"reinforces this with a statutory welfare checklist.\n\n"
+                f"\U0001f1e8\U0001f1f3 **China \u2014 Art 1087:** The court shall apply "
+                f"*'\u7167\u987e\u5b50\u5973\u3001\u5973\u65b9\u548c\u65e0\u8fc7\u9519\u65b9\u6743\u76ca\u7684\u539f\u5219'* (protect children, "
+                f"wife, and innocent party).  However, this typically "
+                f"translates to only a **2\u20135%** tilt from the 50/50 "
+                f"baseline, and no mandatory housing right for the "
+                f"custodial parent."
+            ),
+        }
+
+    if code == Insight.LONG_MARRIAGE:
+        (marriage_years,) = params
+        return {
+            "level": "info",
+            "label": "[Core Logic] Long Marriage & Asset Mingling",
+            "body": (
+                f"After {marriage_years} years of marriage, UK law treats "
+                f"virtually all assets as 'matrimonial property' subject "
+                f"to equal sharing (*White v White* yardstick of equality).  "
+                f"Pre-marital contributions carry diminishing weight.\n\n"
+                f"In China, the statutory 50/50 community property split "
+                f"(Art 1062) applies regardless of marriage duration, but "
+                f"enforcement gaps and liquidity discounts erode the "
+                f"wife's effective share."
+            ),
+        }
+
+    if code == Insight.FAULT:
+        art1091 = kb["CN"]["Statutes"]["Art_1091"]
+        xie_case = kb["CN"]["Cases"]["Xie_v_He"]
+        return {
+            "level": "warning",
+            "label": "[Core Logic] Fault & Domestic Violence",
+            "body": (
+                f"Fault is present in this scenario.  Under **{art1091['title']}** "
+                f"(Art 1091), the innocent party may claim damages for "
+                f"bigamy, DV, maltreatment, or abandonment \u2014 but awards "
+                f"are typically **3\u20135%** of total assets.\n\n"
+                f"**[Case Precedent]** In *{xie_case['name']}*, the court "
+                f"used a **Prior Judgment** (\u5148\u884c\u5224\u51b3) to dissolve the "
+                f"marriage immediately while DV damages were resolved "
+                f"separately \u2014 protecting the victim from being trapped "
+                f"in the marriage during litigation."
+            ),
+        }
+
+    raise ValueError(f"not a single insight code: {code!r}")
+
+
+def render_insights(flags, cn_result, uk_result, marriage_years,
+                    display=None):
+    """Render the insights set in `flags`, in display order."""
+    flags = int(flags)
+    return [
+        dict(render_insight(
+            code, insight_params(code, cn_result, uk_result, marriage_years),
+            KB_VERSION, display,
+        ))
+        for code in _DISPLAY_ORDER if flags & code
+    ]
+
+
+def get_legal_insight(cn_result, uk_result, wife_is_homemaker,
+                      has_children, marriage_years, display=None):
+    flags = insight_flags(cn_result, uk_result, wife_is_homemaker,
+                          has_children, marriage_years)
+    return render_insights(flags, cn_result, uk_result, marriage_years,
+                           display)
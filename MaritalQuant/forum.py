@@ -0,0 +1,199 @@
+"""
+MaritalQuant forum-selection expected value.
+
+Fang v Yan, Yang v Yang and the HK recognition case all turn on where a
+cross-border couple litigates.  For every scenario this module values
+each available forum from the wife's side:
+
+  award       the forum's jurisdiction calculator on the whole pool
+  recovery    award x sum over asset locations of
+                share located there x P(judgment recognised there)
+                x enforcement rate there
+  present     recovery discounted over the forum's expected duration
+  net value   present recovery - litigation cost (fixed + share of pool)
+
+and ranks forums by expected net value.  Forum availability follows
+the jurisdiction rules in the knowledge base: CN courts take property
+located in China (Fang v Yan) or a spouse resident there; the English,
+Hong Kong and Scottish courts need habitual residence or domicile.
+
+The forums are the jurisdictions.JURISDICTIONS entries that have a
+ForumSpec, in registry order: CN, UK, HK and SCT.  A forum's award is
+that jurisdiction's calculator total (CN and UK on the selected
+compute backend) and the enforcement rates come from the registry.
+
+Everything is a (scenarios, forums) array, so a 100k-client portfolio
+is triaged in one batch; the only Python loop is over forums.  Costs,
+durations and recognition probabilities in FORUMS and RECOGNITION are
+illustrative.
+
+Usage (from the MaritalQuant directory):
+  python forum.py --clients 100000
+"""
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from backends import calculate, random_inputs
+from jurisdictions import JURISDICTIONS, calculate_outcomes
+
+
+ForumSpec = namedtuple("ForumSpec", [
+    "duration_years",  # expected time to judgment
+    "fixed_cost",      # litigation cost regardless of pool (RMB)
+    "cost_rate",       # further cost as a share of the pool
+])
+
+# Litigation parameters per jurisdiction code; a registered jurisdiction
+# without an entry here is not offered as a forum.
+FORUMS = {
+    "CN": ForumSpec(1.0, 30_000, 0.02),
+    "UK": ForumSpec(1.5, 250_000, 0.03),
+    "HK": ForumSpec(1.25, 150_000, 0.025),
+    "SCT": ForumSpec(1.25, 120_000, 0.025),
+}
+
+LOCATIONS = ("CN", "UK")
+
+# P(a judgment of the forum is recognised where the assets are).  HK
+# orders reach the Mainland under the 2022 reciprocal arrangement on
+# matrimonial judgments; Scottish orders register in England under the
+# Civil Jurisdiction and Judgments Act 1982.
+RECOGNITION = {
+    "CN": {"CN": 1.0, "UK": 0.60},
+    "UK": {"CN": 0.35, "UK": 1.0},
+    "HK": {"CN": 0.80, "UK": 0.65},
+    "SCT": {"CN": 0.30, "UK": 1.0},
+}
+
+ENFORCEMENT = {loc: JURISDICTIONS[loc].enforcement_rate for loc in LOCATIONS}
+
+DISCOUNT_RATE = 0.03
+
+ForumValues = namedtuple("ForumValues", [
+    "forums",      # forum names, the column order of every array below
+    "available",   # (n, F) bool
+    "award",       # (n, F) engine award
+    "recovery",    # (n, F) expected amount collected
+    "cost",        # (n, F) litigation cost
+    "net",         # (n, F) expected net present value; nan if unavailable
+    "ranking",     # (n, F) forum indices, best first, unavailable last
+    "best",        # (n,) index of the best forum, -1 if none is available
+])
+
+
+# ===================================================
+# EVALUATION
+# ===================================================
+
+def forum_codes() -> tuple:
+    """Registered jurisdictions that can be chosen as a forum."""
+    return tuple(code for code in JURISDICTIONS if code in FORUMS)
+
+
+def availability(cn_asset_share, cn_connection, uk_connection,
+                 hk_connection=False, sct_connection=False) -> dict:
+    """Per-forum (n,) masks of whether the forum can hear the case."""
+    return {
+        "CN": np.asarray(cn_connection, dtype=bool)
+        | (np.asarray(cn_asset_share, dtype=np.float64) > 0),
+        "UK": np.asarray(uk_connection, dtype=bool),
+        "HK": np.asarray(hk_connection, dtype=bool),
+        "SCT": np.asarray(sct_connection, dtype=bool),
+    }
+
+
+def recovery_factor(forum, cn_asset_share) -> np.ndarray:
+    """Expected share of an award in `forum` that is collected."""
+    cn_share = np.clip(np.asarray(cn_asset_share, dtype=np.float64), 0, 1)
+    shares = {"CN": cn_share, "UK": 1.0 - cn_share}
+    return sum(shares[loc] * RECOGNITION[forum][loc] * ENFORCEMENT[loc]
+               for loc in LOCATIONS)
+
+
+def evaluate_forums(total_assets, marriage_years, has_children,
+                    wife_is_homemaker, homemaker_years,
+                    home_in_husband_name, husband_has_fault,
+                    cn_asset_share, cn_connection, uk_connection,
+                    hk_connection=False, sct_connection=False,
+                    rate=DISCOUNT_RATE, backend=None) -> ForumValues:
+    """Value and rank every forum for every scenario."""
+    inputs = (total_assets, marriage_years, has_children, wife_is_homemaker,
+              homemaker_years, home_in_husband_name, husband_has_fault)
+    cn, uk = calculate(*inputs, backend=backend)
+    forums = forum_codes()
+    totals = {"CN": cn["total"], "UK": uk["total"]}
+    others = [code for code in forums if code not in totals]
+    if others:
+        outcomes = calculate_outcomes(*inputs, codes=others)
+        totals.update((code, outcomes[code]["total"]) for code in others)
+    pool = cn["pool"]
+    n = len(pool)
+    open_forums = availability(cn_asset_share, cn_connection, uk_connection,
+                               hk_connection, sct_connection)
+
+    shape = (n, len(forums))
+    available = np.empty(shape, dtype=bool)
+    award = np.empty(shape)
+    recovery = np.empty(shape)
+    cost = np.empty(shape)
+    net = np.empty(shape)
+    for j, name in enumerate(forums):
+        spec = FORUMS[name]
+        available[:, j] = np.broadcast_to(open_forums[name], n)
+        award[:, j] = totals[name]
+        recovery[:, j] = award[:, j] * recovery_factor(name, cn_asset_share)
+        cost[:, j] = spec.fixed_cost + spec.cost_rate * pool
+        net[:, j] = (recovery[:, j] * (1.0 + rate) ** -spec.duration_years
+                     - cost[:, j])
+    net[~available] = np.nan
+
+    ranking = np.argsort(np.where(available, -net, np.inf), axis=1,
+                         kind="stable")
+    best = np.where(available.any(axis=1), ranking[:, 0], -1)
+    return ForumValues(forums, available, award, recovery, cost, net,
+                       ranking, best)
+
+
+def random_portfolio(size, seed=0):
+    """Random cross-border client columns for evaluate_forums."""
+    rng = np.random.default_rng(seed)
+    cn_connection = rng.random(size) < 0.6
+    uk_connection = rng.random(size) < 0.7
+    cn_asset_share = np.where(rng.random(size) < 0.3, 0.0,
+                              rng.random(size))
+    hk_connection = rng.random(size) < 0.25
+    sct_connection = rng.random(size) < 0.1
+    return (*random_inputs(size, seed), cn_asset_share, cn_connection,
+            uk_connection, hk_connection, sct_connection)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate", type=float, default=DISCOUNT_RATE)
+    parser.add_argument("--backend", default=None)
+    args = parser.parse_args(argv)
+    portfolio = random_portfolio(args.clients, args.seed)
+    started = time.perf_counter()
+    values = evaluate_forums(*portfolio, rate=args.rate,
+                             backend=args.backend)
+    elapsed = time.perf_counter() - started
+    print(f"{args.clients:,} clients triaged in {elapsed * 1e3:.1f} ms")
+    for j, name in enumerate(values.forums):
+        chosen = values.best == j
+        median_net = np.nanmedian(values.net[:, j]) \
+            if values.available[:, j].any() else float("nan")
+        print(f"  {name:<4} available {values.available[:, j].mean():>6.1%}"
+              f"  best {chosen.mean():>6.1%}  median net {median_net:>14,.0f}")
+    print(f"  none available {(values.best < 0).mean():.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
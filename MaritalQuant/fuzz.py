@@ -0,0 +1,234 @@
+"""
+MaritalQuant differential fuzzer.
+
+Generates millions of random scenarios, biased towards the rules' edge
+cases (the 10M needs threshold, marriage_years around 10, zero and
+huge pools, homemaker_years of 0 / 1 / the whole marriage), and runs
+them through the scalar engine and every fast path in
+backends.BACKENDS.  Amounts must agree to the cent, text codes and
+insight flags exactly.
+
+On the first mismatch per path the offending scenario is shrunk to a
+minimal input that still disagrees and printed with both outputs.
+
+Usage (from the MaritalQuant directory):
+  python fuzz.py                       # 2M scenarios, well under a minute
+  python fuzz.py --scenarios 5000000 --seed 7 --max-seconds 50
+
+Exits with status 1 if any path disagrees with the scalar engine.
+tests/test_fuzz.py runs a bounded fuzz under pytest.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from backends import BACKENDS
+from batch import as_columns, insight_flags_batch
+from engine import (
+    SCENARIO_FIELDS, UK_NEEDS_THRESHOLD, ChinaResult, UKResult,
+    calculate_china, calculate_uk, insight_flags,
+)
+
+
+ASSET_EDGES = (0.0, 0.01, 1.0, UK_NEEDS_THRESHOLD - 0.01,
+               float(UK_NEEDS_THRESHOLD), UK_NEEDS_THRESHOLD + 0.01,
+               2.0 * UK_NEEDS_THRESHOLD, 1e9, 1e15)
+YEAR_EDGES = (0, 1, 9, 10, 11, 50, 100)
+EDGE_RATE = 0.25
+TOLERANCE = 0.005
+FAST_PATHS = tuple(name for name in BACKENDS if name != "python")
+
+
+# ===================================================
+# SCENARIO GENERATION
+# ===================================================
+
+def generate(size, rng) -> dict:
+    """Random scenario columns, a quarter of each field drawn from edges."""
+    def edges(values, pool):
+        pick = rng.random(size) < EDGE_RATE
+        values[pick] = rng.choice(pool, pick.sum())
+        return values
+
+    assets = np.round(rng.random(size) * 10.0 ** rng.integers(0, 10, size), 2)
+    near = rng.random(size) < 0.05
+    assets[near] = UK_NEEDS_THRESHOLD + rng.integers(-200, 201, near.sum()) * 0.01
+    assets = edges(assets, ASSET_EDGES)
+    years = edges(rng.integers(0, 101, size), YEAR_EDGES)
+    homemaker_years = edges(rng.integers(0, 101, size), YEAR_EDGES)
+    same = rng.random(size) < 0.1
+    homemaker_years[same] = years[same]
+    return as_columns(assets, years, *(rng.random(size) < 0.5
+                                       for _ in range(2)),
+                      homemaker_years,
+                      *(rng.random(size) < 0.5 for _ in range(2)))
+
+
+# ===================================================
+# COMPARISON
+# ===================================================
+
+def scalar_reference(inputs):
+    """Scalar-engine outputs as (cn matrix, uk matrix, flags)."""
+    args = [inputs[name].tolist() for name in SCENARIO_FIELDS]
+    cn_rows = list(map(calculate_china, *args))
+    uk_rows = list(map(calculate_uk, *args[:5]))
+    flags = np.fromiter(map(insight_flags, cn_rows, uk_rows, args[3],
+                            args[2], args[1]), np.uint8, len(cn_rows))
+    # record[:] is the plain field tuple (iterating a record yields keys).
+    return (np.array([row[:] for row in cn_rows], np.float64),
+            np.array([row[:] for row in uk_rows], np.float64), flags)
+
+
+def fast_outputs(path, inputs):
+    """A fast path's outputs in the same layout as scalar_reference."""
+    cn, uk = BACKENDS[path](inputs)
+    flags = insight_flags_batch(cn, uk, inputs["wife_is_homemaker"],
+                                inputs["has_children"],
+                                inputs["marriage_years"])
+    return (np.column_stack([cn[name] for name in ChinaResult._fields]),
+            np.column_stack([uk[name] for name in UKResult._fields]),
+            flags)
+
+
+def mismatches(reference, outputs, tolerance=TOLERANCE):
+    """Boolean row mask of disagreements and the names of columns involved."""
+    bad_rows = reference[2] != outputs[2]
+    columns = ["insight_flags"] if bad_rows.any() else []
+    for prefix, record_type, expected, actual in (
+            ("cn", ChinaResult, reference[0], outputs[0]),
+            ("uk", UKResult, reference[1], outputs[1])):
+        for i, name in enumerate(record_type._fields):
+            if name in record_type._text_fields:
+                bad = expected[:, i] != actual[:, i]
+            else:
+                bad = ~(np.abs(expected[:, i] - actual[:, i]) <= tolerance)
+            if bad.any():
+                bad_rows |= bad
+                columns.append(f"{prefix}.{name}")
+    return bad_rows, columns
+
+
+def disagrees(path, scenario, tolerance=TOLERANCE) -> list:
+    """Mismatching column names for a single scenario tuple."""
+    inputs = as_columns(*scenario)
+    return mismatches(scalar_reference(inputs), fast_outputs(path, inputs),
+                      tolerance)[1]
+
+
+# ===================================================
+# SHRINKING
+# ===================================================
+
+def _size(value):
+    # Integers are simpler than fractions, then smaller is simpler.
+    return (value != round(value), abs(value))
+
+
+def _candidates(name, value):
+    if isinstance(value, bool):
+        return (False,)
+    if name == "total_assets":
+        return (0.0, float(UK_NEEDS_THRESHOLD), float(round(value)),
+                round(value / 2, 2), round(value - 0.01, 2),
+                float(10 ** int(np.log10(value))) if value >= 1 else 0.0)
+    return (0, 10, 11, value // 2, value - 1)
+
+
+def shrink(path, scenario, tolerance=TOLERANCE) -> tuple:
+    """Greedily simplify a failing scenario while it still disagrees."""
+    scenario = list(scenario)
+    changed = True
+    while changed:
+        changed = False
+        for i, name in enumerate(SCENARIO_FIELDS):
+            for candidate in _candidates(name, scenario[i]):
+                if _size(candidate) >= _size(scenario[i]) \
+                        or (name != "total_assets" and candidate < 0):
+                    continue
+                trial = scenario[:i] + [candidate] + scenario[i + 1:]
+                if disagrees(path, tuple(trial), tolerance):
+                    scenario = trial
+                    changed = True
+                    break
+    return tuple(scenario)
+
+
+def describe(path, scenario, tolerance=TOLERANCE) -> str:
+    inputs = as_columns(*scenario)
+    reference = scalar_reference(inputs)
+    outputs = fast_outputs(path, inputs)
+    lines = [f"  minimal input: {dict(zip(SCENARIO_FIELDS, scenario))}"]
+    for column in mismatches(reference, outputs, tolerance)[1]:
+        if column == "insight_flags":
+            lines.append(f"  insight_flags: scalar={reference[2][0]} "
+                         f"{path}={outputs[2][0]}")
+            continue
+        prefix, name = column.split(".")
+        record_type, index = ((ChinaResult, 0) if prefix == "cn"
+                              else (UKResult, 1))
+        i = record_type._fields.index(name)
+        lines.append(f"  {column}: scalar={reference[index][0, i].item()!r} "
+                     f"{path}={outputs[index][0, i].item()!r}")
+    return "\n".join(lines)
+
+
+# ===================================================
+# RUNNER
+# ===================================================
+
+def run(scenarios=2_000_000, seed=0, chunk_size=250_000, max_seconds=50.0,
+        tolerance=TOLERANCE, paths=FAST_PATHS) -> dict:
+    """Fuzz `paths` against the scalar engine; return {path: minimal input}."""
+    rng = np.random.default_rng(seed)
+    failures = {}
+    started = time.perf_counter()
+    done = 0
+    while done < scenarios:
+        if time.perf_counter() - started > max_seconds:
+            print(f"time budget reached after {done:,} scenarios")
+            break
+        inputs = generate(min(chunk_size, scenarios - done), rng)
+        reference = scalar_reference(inputs)
+        for path in paths:
+            if path in failures:
+                continue
+            bad_rows, columns = mismatches(
+                reference, fast_outputs(path, inputs), tolerance)
+            if columns:
+                row = int(np.flatnonzero(bad_rows)[0])
+                scenario = tuple(inputs[name][row].item()
+                                 for name in SCENARIO_FIELDS)
+                failures[path] = shrink(path, scenario, tolerance)
+                print(f"{path}: MISMATCH in {', '.join(columns)}")
+                print(describe(path, failures[path], tolerance))
+        done += len(inputs["total_assets"])
+    elapsed = time.perf_counter() - started
+    print(f"{done:,} scenarios x {len(paths)} paths in {elapsed:.1f} s "
+          f"({done / elapsed:,.0f} scenarios/s); "
+          f"{len(failures)} path(s) disagree")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", type=int, default=2_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=250_000)
+    parser.add_argument("--max-seconds", type=float, default=50.0,
+                        help="stop generating new chunks after this long")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--path", action="append", choices=FAST_PATHS,
+                        help="fast path(s) to check (default: all)")
+    args = parser.parse_args(argv)
+    failures = run(args.scenarios, args.seed, args.chunk_size,
+                   args.max_seconds, args.tolerance,
+                   tuple(args.path or FAST_PATHS))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
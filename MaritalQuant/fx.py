@@ -0,0 +1,155 @@
+"""
+MaritalQuant FX rates and currency conversion.
+
+The engines work in one base currency, CNY, so every amount they
+produce is in yuan.  This module converts inputs held in other
+currencies into the base and converts outputs for display:
+
+  rates     a local, dated CSV (date, currency, rate), where rate is
+            CNY per unit of the currency.  No network access.  The
+            bundled fx_rates.csv holds illustrative year-start rates;
+            point MARITALQUANT_FX_TABLE at your own file to replace it.
+  cache     the file is read once per process (and again only when its
+            mtime changes) into an FxTable: a date index and a dense
+            (dates, currencies) rate matrix, forward-filled, so a rate
+            lookup is one searchsorted and one fancy index.
+  convert   FxTable.to_base / convert work on whole arrays of amounts,
+            currencies and dates.  Results are converted for display
+            only when shown (Display, format_money), so switching the
+            display currency never recomputes an outcome.
+
+The engines' sterling rule amounts (engine.UK_HOMEMAKER_RATE_GBP) are
+converted into CNY with this table's latest GBP rate.
+
+Usage:
+  table = get_table()
+  cny = table.to_base([100_000, 50_000], ["GBP", "HKD"])
+  display = table.display("GBP")
+"""
+
+import os
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+BASE_CURRENCY = "CNY"
+DEFAULT_FX_PATH = Path(__file__).with_name("fx_rates.csv")
+ENV_VAR = "MARITALQUANT_FX_TABLE"
+
+SYMBOLS = {"CNY": "\u00a5", "GBP": "\u00a3", "HKD": "HK$", "USD": "$",
+           "EUR": "\u20ac"}
+
+Display = namedtuple("Display", "currency symbol rate")
+Display.__doc__ = "How to show base amounts: amount / rate, after symbol."
+
+BASE_DISPLAY = Display(BASE_CURRENCY, SYMBOLS[BASE_CURRENCY], 1.0)
+
+
+# ===================================================
+# RATE TABLE
+# ===================================================
+
+class FxTable:
+    """Dated CNY-per-unit rates, indexed for vectorised lookup."""
+
+    def __init__(self, dates, currencies, rates):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.currencies = tuple(currencies)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self._sorted = np.array(sorted(self.currencies))
+        self._order = np.array([self.currencies.index(c)
+                                for c in self._sorted])
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build from long rows (date, currency, rate); adds the base."""
+        df = df.assign(
+            date=pd.to_datetime(df["date"], format="ISO8601"),
+            currency=df["currency"].astype(str).str.strip().str.upper())
+        if (df["rate"] <= 0).any() or df["rate"].isna().any():
+            raise ValueError("FX rates must be positive numbers")
+        wide = df.pivot_table(index="date", columns="currency",
+                              values="rate", aggfunc="last").sort_index()
+        wide = wide.ffill()
+        wide[BASE_CURRENCY] = 1.0
+        currencies = [BASE_CURRENCY] + sorted(set(wide.columns)
+                                              - {BASE_CURRENCY})
+        return cls(wide.index.to_numpy().astype("datetime64[D]"),
+                   currencies, wide[currencies].to_numpy())
+
+    @property
+    def latest_date(self):
+        return self.dates[-1]
+
+    def codes(self, currencies) -> np.ndarray:
+        """Column index of each currency code (array or scalar)."""
+        if np.ndim(currencies) == 0:
+            return self._codes_of([currencies])[0]
+        # Normalise and look up only the distinct codes.
+        inverse, distinct = pd.factorize(np.ravel(currencies))
+        return self._codes_of(distinct)[inverse].reshape(np.shape(currencies))
+
+    def _codes_of(self, currencies):
+        names = np.array([str(c).strip().upper() for c in currencies])
+        pos = np.minimum(np.searchsorted(self._sorted, names),
+                         len(self._sorted) - 1)
+        bad = self._sorted[pos] != names
+        if bad.any():
+            raise KeyError("no FX rate for currency "
+                           + ", ".join(sorted(set(names[bad]))))
+        return self._order[pos]
+
+    def lookup(self, currencies, dates=None) -> np.ndarray:
+        """CNY per unit for each (currency, date); latest if no dates."""
+        codes = self.codes(currencies)
+        if dates is None:
+            rows = np.full(np.shape(codes), len(self.dates) - 1)
+        else:
+            rows = np.searchsorted(
+                self.dates, np.asarray(dates, dtype="datetime64[D]"),
+                side="right") - 1
+        if np.any(rows < 0):
+            raise ValueError(f"date before the first FX rate "
+                             f"({self.dates[0]})")
+        rates = self.rates[rows, codes]
+        if np.any(np.isnan(rates)):
+            raise ValueError("no FX rate quoted yet for some "
+                             "currency/date pairs")
+        return rates
+
+    def to_base(self, amounts, currencies, dates=None) -> np.ndarray:
+        """Amounts in their own currencies converted to CNY."""
+        return np.asarray(amounts, dtype=np.float64) \
+            * self.lookup(currencies, dates)
+
+    def convert(self, amounts, source, target, dates=None) -> np.ndarray:
+        """Amounts converted from `source` to `target` currencies."""
+        return self.to_base(amounts, source, dates) \
+            / self.lookup(target, dates)
+
+    def display(self, currency, date=None) -> Display:
+        """Display settings for showing CNY amounts in `currency`."""
+        code = str(currency).upper()
+        rate = float(self.lookup(code, date))
+        return Display(code, SYMBOLS.get(code, code), rate)
+
+
+@lru_cache(maxsize=4)
+def _load(path, mtime):
+    return FxTable.from_frame(pd.read_csv(path))
+
+
+def get_table(path=None) -> FxTable:
+    """The FX table at `path` (or $MARITALQUANT_FX_TABLE, or the bundled
+    file), read once and cached until the file changes."""
+    path = Path(path or os.environ.get(ENV_VAR) or DEFAULT_FX_PATH)
+    return _load(str(path), path.stat().st_mtime_ns)
+
+
+def format_money(amount, display=BASE_DISPLAY, decimals=0) -> str:
+    """A CNY amount shown in the display currency."""
+    return f"{display.symbol} {amount / display.rate:,.{decimals}f}"
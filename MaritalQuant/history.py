@@ -0,0 +1,354 @@
+"""
+MaritalQuant scenario history.
+
+Every calculated scenario is kept in a local SQLite file, so advisers
+can list, filter and reopen past work across sessions and reloads:
+
+  scenarios  one row per calculation: client, timestamp, input hash,
+             the seven engine inputs, the selected jurisdictions, the
+             CN/UK totals for listing, and the sidebar form that
+             produced it (JSON) so reopening restores the inputs.
+             Indexed on (client, created), created and input_hash.
+  results    one row per distinct input hash: the CN and UK records
+             and every registered jurisdiction's summary (JSON).
+             Identical scenarios share a row, and reopening serves
+             results from here instead of recomputing them.
+
+The input hash covers the seven inputs and results_version(): the
+engine rules (lookup.RULES_VERSION), the knowledge base version and
+every registered jurisdiction's calculator, rates and enforcement rate.
+After any of those change, an old entry's hash no longer matches its
+inputs' current hash, so reopening it recomputes instead of serving
+stale figures.
+  clients    one row per client name with its latest timestamp, so
+             the client list does not scan the scenarios.
+
+Lists are keyset-paginated (created, id) and never count, so a page
+costs an index range scan whatever the table size.  The file is opened
+in WAL mode through one connection per process, created (and the schema
+applied) on first use and shared by every thread behind a lock, so
+Streamlit reruns, which run on fresh threads, reuse it instead of
+opening another.
+
+The path is $MARITALQUANT_HISTORY_DB, else history.sqlite3 next to this
+module.
+
+Usage:
+  entry_id = HISTORY.record("Client A", key, results, ("CN", "UK"))
+  page = HISTORY.list(client="Client A", limit=50)
+  entry, form = HISTORY.get(page[0].id)
+  results = HISTORY.results(entry.input_hash)
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from batch import TEXT_CODES
+from engine import SCENARIO_FIELDS, ChinaResult, UKResult
+from jurisdictions import JURISDICTIONS
+from legal_data import KB_VERSION
+from lookup import RULES_VERSION
+from session_store import scenario_key
+
+
+DEFAULT_HISTORY_PATH = Path(__file__).with_name("history.sqlite3")
+ENV_VAR = "MARITALQUANT_HISTORY_DB"
+DEFAULT_PAGE_SIZE = 50
+
+HistoryEntry = namedtuple("HistoryEntry", (
+    "id", "client", "created", "input_hash") + SCENARIO_FIELDS + (
+    "jurisdictions", "cn_total", "uk_total"))
+HistoryEntry.__doc__ = "One listed scenario; created is a Unix timestamp."
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    input_hash TEXT PRIMARY KEY,
+    payload    TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scenarios (
+    id                   INTEGER PRIMARY KEY,
+    client               TEXT NOT NULL,
+    created              REAL NOT NULL,
+    input_hash           TEXT NOT NULL,
+    total_assets         REAL NOT NULL,
+    marriage_years       INTEGER NOT NULL,
+    has_children         INTEGER NOT NULL,
+    wife_is_homemaker    INTEGER NOT NULL,
+    homemaker_years      INTEGER NOT NULL,
+    home_in_husband_name INTEGER NOT NULL,
+    husband_has_fault    INTEGER NOT NULL,
+    jurisdictions        TEXT NOT NULL,
+    cn_total             REAL NOT NULL,
+    uk_total             REAL NOT NULL,
+    form                 TEXT
+);
+CREATE INDEX IF NOT EXISTS scenarios_client_created
+    ON scenarios (client, created, id);
+CREATE INDEX IF NOT EXISTS scenarios_created ON scenarios (created, id);
+CREATE INDEX IF NOT EXISTS scenarios_input_hash
+    ON scenarios (input_hash, created, id);
+CREATE TABLE IF NOT EXISTS clients (
+    name      TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS clients_last_seen ON clients (last_seen);
+"""
+
+_LIST_COLUMNS = ", ".join(HistoryEntry._fields)
+
+# Positions in a HistoryEntry row of the boolean inputs (stored as
+# integers) and of the comma-joined jurisdictions.
+BOOL_FIELDS = ("has_children", "wife_is_homemaker", "home_in_husband_name",
+               "husband_has_fault")
+_BOOL_INDEXES = tuple(HistoryEntry._fields.index(name)
+                      for name in BOOL_FIELDS)
+_JURISDICTIONS_INDEX = HistoryEntry._fields.index("jurisdictions")
+
+
+@lru_cache(maxsize=64)
+def _calculator_source(calculator) -> str:
+    return inspect.getsource(calculator)
+
+
+@lru_cache(maxsize=16)
+def _version(registry) -> str:
+    parts = [RULES_VERSION, KB_VERSION]
+    for code, inputs, calculator, rates, enforcement_rate in registry:
+        parts += [code, repr(inputs), _calculator_source(calculator),
+                  rates, repr(enforcement_rate)]
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()[:16]
+
+
+def results_version() -> str:
+    """Fingerprint of the rules stored results were computed with."""
+    return _version(tuple(
+        (code, j.inputs, j.calculator,
+         json.dumps(j.rates, sort_keys=True), j.enforcement_rate)
+        for code, j in JURISDICTIONS.items()))
+
+
+def input_hash(key, version=None) -> str:
+    """Stable hash of one scenario_key under the current rules.
+
+    Pass results_version() as `version` when hashing many keys.
+    """
+    key = scenario_key(*key)
+    version = results_version() if version is None else version
+    payload = json.dumps([version, float(key[0]), *key[1:]])
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _pack_record(record) -> list:
+    return [int(value) if name in record._text_fields else float(value)
+            for name, value in record._asdict().items()]
+
+
+def _unpack_record(values, record_type):
+    return record_type(*(
+        TEXT_CODES[name](value) if name in record_type._text_fields
+        else value
+        for name, value in zip(record_type._fields, values)))
+
+
+def pack_results(cn, uk, outcomes) -> str:
+    """JSON for the results table: CN/UK records and summaries."""
+    return json.dumps({"cn": _pack_record(cn), "uk": _pack_record(uk),
+                       "outcomes": outcomes})
+
+
+def unpack_results(payload) -> dict:
+    """{"cn": ChinaResult, "uk": UKResult, "outcomes": {code: summary}}."""
+    data = json.loads(payload)
+    return {"cn": _unpack_record(data["cn"], ChinaResult),
+            "uk": _unpack_record(data["uk"], UKResult),
+            "outcomes": data["outcomes"]}
+
+
+# ===================================================
+# STORE
+# ===================================================
+
+class ScenarioHistory:
+    """SQLite-backed scenario history, safe to share between threads."""
+
+    def __init__(self, path=None):
+        self._path = path
+        self._conn = None
+        self._conn_path = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return Path(self._path or os.environ.get(ENV_VAR)
+                    or DEFAULT_HISTORY_PATH)
+
+    @contextmanager
+    def _connection(self):
+        """Hold the lock and yield the shared connection.
+
+        The connection is (re)opened when the path changes, e.g. when
+        $MARITALQUANT_HISTORY_DB is set after import.
+        """
+        path = str(self.path)
+        with self._lock:
+            if self._conn is None or self._conn_path != path:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                conn = sqlite3.connect(path, timeout=30,
+                                       check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+                self._conn, self._conn_path = conn, path
+            yield self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def record(self, client, key, results, jurisdictions=(), form=None,
+               created=None) -> int:
+        """Store one calculated scenario; returns its id.
+
+        `results` is {"cn": ChinaResult, "uk": UKResult, "outcomes":
+        {code: summary}}; it is written once per distinct input hash.
+        """
+        return self.record_many([(client, key, results, jurisdictions,
+                                  form, created)])[0]
+
+    def record_many(self, rows) -> list:
+        """record() for many (client, key, results, jurisdictions, form,
+        created) rows in one transaction; returns their ids."""
+        now = time.time()
+        version = results_version()
+        packed, scenarios, last_seen = {}, [], {}
+        for client, key, results, jurisdictions, form, created in rows:
+            key = scenario_key(*key)
+            digest = input_hash(key, version)
+            created = now if created is None else created
+            if digest not in packed:
+                packed[digest] = pack_results(
+                    results["cn"], results["uk"], results["outcomes"])
+            scenarios.append((
+                client, created, digest, *key, ",".join(jurisdictions),
+                results["cn"]["total"], results["uk"]["total"],
+                None if form is None else json.dumps(form)))
+            last_seen[client] = max(created, last_seen.get(client, created))
+
+        with self._connection() as conn:
+            # Take the write lock first so the ids assigned below are
+            # ours even with other processes writing the same file.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                first = conn.execute(
+                    "SELECT coalesce(max(id), 0) + 1 FROM scenarios"
+                ).fetchone()[0]
+                ids = list(range(first, first + len(scenarios)))
+                # Same hash, same inputs and rules: the new payload
+                # replaces the old one rather than being dropped.
+                conn.executemany(
+                    "INSERT INTO results VALUES (?, ?) "
+                    "ON CONFLICT (input_hash) "
+                    "DO UPDATE SET payload = excluded.payload",
+                    packed.items())
+                conn.executemany(
+                    f"INSERT INTO scenarios ({_LIST_COLUMNS}, form) "
+                    f"VALUES ({', '.join('?' * 15)})",
+                    [(entry_id, *row)
+                     for entry_id, row in zip(ids, scenarios)])
+                conn.executemany(
+                    "INSERT INTO clients VALUES (?, ?) ON CONFLICT (name) "
+                    "DO UPDATE SET last_seen = "
+                    "max(last_seen, excluded.last_seen)",
+                    last_seen.items())
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return ids
+
+    def list(self, client=None, since=None, until=None, input_hash=None,
+             before=None, limit=DEFAULT_PAGE_SIZE) -> list:
+        """Newest-first HistoryEntry page matching the filters.
+
+        since/until bound `created` (Unix timestamps, until exclusive);
+        pass the last entry of a page as `before` for the next page.
+        """
+        where, params = [], []
+        for column, op, value in (
+                ("client", "=", client), ("input_hash", "=", input_hash),
+                ("created", ">=", since), ("created", "<", until)):
+            if value is not None:
+                where.append(f"{column} {op} ?")
+                params.append(value)
+        if before is not None:
+            where.append("(created, id) < (?, ?)")
+            params += [before.created, before.id]
+        sql = f"SELECT {_LIST_COLUMNS} FROM scenarios"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created DESC, id DESC LIMIT ?"
+        with self._connection() as conn:
+            rows = conn.execute(sql, params + [limit]).fetchall()
+        return [self._entry(row) for row in rows]
+
+    @staticmethod
+    def _entry(row):
+        row = list(row)
+        for i in _BOOL_INDEXES:
+            row[i] = bool(row[i])
+        codes = row[_JURISDICTIONS_INDEX]
+        row[_JURISDICTIONS_INDEX] = tuple(codes.split(",")) if codes else ()
+        return HistoryEntry(*row)
+
+    def clients(self, limit=None) -> list:
+        """Client names, most recently active first."""
+        sql = "SELECT name FROM clients ORDER BY last_seen DESC"
+        params = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [name for (name,) in rows]
+
+    def get(self, entry_id):
+        """(HistoryEntry, form dict or None) for one id; KeyError if gone."""
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT {_LIST_COLUMNS}, form FROM scenarios WHERE id = ?",
+                (entry_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"no scenario with id {entry_id}")
+        form = None if row[-1] is None else json.loads(row[-1])
+        return self._entry(row[:-1]), form
+
+    def results(self, digest) -> dict:
+        """Stored results for an input hash (see unpack_results)."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT payload FROM results WHERE input_hash = ?",
+                (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"no stored results for {digest}")
+        return unpack_results(row[0])
+
+
+def entry_key(entry) -> tuple:
+    """The scenario_key of a HistoryEntry."""
+    return scenario_key(*(getattr(entry, name) for name in SCENARIO_FIELDS))
+
+
+HISTORY = ScenarioHistory()
@@ -0,0 +1,259 @@
+"""
+MaritalQuant jurisdiction registry.
+
+Each jurisdiction registers a vectorised calculator together with the
+scenario inputs it reads and how it is labelled in the dashboard.
+calculate_outcomes prepares the seven scenario inputs once (typed,
+broadcast columns) and runs any subset of the registered calculators
+over them; the CN and UK calculators use the batch engine's prepared-
+column entry points, so nothing is normalised twice.  Adding a
+jurisdiction adds one array computation per batch, never a loop over
+scenarios.
+
+Every calculator returns a dict of columns that includes the common
+SUMMARY_FIELDS:
+
+  pool          the divisible pool
+  sharing       the sharing base (after any discount)
+  compensation  compensation for the homemaker's contribution / loss
+  adjustments   everything else on top (fault, children, needs uplift)
+  total         the wife's total award
+
+plus any jurisdiction-specific columns (the CN and UK calculators
+return the full batch engine columns).
+
+Registered:
+  CN   Civil Code (batch engine)
+  UK   England & Wales, White v White / Miller (batch engine)
+  HK   LKW v DD [2010] HKCFA: equal-sharing yardstick, departures for
+       needs; homemaking counts as an equal contribution, with no
+       separate compensation head
+  SCT  Family Law (Scotland) Act 1985 s9-s10: fair (equal) sharing of
+       matrimonial property, plus s9(1)(b) economic disadvantage and
+       s9(1)(c) the burden of childcare, capped at the pool
+
+A calculator is called as fn(rates, **columns) with its entry's
+`rates`.  The HK and Scotland rates are illustrative, like the CN/UK
+engines'; register entry._replace(rates=...) to change them.  The
+Scottish economic-disadvantage rate is in sterling and converted at the
+engines' GBP rate (engine.gbp_to_cny).
+record_summary derives the CN / UK summary from an engine record that
+is already at hand instead of recomputing it.
+
+Usage:
+  from jurisdictions import calculate_outcomes
+  outcomes = calculate_outcomes(*scenario_columns, codes=("CN", "HK"))
+  outcomes["HK"]["total"]
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from batch import as_columns, china_columns, uk_columns
+from engine import SCENARIO_FIELDS, ChinaResult, UKResult, gbp_to_cny
+
+
+SUMMARY_FIELDS = ("pool", "sharing", "compensation", "adjustments", "total")
+
+Jurisdiction = namedtuple("Jurisdiction", [
+    "code",
+    "name",
+    "flag",
+    "inputs",            # the SCENARIO_FIELDS the calculator reads
+    "calculator",        # fn(rates, **columns) -> dict of columns
+    "rates",             # the calculator's parameters; None if built in
+    "enforcement_rate",
+    "colors",            # three chart shades, darkest last
+    "header",            # CSS background for the dashboard header
+    "basis",             # one-line legal basis
+])
+
+JURISDICTIONS = {}
+
+
+def register(jurisdiction):
+    """Add (or replace) a jurisdiction in the registry."""
+    unknown = set(jurisdiction.inputs) - set(SCENARIO_FIELDS)
+    if unknown:
+        raise ValueError(f"{jurisdiction.code} reads unknown input(s): "
+                         f"{', '.join(sorted(unknown))}")
+    JURISDICTIONS[jurisdiction.code] = jurisdiction
+    return jurisdiction
+
+
+def label(code) -> str:
+    jurisdiction = JURISDICTIONS[code]
+    return f"{jurisdiction.flag} {jurisdiction.name}"
+
+
+# ===================================================
+# CALCULATORS
+# ===================================================
+
+# The summary heads of the engine columns; these also apply to a
+# single record's values (see record_summary).
+def _china_summary(cn):
+    cn["sharing"] = cn["effective_share"]
+    cn["adjustments"] = cn["fault_adjustment"] + cn["children_adjustment"]
+    return cn
+
+
+def _uk_summary(uk):
+    uk["sharing"] = uk["sharing_base"]
+    uk["adjustments"] = np.maximum(
+        0, uk["total"] - uk["sharing_base"] - uk["compensation"])
+    return uk
+
+
+def _china(rates, **columns):
+    return _china_summary(china_columns(columns))
+
+
+def _uk(rates, **columns):
+    return _uk_summary(uk_columns(columns))
+
+
+def _hong_kong(rates, total_assets, has_children):
+    sharing = total_assets * rates["sharing"]
+    needs = np.where(has_children & (total_assets < rates["needs_ceiling"]),
+                     total_assets * rates["needs_share"], sharing)
+    total = np.maximum(sharing, needs)
+    return {"pool": total_assets, "sharing": sharing,
+            "compensation": np.zeros_like(total_assets),
+            "adjustments": total - sharing, "total": total}
+
+
+def _scotland(rates, total_assets, has_children, wife_is_homemaker,
+              homemaker_years):
+    sharing = total_assets * rates["sharing"]
+    compensation = np.where(
+        wife_is_homemaker,
+        homemaker_years * (rates["disadvantage_per_year_gbp"] * gbp_to_cny()),
+        0)
+    childcare = np.where(has_children,
+                         total_assets * rates["childcare_share"], 0)
+    total = np.minimum(sharing + compensation + childcare, total_assets)
+    return {"pool": total_assets, "sharing": sharing,
+            "compensation": compensation.astype(np.float64),
+            "adjustments": total - sharing - compensation, "total": total}
+
+
+register(Jurisdiction(
+    "CN", "China", "\U0001f1e8\U0001f1f3", SCENARIO_FIELDS, _china,
+    None, ChinaResult.enforcement_rate, ("#fb923c", "#f97316", "#ea580c"),
+    "linear-gradient(135deg, #c2410c, #ea580c)",
+    "Civil Code Art 1087 (principle of caring for the wife)"))
+register(Jurisdiction(
+    "UK", "England & Wales", "\U0001f1ec\U0001f1e7", SCENARIO_FIELDS[:5],
+    _uk, None, UKResult.enforcement_rate, ("#4ade80", "#22c55e", "#16a34a"),
+    "linear-gradient(135deg, #1d4ed8, #2563eb)",
+    "MCA 1973 s25; White v White, Miller / McFarlane"))
+register(Jurisdiction(
+    "HK", "Hong Kong", "\U0001f1ed\U0001f1f0",
+    ("total_assets", "has_children"), _hong_kong,
+    {"sharing": 0.50, "needs_share": 0.55, "needs_ceiling": 10_000_000}, 0.75,
+    ("#c084fc", "#a855f7", "#9333ea"),
+    "linear-gradient(135deg, #7e22ce, #9333ea)",
+    "MPPO s7; LKW v DD [2010] HKCFA (equal sharing yardstick)"))
+register(Jurisdiction(
+    "SCT", "Scotland",
+    "\U0001f3f4\U000e0067\U000e0062\U000e0073\U000e0063\U000e0074\U000e007f",
+    ("total_assets", "has_children", "wife_is_homemaker", "homemaker_years"),
+    _scotland,
+    {"sharing": 0.50, "disadvantage_per_year_gbp": 50_000,
+     "childcare_share": 0.05},
+    0.78, ("#60a5fa", "#3b82f6", "#2563eb"),
+    "linear-gradient(135deg, #1e3a8a, #1d4ed8)",
+    "Family Law (Scotland) Act 1985 ss9-10"))
+
+
+# ===================================================
+# EVALUATION
+# ===================================================
+
+def calculate_outcomes(total_assets, marriage_years, has_children,
+                       wife_is_homemaker, homemaker_years,
+                       home_in_husband_name, husband_has_fault,
+                       codes=None) -> dict:
+    """{code: columns} for `codes` (default: every registered one).
+
+    The inputs are prepared once and shared by every calculator.
+    """
+    columns = as_columns(total_assets, marriage_years, has_children,
+                         wife_is_homemaker, homemaker_years,
+                         home_in_husband_name, husband_has_fault)
+    codes = tuple(JURISDICTIONS) if codes is None else tuple(codes)
+    outcomes = {}
+    for code in codes:
+        jurisdiction = JURISDICTIONS[code]
+        outcomes[code] = jurisdiction.calculator(
+            jurisdiction.rates,
+            **{name: columns[name] for name in jurisdiction.inputs})
+    return outcomes
+
+
+def _summary_values(code, result) -> dict:
+    values = {name: float(result[name][0]) for name in SUMMARY_FIELDS}
+    values["enforcement_rate"] = JURISDICTIONS[code].enforcement_rate
+    return values
+
+
+def summary(code, *inputs) -> dict:
+    """SUMMARY_FIELDS of one scenario as floats, plus enforcement_rate.
+
+    `inputs` are the jurisdiction's own `inputs`, in that order.
+    """
+    jurisdiction = JURISDICTIONS[code]
+    columns = as_columns(**{**dict.fromkeys(SCENARIO_FIELDS, 0),
+                            **dict(zip(jurisdiction.inputs, inputs))})
+    return _summary_values(code, jurisdiction.calculator(
+        jurisdiction.rates,
+        **{name: columns[name] for name in jurisdiction.inputs}))
+
+
+_RECORD_SUMMARIES = {"CN": _china_summary, "UK": _uk_summary}
+
+
+def record_summary(code, record) -> dict:
+    """summary() for "CN" or "UK" from that engine's result record."""
+    values = _RECORD_SUMMARIES[code](
+        {name: record[name] for name in record._fields})
+    values = {name: float(values[name]) for name in SUMMARY_FIELDS}
+    values["enforcement_rate"] = JURISDICTIONS[code].enforcement_rate
+    return values
+
+
+def summaries(total_assets, marriage_years, has_children, wife_is_homemaker,
+              homemaker_years, home_in_husband_name, husband_has_fault,
+              codes=None) -> dict:
+    """{code: summary} for one scenario given all seven inputs."""
+    outcomes = calculate_outcomes(
+        total_assets, marriage_years, has_children, wife_is_homemaker,
+        homemaker_years, home_in_husband_name, husband_has_fault, codes)
+    return {code: _summary_values(code, result)
+            for code, result in outcomes.items()}
+
+
+def gap_metrics(outcomes, baseline) -> dict:
+    """Per jurisdiction, gaps against `baseline` for every scenario.
+
+    {code: {"total", "compensation", "enforcement", "ratio"}}; ratio is
+    nan where the baseline awards nothing.
+    """
+    base = outcomes[baseline]
+    base_rate = JURISDICTIONS[baseline].enforcement_rate
+    gaps = {}
+    for code, columns in outcomes.items():
+        total = np.asarray(columns["total"], dtype=np.float64)
+        base_total = np.asarray(base["total"], dtype=np.float64)
+        gaps[code] = {
+            "total": total - base_total,
+            "compensation": np.asarray(columns["compensation"])
+            - np.asarray(base["compensation"]),
+            "enforcement": JURISDICTIONS[code].enforcement_rate - base_rate,
+            "ratio": np.divide(total, base_total,
+                               out=np.full_like(total, np.nan),
+                               where=base_total > 0),
+        }
+    return gaps
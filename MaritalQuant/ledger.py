@@ -0,0 +1,263 @@
+"""
+MaritalQuant itemised asset ledger.
+
+Replaces the single total_assets number with a ledger of items (one
+row per asset, any number of households per file) and classifies every
+item into each jurisdiction's pools with array operations:
+
+  CN  Art 1062 joint property, except Art 1063 separate property:
+      pre-marital assets, personal-injury compensation, personal
+      necessities, and gifts or inheritances designated to one spouse.
+  UK  White v White / Miller matrimonial property, excluding
+      pre-marital, gifted and inherited assets and injury awards;
+      the matrimonial home is always matrimonial, and in marriages
+      over 10 years non-matrimonial assets are treated as mingled
+      (matching the engine's Mingling note).
+
+Pools are summed per household with np.bincount and fed to the CN and
+UK batch engines separately (each sees its own pool as total_assets).
+A 10k-item ledger classifies in well under a millisecond; reading and
+validating the CSV itself takes a few tens of milliseconds.
+
+CSV columns:
+  household, description, value, acquired (YYYY-MM-DD), source,
+  owner, designated, is_home
+
+  source      earned | gift | inheritance | injury_compensation | personal
+  owner       joint | husband | wife
+  designated  gift/inheritance designated to one spouse only (bool)
+  is_home     the family home (bool)
+              booleans are true/false, yes/no or 1/0 in any case; a
+              blank cell is false
+  currency    optional ISO code of `value` (default CNY); values are
+              converted to CNY with the local FX table (fx.py) at the
+              valuation date, --as-of (default: the latest rate)
+
+Usage (from the MaritalQuant directory):
+  python ledger.py assets.csv --marriage-date 2012-05-01 --marriage-years 12
+"""
+
+import argparse
+import sys
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from batch import calculate_china_batch, calculate_uk_batch
+from fx import get_table
+
+
+SOURCES = ("earned", "gift", "inheritance", "injury_compensation",
+           "personal")
+OWNERS = ("joint", "husband", "wife")
+LEDGER_COLUMNS = ("household", "description", "value", "acquired", "source",
+                  "owner", "designated", "is_home")
+
+_BOOL_TEXT = {"true": True, "yes": True, "1": True, "1.0": True,
+              "false": False, "no": False, "0": False, "0.0": False,
+              "": False}
+
+_EARNED, _GIFT, _INHERITANCE, _INJURY, _PERSONAL = range(len(SOURCES))
+_HUSBAND = OWNERS.index("husband")
+
+Ledger = namedtuple("Ledger", [
+    "households",   # household labels; the other fields index into this
+    "household",    # int code per item
+    "value",        # float64 per item
+    "acquired",     # datetime64[D] per item
+    "source",       # int8 index into SOURCES
+    "owner",        # int8 index into OWNERS
+    "designated",   # bool per item
+    "is_home",      # bool per item
+])
+
+LedgerPools = namedtuple("LedgerPools", [
+    "households", "cn_joint", "cn_separate", "uk_matrimonial",
+    "uk_non_matrimonial", "home_in_husband_name",
+])
+LedgerPools.__doc__ = "Per-household pool totals, in `households` order."
+
+
+# ===================================================
+# LOADING
+# ===================================================
+
+def _codes(series, labels, name):
+    categorical = pd.Categorical(series.str.strip().str.lower(),
+                                 categories=labels)
+    if (categorical.codes < 0).any():
+        bad = sorted(set(series[categorical.codes < 0]))
+        raise ValueError(f"unknown {name} value(s): {', '.join(bad)}; "
+                         f"expected one of {', '.join(labels)}")
+    return categorical.codes.astype(np.int8)
+
+
+def parse_bools(series):
+    """(values, invalid) boolean arrays for a CSV column of flags.
+
+    true/false, yes/no and 1/0 in any case (and pandas' own booleans)
+    parse; blank cells are False.  Anything else is False in `values`
+    and True in `invalid`.
+    """
+    text = series.astype("string").str.strip().str.lower().fillna("")
+    parsed = text.map(_BOOL_TEXT)
+    invalid = parsed.isna().to_numpy()
+    return parsed.fillna(False).to_numpy(dtype=bool), invalid
+
+
+def _bools(series, name):
+    values, invalid = parse_bools(series)
+    if invalid.any():
+        bad = sorted(set(series[invalid].astype(str)))
+        raise ValueError(f"unknown {name} value(s): {', '.join(bad)}; "
+                         f"expected true/false, yes/no or 1/0")
+    return values
+
+
+def _dates(series, name):
+    """Day dates; blank or unparseable cells raise, naming their rows."""
+    dates = pd.to_datetime(series, format="ISO8601", errors="coerce")
+    invalid = dates.isna().to_numpy()
+    if invalid.any():
+        bad = ", ".join(f"{row} ({value!r})" for row, value
+                        in series[invalid].head(10).items())
+        raise ValueError(f"missing or invalid {name} date in "
+                         f"{invalid.sum()} row(s): {bad}")
+    return dates.to_numpy().astype("datetime64[D]")
+
+
+def from_frame(df, as_of=None) -> Ledger:
+    """Build a Ledger from a DataFrame with LEDGER_COLUMNS.
+
+    With a "currency" column, values are converted to CNY at the
+    `as_of` date's rates (the latest rates if None).
+    """
+    missing = [c for c in LEDGER_COLUMNS
+               if c not in df.columns and c != "description"]
+    if missing:
+        raise KeyError(f"ledger has no column(s): {', '.join(missing)}")
+    household, households = pd.factorize(df["household"], sort=True)
+    value = df["value"].to_numpy(dtype=np.float64)
+    if np.isnan(value).any() or (value < 0).any():
+        raise ValueError("ledger values must be non-negative numbers")
+    if "currency" in df.columns:
+        currency = df["currency"].fillna("CNY").astype(str).to_numpy()
+        dates = None if as_of is None else np.full(len(value), as_of,
+                                                   dtype="datetime64[D]")
+        value = get_table().to_base(value, currency, dates)
+    return Ledger(
+        households=np.asarray(households),
+        household=household,
+        value=value,
+        acquired=_dates(df["acquired"], "acquired"),
+        source=_codes(df["source"].astype(str), SOURCES, "source"),
+        owner=_codes(df["owner"].astype(str), OWNERS, "owner"),
+        designated=_bools(df["designated"], "designated"),
+        is_home=_bools(df["is_home"], "is_home"),
+    )
+
+
+def read_ledger(path, as_of=None) -> Ledger:
+    df = pd.read_csv(path, dtype={"household": str, "source": str,
+                                  "owner": str, "currency": str})
+    return from_frame(df, as_of)
+
+
+# ===================================================
+# CLASSIFICATION
+# ===================================================
+
+def _per_item(ledger, per_household, dtype):
+    """Broadcast a scalar or per-household array to one value per item."""
+    values = np.asarray(per_household, dtype=dtype)
+    return values if values.ndim == 0 else values[ledger.household]
+
+
+def classify(ledger, marriage_date, marriage_years):
+    """(cn_joint, uk_matrimonial) boolean masks, one entry per item.
+
+    marriage_date and marriage_years are scalars or arrays in
+    ledger.households order.
+    """
+    married = _per_item(ledger, marriage_date, "datetime64[D]")
+    years = _per_item(ledger, marriage_years, np.int64)
+    pre_marital = ledger.acquired < married
+    source = ledger.source
+
+    cn_separate = (pre_marital | (source == _INJURY)
+                   | (source == _PERSONAL)
+                   | (((source == _GIFT) | (source == _INHERITANCE))
+                      & ledger.designated))
+    uk_non_matrimonial = ((pre_marital | (source == _GIFT)
+                           | (source == _INHERITANCE) | (source == _INJURY))
+                          & ~ledger.is_home & (years <= 10))
+    return ~cn_separate, ~uk_non_matrimonial
+
+
+def pools(ledger, marriage_date, marriage_years) -> LedgerPools:
+    """Sum each household's items into its CN and UK pools."""
+    cn_joint, uk_matrimonial = classify(ledger, marriage_date,
+                                        marriage_years)
+    count = len(ledger.households)
+
+    def total(mask):
+        return np.bincount(ledger.household, ledger.value * mask,
+                           minlength=count)
+
+    husband_home = np.bincount(
+        ledger.household, ledger.is_home & (ledger.owner == _HUSBAND),
+        minlength=count) > 0
+    return LedgerPools(
+        households=ledger.households,
+        cn_joint=total(cn_joint),
+        cn_separate=total(~cn_joint),
+        uk_matrimonial=total(uk_matrimonial),
+        uk_non_matrimonial=total(~uk_matrimonial),
+        home_in_husband_name=husband_home,
+    )
+
+
+def ledger_outcomes(ledger, marriage_date, marriage_years, has_children,
+                    wife_is_homemaker, homemaker_years, husband_has_fault):
+    """(pools, cn_columns, uk_columns), one row per ledger household.
+
+    The non-ledger inputs are scalars or arrays in households order;
+    home_in_husband_name comes from the ledger's is_home/owner columns.
+    """
+    pool = pools(ledger, marriage_date, marriage_years)
+    cn = calculate_china_batch(
+        pool.cn_joint, marriage_years, has_children, wife_is_homemaker,
+        homemaker_years, pool.home_in_husband_name, husband_has_fault)
+    uk = calculate_uk_batch(
+        pool.uk_matrimonial, marriage_years, has_children,
+        wife_is_homemaker, homemaker_years)
+    return pool, cn, uk
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="ledger CSV")
+    parser.add_argument("--marriage-date", required=True)
+    parser.add_argument("--marriage-years", type=int, required=True)
+    parser.add_argument("--children", action="store_true")
+    parser.add_argument("--homemaker-years", type=int, default=0)
+    parser.add_argument("--fault", action="store_true")
+    parser.add_argument("--as-of", default=None,
+                        help="FX valuation date (default: latest rate)")
+    args = parser.parse_args(argv)
+    ledger = read_ledger(args.path, args.as_of)
+    pool, cn, uk = ledger_outcomes(
+        ledger, args.marriage_date, args.marriage_years, args.children,
+        args.homemaker_years > 0, args.homemaker_years, args.fault)
+    print(f"{'household':<16} {'CN joint':>14} {'UK matrimonial':>15} "
+          f"{'CN award':>14} {'UK award':>14}")
+    for i, label in enumerate(pool.households):
+        print(f"{str(label):<16} {pool.cn_joint[i]:>14,.0f} "
+              f"{pool.uk_matrimonial[i]:>15,.0f} {cn['total'][i]:>14,.0f} "
+              f"{uk['total'][i]:>14,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
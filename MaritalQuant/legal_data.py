@@ -8,6 +8,8 @@
 #       4 House of Lords / Supreme Court judgments
 # ──────────────────────────────────────────────────────────────
 
+import hashlib
+
 LEGAL_KNOWLEDGE_BASE = {
 
     # ═══════════════════════════════════════════════════════════
@@ -668,6 +670,14 @@ LEGAL_KNOWLEDGE_BASE = {
 }
 
 
+# Content fingerprint of the knowledge base.  Anything derived from KB
+# text (e.g. memoised insight markdown) keys on this so that an edited
+# entry can never be served from a stale cache.
+KB_VERSION = hashlib.sha256(
+    repr(LEGAL_KNOWLEDGE_BASE).encode("utf-8")
+).hexdigest()[:16]
+
+
 # ──────────────────────────────────────────────────────────────
 # Convenience lookup helpers
 # ──────────────────────────────────────────────────────────────
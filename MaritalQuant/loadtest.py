@@ -0,0 +1,263 @@
+"""
+MaritalQuant concurrent-session load harness.
+
+Drives main.py headlessly through Streamlit's app-testing API (no
+browser, no network).  Each simulated adviser session owns an AppTest
+instance, randomises the sidebar scenario and clicks Calculate; N
+sessions run concurrently in one process, as they would on a server.
+
+AppTest installs a process-global mock runtime for the duration of
+each run, so script executions are serialised behind a lock.  That
+mirrors a real server process, where reruns share one interpreter and
+contend for the GIL: latency is measured from the click, so it
+includes time spent queued behind other sessions.  AppTest gives every
+run the same session id; the harness swaps in a distinct id per
+simulated session, so the result store and graph cache see separate
+sessions as they would on a server.
+
+For every concurrency level the harness reports rerun latency
+percentiles, aggregate throughput, resident memory per session and
+the session_state footprint each session holds in the result store.
+
+Usage (from the MaritalQuant directory):
+  python loadtest.py --sessions 1 4 16 --reruns 10 --out load_results.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.testing.v1 import AppTest, app_test
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+from dataflow import SESSION_GRAPHS
+from history import ENV_VAR as HISTORY_ENV_VAR
+from session_store import RESULT_STORE
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, "main.py")
+_RUNTIME_LOCK = threading.Lock()
+
+
+class _SessionScriptRunner(LocalScriptRunner):
+    """LocalScriptRunner whose runs report `session_id`, not a fixed id."""
+
+    session_id = None   # set by _run, under _RUNTIME_LOCK
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session_id = _SessionScriptRunner.session_id
+
+
+app_test.LocalScriptRunner = _SessionScriptRunner
+
+
+def rss_bytes():
+    """Current resident set size (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _widget(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    return None
+
+
+def randomise_scenario(at, rng):
+    """Set every sidebar widget currently on the page to a random value."""
+    sidebar = at.sidebar
+    marriage_years = rng.randint(0, 50)
+    choices = {
+        "Jurisdictions": rng.choice(
+            [["CN", "UK"], ["CN", "UK"], ["CN"], ["UK"],
+             ["CN", "UK", "HK", "SCT"]]),
+        "Marriage duration (years)": marriage_years,
+        "Years as homemaker": rng.randint(0, marriage_years),
+        "Has minor children": rng.random() < 0.6,
+        "Wife was full-time homemaker": rng.random() < 0.5,
+        "Husband at fault (DV, affair, etc.)": rng.random() < 0.3,
+        "Property registered to husband": rng.random() < 0.5,
+        "Number of children": rng.randint(1, 4),
+        "Total assets (\u00a5 RMB)": rng.randrange(0, 100_000_001, 100_000),
+        "Wife's annual income (\u00a5)": rng.randrange(0, 1_000_001, 10_000),
+        "Husband's annual income (\u00a5)": rng.randrange(0, 3_000_001, 10_000),
+        "Wife's pre-homemaker salary (\u00a5/yr)":
+            rng.randrange(0, 1_000_001, 10_000),
+    }
+    for elements in (sidebar.multiselect, sidebar.slider, sidebar.checkbox,
+                     sidebar.number_input):
+        for element in elements:
+            if element.label in choices:
+                element.set_value(choices[element.label])
+
+
+def session_name(session_id):
+    return f"loadtest session {session_id}"
+
+
+def _run(at, session_id):
+    with _RUNTIME_LOCK:
+        _SessionScriptRunner.session_id = session_name(session_id)
+        at.run()
+
+
+def run_session(session_id, reruns, seed, start_barrier, timeout):
+    """Simulate one adviser; return (latencies, error or None, AppTest)."""
+    rng = random.Random(seed * 1_000_003 + session_id)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    latencies = []
+    try:
+        _run(at, session_id)
+    except Exception as exc:  # noqa: BLE001 - reported, not swallowed
+        start_barrier.abort()
+        return latencies, repr(exc), at
+    try:
+        start_barrier.wait()
+    except threading.BrokenBarrierError:
+        return latencies, "aborted: another session failed to start", at
+    try:
+        for _ in range(reruns):
+            randomise_scenario(at, rng)
+            _widget(at.sidebar.button, "\u26a1 Calculate Risk").click()
+            started = time.perf_counter()
+            _run(at, session_id)
+            latencies.append(time.perf_counter() - started)
+            if at.exception:
+                return latencies, at.exception[0].message, at
+    except Exception as exc:  # noqa: BLE001 - reported, not swallowed
+        return latencies, repr(exc), at
+    return latencies, None, at
+
+
+def run_level(sessions, reruns, seed, timeout):
+    """Run `sessions` concurrent sessions and summarise the results."""
+    gc.collect()
+    rss_before = rss_bytes()
+    barrier = threading.Barrier(sessions + 1)
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [
+            pool.submit(run_session, i, reruns, seed, barrier, timeout)
+            for i in range(sessions)
+        ]
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        wall_start = time.perf_counter()
+        outcomes = [f.result() for f in futures]
+        wall = time.perf_counter() - wall_start
+
+    latencies = [lat for lats, _, _ in outcomes for lat in lats]
+    errors = [err for _, err, _ in outcomes if err]
+    # Sessions (and their AppTest state) are still alive here.
+    gc.collect()
+    rss_after = rss_bytes()
+    report = RESULT_STORE.memory_report()
+    names = [session_name(i) for i in range(sessions)]
+    state_bytes = [report["sessions"][name] for name in names
+                   if name in report["sessions"]]
+    graph_bytes = SESSION_GRAPHS.memory_report()["bytes_total"]
+    # The next level reuses these ids; start it from a clean slate.
+    for name in names:
+        RESULT_STORE.forget(name)
+        SESSION_GRAPHS.forget(name)
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "errors": errors,
+        "wall_s": wall,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "latency_s": {
+            "mean": statistics.fmean(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies, default=0.0),
+        },
+        "rss_delta_bytes": rss_after - rss_before,
+        "rss_per_session_bytes": max(0, rss_after - rss_before) // sessions,
+        "session_state_bytes_mean": (statistics.fmean(state_bytes)
+                                     if state_bytes else 0.0),
+        "result_cache_bytes": report["cache_bytes"],
+        "graph_store_bytes": graph_bytes,
+    }
+
+
+def print_level(result):
+    lat = result["latency_s"]
+    print(f"{result['sessions']:>6} {result['reruns']:>7} "
+          f"{result['throughput_rps']:>9.1f} "
+          f"{lat['p50'] * 1e3:>8.1f} {lat['p95'] * 1e3:>8.1f} "
+          f"{lat['p99'] * 1e3:>8.1f} "
+          f"{result['rss_per_session_bytes'] / 1024:>10.0f} "
+          f"{result['session_state_bytes_mean'] / 1024:>10.1f} "
+          f"{len(result['errors']):>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16],
+                        help="concurrency levels to test")
+    parser.add_argument("--reruns", type=int, default=10,
+                        help="Calculate clicks per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0,
+                        help="per-rerun timeout in seconds")
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    # AppTest runs outside `streamlit run`; silence bare-mode warnings.
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    print(f"{'sess':>6} {'reruns':>7} {'rerun/s':>9} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'KiB/sess':>10} {'state KiB':>10} "
+          f"{'errors':>6}")
+    results = []
+    # Every Calculate click is saved to the scenario history; keep the
+    # simulated sessions' scenarios out of the real one.
+    with tempfile.TemporaryDirectory() as history_dir:
+        os.environ[HISTORY_ENV_VAR] = os.path.join(history_dir,
+                                                   "history.sqlite3")
+        for sessions in args.sessions:
+            result = run_level(sessions, args.reruns, args.seed,
+                               args.timeout)
+            print_level(result)
+            results.append(result)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump({"reruns_per_session": args.reruns, "seed": args.seed,
+                       "levels": results}, fh, indent=2)
+        print(f"\nWrote {args.out}")
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
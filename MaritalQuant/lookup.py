@@ -0,0 +1,265 @@
+"""
+MaritalQuant outcome lookup table.
+
+Every calculate_outcomes input except total_assets is small and
+discrete (marriage_years and homemaker_years 0-50, four booleans), so
+each of the 51 x 51 x 16 = 41,616 combinations gets one precomputed
+table row.  Within a row every amount is a straight line in the pool:
+
+  field = slope * total_assets + intercept
+
+except the UK needs outcome, which switches slope at the needs
+threshold (engine.UK_NEEDS_THRESHOLD), and the UK total, which is
+min(max(needs, homemaker), pool).
+A scenario is therefore one row lookup plus a few multiply-adds.
+
+Rows are derived by probing the batch engine at a handful of pool
+sizes, so the division rules are not restated here.  What the table
+does assume about them (the needs threshold, which side of it each
+slope comes from, and the driver and needs-note codes) is taken from
+engine.py; build() checks every field really is linear and refuses to
+build otherwise.
+
+Scenarios outside the table (years above 50, pools above
+MAX_TABLE_ASSETS, where multiply-add rounding could exceed a cent)
+fall back to the batch engine.
+
+Usage:
+  from lookup import get_table
+  cn, uk = get_table().outcomes(assets, years, ...)     # batch columns
+  cn_total, uk_total, flags = get_table().totals(assets, years, ...)
+"""
+
+import hashlib
+import inspect
+
+import numpy as np
+
+from batch import as_columns, calculate_outcomes_batch, insight_flags_batch
+from engine import (
+    UK_NEEDS_THRESHOLD, ChinaResult, Driver, Insight, NeedsBasis, UKResult,
+    calculate_china, calculate_uk, uk_homemaker_rate,
+)
+
+
+MAX_YEARS = 50
+MAX_TABLE_ASSETS = 1e12
+_YEARS = MAX_YEARS + 1
+TABLE_SIZE = _YEARS * _YEARS * 16
+
+# Probe pools: powers of two so slopes divide out exactly, two below
+# and two above the needs threshold.
+_LOW_PROBE, _HIGH_PROBES = 2.0 ** 20, (2.0 ** 24, 2.0 ** 25)
+assert _LOW_PROBE < UK_NEEDS_THRESHOLD <= min(_HIGH_PROBES)
+
+# Fingerprint of the rules the table was derived from, including the
+# needs threshold and the CNY value of the sterling homemaker rate; a
+# saved table whose version differs is stale.
+RULES_VERSION = hashlib.sha256(
+    (inspect.getsource(calculate_china) + inspect.getsource(calculate_uk)
+     + repr((UK_NEEDS_THRESHOLD, uk_homemaker_rate())))
+    .encode("utf-8")).hexdigest()[:16]
+
+
+def combo_index(marriage_years, has_children, wife_is_homemaker,
+                homemaker_years, home_in_husband_name, husband_has_fault):
+    """Table row for the discrete inputs (arrays or scalars)."""
+    return ((np.asarray(marriage_years) * _YEARS
+             + np.asarray(homemaker_years)) * 16
+            + np.asarray(has_children, dtype=np.int64) * 8
+            + np.asarray(wife_is_homemaker, dtype=np.int64) * 4
+            + np.asarray(home_in_husband_name, dtype=np.int64) * 2
+            + np.asarray(husband_has_fault, dtype=np.int64))
+
+
+def _all_combos():
+    index = np.arange(TABLE_SIZE)
+    combo, bits = np.divmod(index, 16)
+    years, homemaker_years = np.divmod(combo, _YEARS)
+    return (years, (bits & 8) > 0, (bits & 4) > 0, homemaker_years,
+            (bits & 2) > 0, (bits & 1) > 0)
+
+
+class OutcomeTable:
+    """Per-combination slopes, intercepts and text codes."""
+
+    def __init__(self, columns, version=RULES_VERSION):
+        self.columns = columns
+        self.version = version
+
+    # -------------------------------------------------
+    # Construction and persistence
+    # -------------------------------------------------
+
+    @classmethod
+    def build(cls):
+        years, children, homemaker, hm_years, home, fault = _all_combos()
+
+        def probe(assets):
+            return calculate_outcomes_batch(assets, years, children,
+                                            homemaker, hm_years, home, fault)
+
+        zero, low = probe(0.0), probe(_LOW_PROBE)
+        high = [probe(assets) for assets in _HIGH_PROBES]
+        columns = {}
+        for prefix, record_type, side in (("cn", ChinaResult, 0),
+                                          ("uk", UKResult, 1)):
+            for name in record_type._fields:
+                key = f"{prefix}_{name}"
+                if name in record_type._text_fields:
+                    if prefix == "uk" and name in ("driver", "needs_note"):
+                        continue  # depend on the pool; derived per scenario
+                    columns[key] = zero[side][name].astype(np.int8)
+                    continue
+                if prefix == "uk" and name in ("needs_outcome", "total"):
+                    continue
+                intercept = zero[side][name]
+                slope = (low[side][name] - intercept) / _LOW_PROBE
+                for assets, outcome in zip(_HIGH_PROBES, high):
+                    if not np.allclose(slope * assets + intercept,
+                                       outcome[side][name], rtol=1e-12,
+                                       atol=0):
+                        raise RuntimeError(f"{key} is not linear in "
+                                           "total_assets; cannot tabulate")
+                columns[f"{key}_slope"] = slope
+                columns[f"{key}_intercept"] = intercept
+        columns["uk_needs_low_slope"] = low[1]["needs_outcome"] / _LOW_PROBE
+        columns["uk_needs_high_slope"] = (high[0][1]["needs_outcome"]
+                                          / _HIGH_PROBES[0])
+        columns["static_flags"] = (
+            np.where(homemaker, np.uint8(Insight.UK_NON_FINANCIAL), 0)
+            | np.where(children, np.uint8(Insight.CHILDREN_WELFARE), 0)
+            | np.where(years > 10, np.uint8(Insight.LONG_MARRIAGE), 0)
+        ).astype(np.uint8)
+        return cls(columns)
+
+    def save(self, path):
+        np.savez(path, version=np.array(self.version), **self.columns)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            version = str(data["version"])
+            if version != RULES_VERSION:
+                raise ValueError(f"lookup table {path} was built for rules "
+                                 f"{version}, current rules are "
+                                 f"{RULES_VERSION}")
+            columns = {name: data[name] for name in data.files
+                       if name != "version"}
+        return cls(columns, version)
+
+    @classmethod
+    def load_or_build(cls, path):
+        """Load a saved table, rebuilding (and re-saving) if stale or absent."""
+        try:
+            return cls.load(path)
+        except (OSError, ValueError, KeyError):
+            table = cls.build()
+            table.save(path)
+            return table
+
+    # -------------------------------------------------
+    # Evaluation
+    # -------------------------------------------------
+
+    def _split(self, inputs):
+        """Row indices for in-table scenarios and the out-of-table mask."""
+        years, hm_years = inputs["marriage_years"], inputs["homemaker_years"]
+        assets = inputs["total_assets"]
+        outside = ((years < 0) | (years > MAX_YEARS) | (hm_years < 0)
+                   | (hm_years > MAX_YEARS) | ~(np.abs(assets)
+                                                <= MAX_TABLE_ASSETS))
+        index = combo_index(
+            np.where(outside, 0, years), inputs["has_children"],
+            inputs["wife_is_homemaker"], np.where(outside, 0, hm_years),
+            inputs["home_in_husband_name"], inputs["husband_has_fault"])
+        return index, outside
+
+    def _line(self, key, index, assets):
+        return (self.columns[f"{key}_slope"][index] * assets
+                + self.columns[f"{key}_intercept"][index])
+
+    def _uk_needs(self, index, assets):
+        slope = np.where(assets < UK_NEEDS_THRESHOLD,
+                         self.columns["uk_needs_low_slope"][index],
+                         self.columns["uk_needs_high_slope"][index])
+        return slope * assets
+
+    def totals(self, total_assets, marriage_years, has_children,
+               wife_is_homemaker, homemaker_years,
+               home_in_husband_name, husband_has_fault):
+        """(cn_total, uk_total, insight_flags) columns."""
+        inputs = as_columns(total_assets, marriage_years, has_children,
+                            wife_is_homemaker, homemaker_years,
+                            home_in_husband_name, husband_has_fault)
+        index, outside = self._split(inputs)
+        if outside.any():
+            cn, uk = self.outcomes(*inputs.values())
+            return cn["total"], uk["total"], insight_flags_batch(
+                cn, uk, inputs["wife_is_homemaker"], inputs["has_children"],
+                inputs["marriage_years"])
+        assets = inputs["total_assets"]
+        cn_total = self._line("cn_total", index, assets)
+        homemaker = self._line("uk_homemaker_outcome", index, assets)
+        uk_total = np.minimum(np.maximum(self._uk_needs(index, assets),
+                                         homemaker), assets)
+        flags = self.columns["static_flags"][index]
+        flags |= np.where(uk_total - cn_total > 100_000,
+                          np.uint8(Insight.CN_COMPENSATION_GAP), np.uint8(0))
+        flags |= np.where(inputs["husband_has_fault"] & (assets > 0),
+                          np.uint8(Insight.FAULT), np.uint8(0))
+        return cn_total, uk_total, flags
+
+    def outcomes(self, total_assets, marriage_years, has_children,
+                 wife_is_homemaker, homemaker_years,
+                 home_in_husband_name, husband_has_fault):
+        """Full (cn_columns, uk_columns) in the batch engine's format."""
+        inputs = as_columns(total_assets, marriage_years, has_children,
+                            wife_is_homemaker, homemaker_years,
+                            home_in_husband_name, husband_has_fault)
+        index, outside = self._split(inputs)
+        assets = inputs["total_assets"]
+        cn, uk = {}, {}
+        for prefix, record_type, out in (("cn", ChinaResult, cn),
+                                         ("uk", UKResult, uk)):
+            for name in record_type._fields:
+                key = f"{prefix}_{name}"
+                if key in self.columns:
+                    out[name] = self.columns[key][index]
+                elif f"{key}_slope" in self.columns:
+                    out[name] = self._line(key, index, assets)
+        # Sums in the engine's operation order, from exact component
+        # lines, so the records match calculate_outcomes bit for bit.
+        cn["effective_share"] = cn["base_share"] - cn["liquidity_discount"]
+        cn["total"] = (cn["effective_share"] + cn["compensation"]
+                       + cn["fault_adjustment"] + cn["children_adjustment"])
+        needs = uk["needs_outcome"] = self._uk_needs(index, assets)
+        homemaker = uk["homemaker_outcome"]
+        uk["total"] = np.minimum(np.maximum(needs, homemaker), assets)
+        uk["driver"] = np.where(needs >= homemaker, np.int8(Driver.NEEDS),
+                                np.int8(Driver.COMPENSATION))
+        override = ((self.columns["uk_needs_low_slope"][index]
+                     != self.columns["uk_needs_high_slope"][index])
+                    & (assets < UK_NEEDS_THRESHOLD))
+        uk["needs_note"] = np.where(override,
+                                    np.int8(NeedsBasis.NEEDS_OVERRIDE),
+                                    np.int8(NeedsBasis.SHARING))
+        uk = {name: uk[name] for name in UKResult._fields}
+        if outside.any():
+            rest = calculate_outcomes_batch(
+                *(column[outside] for column in inputs.values()))
+            for columns, fallback in zip((cn, uk), rest):
+                for name, values in fallback.items():
+                    columns[name][outside] = values
+        return cn, uk
+
+
+_TABLE = None
+
+
+def get_table() -> OutcomeTable:
+    """The process-wide table, built on first use (~tens of ms)."""
+    global _TABLE
+    if _TABLE is None:
+        _TABLE = OutcomeTable.build()
+    return _TABLE
@@ -9,367 +9,201 @@ Compares divorce property division outcomes:
 Enriched with real legal citations from the knowledge base.
 """
 
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
 import streamlit as st
-import plotly.graph_objects as go
-from legal_data import LEGAL_KNOWLEDGE_BASE
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from charts import build_cashflow_chart
+from collection import COLLECTION_MODELS, expected_receipts
+from dataflow import OUTCOME_GRAPH, SESSION_GRAPHS, Evaluation, figure
+from engine import (
+    SCENARIO_FIELDS, calculate_china, calculate_uk, get_legal_insight,
+)
+from fx import BASE_CURRENCY, format_money, get_table
+from jurisdictions import JURISDICTIONS, gap_metrics, label
+from projection import (
+    DEFAULT_PARAMS, cn_streams, discount_factors, npv, schedule, uk_streams,
+)
+from history import DEFAULT_PAGE_SIZE, HISTORY, entry_key, input_hash
+from session_store import RESULT_STORE, scenario_key
 
 
 # ===================================================
-# CALCULATION ENGINE (unchanged)
+# INSIGHT RENDERING
 # ===================================================
 
-def calculate_china(total_assets, marriage_years, has_children,
-                    wife_is_homemaker, homemaker_years,
-                    home_in_husband_name, husband_has_fault):
-    pool = total_assets
-    base_share = pool * 0.50
-
-    if home_in_husband_name:
-        liquidity_discount = base_share * 0.20
-    else:
-        liquidity_discount = 0
-
-    effective_share = base_share - liquidity_discount
+def render_legal_insights(insights):
+    for insight in insights:
+        label = insight["label"]
+        body = insight["body"]
+        if insight["level"] == "warning":
+            st.warning(f"**{label}**\n\n{body}")
+        elif insight["level"] == "success":
+            st.success(f"**{label}**\n\n{body}")
+        else:
+            st.info(f"**{label}**\n\n{body}")
 
-    if wife_is_homemaker and homemaker_years > 0:
-        compensation = homemaker_years * 5_000
-    else:
-        compensation = 0
-
-    fault_adjustment = pool * 0.05 if husband_has_fault else 0
-    children_adjustment = pool * 0.03 if has_children else 0
-    total = effective_share + compensation + fault_adjustment + children_adjustment
-
-    return {
-        "pool": pool,
-        "base_share": base_share,
-        "liquidity_discount": liquidity_discount,
-        "effective_share": effective_share,
-        "compensation": compensation,
-        "fault_adjustment": fault_adjustment,
-        "children_adjustment": children_adjustment,
-        "total": total,
-        "enforcement_rate": 0.30,
-        "housing": ("Wife LOSES home -> cash discount"
-                    if home_in_husband_name else "Standard division"),
-    }
 
+def jurisdiction_header(code, title):
+    st.markdown(
+        f'<div class="jurisdiction-header" '
+        f'style="background: {JURISDICTIONS[code].header};">'
+        f'{JURISDICTIONS[code].flag} {title}</div>',
+        unsafe_allow_html=True)
 
-def calculate_uk(total_assets, marriage_years, has_children,
-                 wife_is_homemaker, homemaker_years):
-    sharing_base = total_assets * 0.50
 
-    if marriage_years > 10:
-        pool = total_assets
-        mingling_note = "All assets treated as matrimonial (White v White)"
-    else:
-        pool = total_assets
-        mingling_note = "Short marriage - pre-marital assets may be ring-fenced"
+def collected_delta(realised, due):
+    """Metric delta for the share of `due` expected to be collected."""
+    due = np.float64(due.sum())
+    share = np.divide(realised.sum(), due, out=np.full((), np.nan),
+                      where=due > 0)
+    return "nothing due" if np.isnan(share) else f"{share:.0%} collected"
 
-    if has_children and total_assets < 10_000_000:
-        needs_outcome = total_assets * 0.60
-        needs_note = "Needs override: 60% to wife for children's housing security"
-    else:
-        needs_outcome = sharing_base
-        needs_note = "Standard 50% sharing applies"
-
-    if wife_is_homemaker and homemaker_years > 0:
-        compensation = homemaker_years * 100_000
-        homemaker_outcome = sharing_base + compensation
-        comp_note = (f"Replacement cost: {homemaker_years} yrs x 100,000 "
-                     f"= {compensation:,.0f}")
-    else:
-        compensation = 0
-        homemaker_outcome = sharing_base
-        comp_note = "No homemaker compensation"
 
-    total = max(needs_outcome, homemaker_outcome)
-    total = min(total, total_assets)
+def render_breakdown(code, outcome, cn, uk, display):
+    def money(amount):
+        return format_money(amount, display)
 
-    if needs_outcome >= homemaker_outcome:
-        driver = "Needs (children's housing)"
+    if code == "CN":
+        st.markdown(f"""
+| Component | Amount |
+|-----------|--------|
+| Matrimonial Pool | {money(cn['pool'])} |
+| Base Share (50%) | {money(cn['base_share'])} |
+| Liquidity Discount (\u221220%) | \u2212 {money(cn['liquidity_discount'])} |
+| Effective Share | {money(cn['effective_share'])} |
+| Housework Compensation | {money(cn['compensation'])} |
+| Fault Adjustment | {money(cn['fault_adjustment'])} |
+| Children Adjustment | {money(cn['children_adjustment'])} |
+| **Total Award** | **{money(cn['total'])}** |
+| \U0001f3e0 Housing | {cn['housing']} |
+| \u2696\ufe0f Enforcement | {cn['enforcement_rate']:.0%} |
+        """)
+    elif code == "UK":
+        st.markdown(f"""
+| Component | Amount |
+|-----------|--------|
+| Divisible Pool | {money(uk['pool'])} |
+| Sharing Base (50%) | {money(uk['sharing_base'])} |
+| Needs Outcome (60%) | {money(uk['needs_outcome'])} |
+| Homemaker Compensation | {money(uk['compensation'])} |
+| Homemaker Outcome | {money(uk['homemaker_outcome'])} |
+| **Total Award** | **{money(uk['total'])}** |
+| \U0001f4cc Driver | {uk['driver']} |
+| \U0001f3e0 Housing | {uk['housing']} |
+| \u2696\ufe0f Enforcement | {uk['enforcement_rate']:.0%} |
+        """)
+        st.info(f"\U0001f4dd {uk['mingling_note']}")
+        st.info(f"\U0001f4dd {uk['needs_note']}")
+        if uk["compensation"] > 0:
+            st.info(f"\U0001f4dd {uk['comp_note']}")
     else:
-        driver = "Compensation (career sacrifice)"
-
-    return {
-        "pool": pool,
-        "sharing_base": sharing_base,
-        "needs_outcome": needs_outcome,
-        "compensation": compensation,
-        "homemaker_outcome": homemaker_outcome,
-        "total": total,
-        "driver": driver,
-        "mingling_note": mingling_note,
-        "needs_note": needs_note,
-        "comp_note": comp_note,
-        "enforcement_rate": 0.78,
-        "housing": ("Wife KEEPS home for children"
-                    if has_children else "Equitable division of housing"),
-    }
-
-
-def calculate_outcomes(total_assets, marriage_years, has_children,
-                       wife_is_homemaker, homemaker_years,
-                       home_in_husband_name, husband_has_fault):
-    cn = calculate_china(
-        total_assets, marriage_years, has_children,
-        wife_is_homemaker, homemaker_years,
-        home_in_husband_name, husband_has_fault,
-    )
-    uk = calculate_uk(
-        total_assets, marriage_years, has_children,
-        wife_is_homemaker, homemaker_years,
-    )
-    return cn, uk
+        st.markdown(f"""
+| Component | Amount |
+|-----------|--------|
+| Divisible Pool | {money(outcome['pool'])} |
+| Sharing Base | {money(outcome['sharing'])} |
+| Compensation | {money(outcome['compensation'])} |
+| Adjustments | {money(outcome['adjustments'])} |
+| **Total Award** | **{money(outcome['total'])}** |
+| \u2696\ufe0f Enforcement | {outcome['enforcement_rate']:.0%} |
+        """)
+        st.info(f"\U0001f4dd {JURISDICTIONS[code].basis}")
 
 
 # ===================================================
-# MASTER TRANSLATOR (unchanged)
+# SCENARIO HISTORY
 # ===================================================
 
-def get_legal_insight(cn_result, uk_result, wife_is_homemaker,
-                      has_children, marriage_years):
-    insights = []
-    gap = uk_result["total"] - cn_result["total"]
-    kb = LEGAL_KNOWLEDGE_BASE
-
-    if gap > 100_000:
-        art1088 = kb["CN"]["Statutes"]["Art_1088"]
-        cn_comp = cn_result.get("compensation", 0)
-        uk_comp = uk_result.get("compensation", 0)
-        insights.append({
-            "level": "warning",
-            "label": "[Core Logic] CN Housework Compensation Gap",
-            "body": (
-                f"Your asset risk is high.  In China, despite **{art1088['title']}** "
-                f"(Civil Code Art 1088), housework compensation is often "
-                f"symbolic \u2014 averaging approx. \u00a530,000\u201380,000, with only a "
-                f"26.92% court-approval rate.\n\n"
-                f"In your scenario the CN system awards **\u00a5{cn_comp:,.0f}** "
-                f"for homemaking, while the UK framework values the same "
-                f"contribution at **\u00a5{uk_comp:,.0f}** \u2014 a "
-                f"**\u00a5{uk_comp - cn_comp:,.0f}** compensation gap.\n\n"
-                f"**[Case Precedent]** *Guiding Case No. 66 (Lei v Song)* \u2014 "
-                f"even when misconduct is proven, CN courts still apply "
-                f"narrow statutory caps rather than equitable redistribution."
-            ),
-        })
-
-    if wife_is_homemaker:
-        white = kb["UK"]["Cases"]["White_v_White"]
-        insights.append({
-            "level": "success",
-            "label": "[Core Logic] UK Non-financial Contribution Protection",
-            "body": (
-                f"UK law protects your non-financial contribution.  As "
-                f"established in **{white['name']}**, *\"{white['quote']}\"* "
-                f"({white['quote_attribution']}).\n\n"
-                f"The **Miller/McFarlane** framework further ensures that "
-                f"career sacrifice is compensated through the **three strands "
-                f"of fairness**: Needs, Compensation, and Sharing.\n\n"
-                f"**[Case Precedent]** In *McFarlane*, a solicitor-turned-"
-                f"homemaker was awarded **\u00a3250,000/year** in periodical "
-                f"payments \u2014 not as maintenance, but as *compensation* "
-                f"for her foregone career."
-            ),
-        })
-
-    if has_children:
-        mca25 = kb["UK"]["Statutes"]["MCA_Sec25"]
-        children_act = kb["UK"]["Statutes"]["Children_Act_1989"]
-        insights.append({
-            "level": "info",
-            "label": "[Core Logic] Children's Welfare & the Needs Principle",
-            "body": (
-                f"Both jurisdictions prioritise children \u2014 but with very "
-                f"different teeth.\n\n"
-                f"\U0001f1ec\U0001f1e7 **UK \u2014 MCA 1973 s.25(1):** *'{mca25['title']}'* "
-                f"mandates that the **first** consideration is the welfare "
-                f"of any minor child.  In practice, this often pushes the "
-                f"primary carer's share to **55\u201365%** to secure housing "
-                f"stability for children.  The **{children_act['title']}** "
-                f"reinforces this with a statutory welfare checklist.\n\n"
-                f"\U0001f1e8\U0001f1f3 **China \u2014 Art 1087:** The court shall apply "
-                f"*'\u7167\u987e\u5b50\u5973\u3001\u5973\u65b9\u548c\u65e0\u8fc7\u9519\u65b9\u6743\u76ca\u7684\u539f\u5219'* (protect children, "
-                f"wife, and innocent party).  However, this typically "
-                f"translates to only a **2\u20135%** tilt from the 50/50 "
-                f"baseline, and no mandatory housing right for the "
-                f"custodial parent."
-            ),
-        })
-
-    if marriage_years > 10:
-        insights.append({
-            "level": "info",
-            "label": "[Core Logic] Long Marriage & Asset Mingling",
-            "body": (
-                f"After {marriage_years} years of marriage, UK law treats "
-                f"virtually all assets as 'matrimonial property' subject "
-                f"to equal sharing (*White v White* yardstick of equality).  "
-                f"Pre-marital contributions carry diminishing weight.\n\n"
-                f"In China, the statutory 50/50 community property split "
-                f"(Art 1062) applies regardless of marriage duration, but "
-                f"enforcement gaps and liquidity discounts erode the "
-                f"wife's effective share."
-            ),
-        })
-
-    if cn_result.get("fault_adjustment", 0) > 0:
-        art1091 = kb["CN"]["Statutes"]["Art_1091"]
-        xie_case = kb["CN"]["Cases"]["Xie_v_He"]
-        insights.append({
-            "level": "warning",
-            "label": "[Core Logic] Fault & Domestic Violence",
-            "body": (
-                f"Fault is present in this scenario.  Under **{art1091['title']}** "
-                f"(Art 1091), the innocent party may claim damages for "
-                f"bigamy, DV, maltreatment, or abandonment \u2014 but awards "
-                f"are typically **3\u20135%** of total assets.\n\n"
-                f"**[Case Precedent]** In *{xie_case['name']}*, the court "
-                f"used a **Prior Judgment** (\u5148\u884c\u5224\u51b3) to dissolve the "
-                f"marriage immediately while DV damages were resolved "
-                f"separately \u2014 protecting the victim from being trapped "
-                f"in the marriage during litigation."
-            ),
-        })
-
-    return insights
+# Sidebar widget keys saved with each scenario and restored on reopen,
+# plus one foreign_<currency> key per holding.
+FORM_KEYS = (
+    "client", "jurisdictions", "marriage_years", "has_children",
+    "num_children", "total_assets", "display_currency", "wife_income",
+    "husband_income", "wife_is_homemaker", "homemaker_years",
+    "foregone_salary", "husband_has_fault", "home_in_husband_name",
+)
+UNASSIGNED = "Unassigned"
+ALL_CLIENTS = "All clients"
+HISTORY_PERIODS = (None, 1, 7, 30, 365)
 
 
-def render_legal_insights(insights):
-    for insight in insights:
-        label = insight["label"]
-        body = insight["body"]
-        if insight["level"] == "warning":
-            st.warning(f"**{label}**\n\n{body}")
-        elif insight["level"] == "success":
-            st.success(f"**{label}**\n\n{body}")
-        else:
-            st.info(f"**{label}**\n\n{body}")
+def form_snapshot():
+    return {key: value for key, value in st.session_state.items()
+            if key in FORM_KEYS or key.startswith("foreign_")}
 
 
-# ===================================================
-# PLOTLY CHART BUILDER
-# ===================================================
-
-def build_comparison_chart(cn, uk):
-    """Horizontal grouped bar: CN vs UK total share."""
-    fig = go.Figure()
-
-    fig.add_trace(go.Bar(
-        y=["Wife's Total Share"],
-        x=[cn["total"]],
-        name="\U0001f1e8\U0001f1f3 China",
-        orientation="h",
-        marker=dict(
-            color="rgba(234, 88, 12, 0.85)",
-            line=dict(color="rgba(194, 65, 12, 1)", width=1.5),
-        ),
-        text=[f"\u00a5{cn['total']:,.0f}"],
-        textposition="inside",
-        textfont=dict(color="white", size=14, family="Inter, sans-serif"),
-    ))
-
-    fig.add_trace(go.Bar(
-        y=["Wife's Total Share"],
-        x=[uk["total"]],
-        name="\U0001f1ec\U0001f1e7 United Kingdom",
-        orientation="h",
-        marker=dict(
-            color="rgba(22, 163, 74, 0.85)",
-            line=dict(color="rgba(21, 128, 61, 1)", width=1.5),
-        ),
-        text=[f"\u00a5{uk['total']:,.0f}"],
-        textposition="inside",
-        textfont=dict(color="white", size=14, family="Inter, sans-serif"),
-    ))
-
-    fig.update_layout(
-        barmode="group",
-        height=160,
-        margin=dict(l=0, r=20, t=10, b=10),
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-        legend=dict(
-            orientation="h", yanchor="bottom", y=1.02,
-            xanchor="center", x=0.5,
-            font=dict(size=13, family="Inter, sans-serif"),
-        ),
-        xaxis=dict(
-            showgrid=True,
-            gridcolor="rgba(226,232,240,0.6)",
-            tickprefix="\u00a5",
-            tickformat=",",
-            tickfont=dict(size=11, color="#64748b"),
-        ),
-        yaxis=dict(showticklabels=False),
-    )
-    return fig
-
-
-def build_breakdown_chart(cn, uk):
-    """Stacked bar showing component breakdown for each jurisdiction."""
-    categories = ["Base / Sharing", "Compensation", "Adjustments"]
-
-    cn_values = [
-        cn["effective_share"],
-        cn["compensation"],
-        cn["fault_adjustment"] + cn["children_adjustment"],
-    ]
-    uk_values = [
-        uk["sharing_base"],
-        uk["compensation"],
-        max(0, uk["total"] - uk["sharing_base"] - uk["compensation"]),
-    ]
-
-    fig = go.Figure()
-
-    colors_cn = ["#fb923c", "#f97316", "#ea580c"]
-    colors_uk = ["#4ade80", "#22c55e", "#16a34a"]
-
-    for i, cat in enumerate(categories):
-        fig.add_trace(go.Bar(
-            x=["\U0001f1e8\U0001f1f3 China"], y=[cn_values[i]],
-            name=cat, marker_color=colors_cn[i],
-            text=[f"\u00a5{cn_values[i]:,.0f}" if cn_values[i] > 0 else ""],
-            textposition="inside",
-            textfont=dict(color="white", size=11),
-            showlegend=(True if i == 0 else True),
-            legendgroup=cat,
-        ))
-        fig.add_trace(go.Bar(
-            x=["\U0001f1ec\U0001f1e7 UK"], y=[uk_values[i]],
-            name=cat, marker_color=colors_uk[i],
-            text=[f"\u00a5{uk_values[i]:,.0f}" if uk_values[i] > 0 else ""],
-            textposition="inside",
-            textfont=dict(color="white", size=11),
-            showlegend=False,
-            legendgroup=cat,
-        ))
-
-    fig.update_layout(
-        barmode="stack",
-        height=340,
-        margin=dict(l=0, r=10, t=10, b=40),
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-        legend=dict(
-            orientation="h", yanchor="bottom", y=1.02,
-            xanchor="center", x=0.5,
-            font=dict(size=12, family="Inter, sans-serif"),
-        ),
-        yaxis=dict(
-            showgrid=True,
-            gridcolor="rgba(226,232,240,0.5)",
-            tickprefix="\u00a5",
-            tickformat=",",
-            tickfont=dict(size=11, color="#64748b"),
-        ),
-        xaxis=dict(
-            tickfont=dict(size=13, family="Inter, sans-serif"),
-        ),
-    )
-    return fig
+def reopen_scenario(entry_id):
+    """Button callback: restore a saved scenario's form and results."""
+    entry, form = HISTORY.get(entry_id)
+    st.session_state.update(form or {})
+    st.session_state["scenario_key"] = entry_key(entry)
+    st.session_state["calculated"] = True
+    # Served from the store on the next run instead of recomputed.
+    st.session_state["reopened"] = entry.input_hash
+
+
+def _first_history_page():
+    st.session_state.pop("history_before", None)
+
+
+def _older_history_page(last_entry):
+    st.session_state["history_before"] = last_entry
+
+
+def render_history(money):
+    clients = HISTORY.clients(limit=500)
+    h1, h2 = st.columns([2, 1])
+    with h1:
+        client_filter = st.selectbox("Client", [ALL_CLIENTS] + clients,
+                                     key="history_client",
+                                     on_change=_first_history_page)
+    with h2:
+        period = st.selectbox(
+            "Period", HISTORY_PERIODS, key="history_period",
+            on_change=_first_history_page,
+            format_func=lambda days: ("All time" if days is None
+                                      else f"Last {days} days"))
+    before = st.session_state.get("history_before")
+    entries = HISTORY.list(
+        client=None if client_filter == ALL_CLIENTS else client_filter,
+        since=None if period is None else time.time() - period * 86_400,
+        before=before)
+    if not entries:
+        st.caption("No saved scenarios match.")
+    else:
+        st.dataframe([{
+            "Saved": datetime.fromtimestamp(e.created)
+            .strftime("%Y-%m-%d %H:%M"),
+            "Client": e.client,
+            "Total assets": money(e.total_assets),
+            "Years": e.marriage_years,
+            "Jurisdictions": ", ".join(e.jurisdictions),
+            "CN award": money(e.cn_total),
+            "UK award": money(e.uk_total),
+        } for e in entries], hide_index=True, use_container_width=True)
+        labels = {e.id: f"#{e.id} \u00b7 {e.client} \u00b7 "
+                        f"{datetime.fromtimestamp(e.created):%Y-%m-%d %H:%M}"
+                  for e in entries}
+        r1, r2 = st.columns([3, 1])
+        with r1:
+            choice = st.selectbox("Scenario", list(labels),
+                                  key="history_choice",
+                                  format_func=labels.get)
+        with r2:
+            st.button("Reopen", on_click=reopen_scenario, args=(choice,),
+                      use_container_width=True)
+    p1, p2 = st.columns(2)
+    with p1:
+        st.button("\u23ee Newest", on_click=_first_history_page,
+                  disabled=before is None)
+    with p2:
+        st.button("Older \u25b6", on_click=_older_history_page,
+                  args=(entries[-1] if entries else None,),
+                  disabled=len(entries) < DEFAULT_PAGE_SIZE)
 
 
 # ===================================================
@@ -541,20 +375,8 @@ st.markdown("""
         border-bottom: 2px solid #e2e8f0;
     }
 
-    /* ── Jurisdiction Headers ── */
-    .china-header {
-        background: linear-gradient(135deg, #c2410c, #ea580c);
-        color: white !important;
-        padding: 10px 20px;
-        border-radius: 10px;
-        text-align: center;
-        font-size: 1.05rem;
-        font-weight: 700;
-        margin-bottom: 14px;
-        letter-spacing: -0.01em;
-    }
-    .uk-header {
-        background: linear-gradient(135deg, #1d4ed8, #2563eb);
+    /* ── Jurisdiction Headers (background set per jurisdiction) ── */
+    .jurisdiction-header {
         color: white !important;
         padding: 10px 20px;
         border-radius: 10px;
@@ -605,14 +427,26 @@ with st.sidebar:
     st.caption("Configure a divorce scenario to simulate")
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 
-    # Jurisdiction
-    st.markdown("### \U0001f310 Jurisdiction")
-    jurisdiction_choice = st.radio(
-        "Compare mode",
-        options=["Compare Both", "China Only", "UK Only"],
-        index=0,
-        help="Choose which jurisdiction(s) to simulate.",
+    # Client
+    st.markdown("### 🗂️ Client")
+    client = st.text_input(
+        "Client", key="client", placeholder="Client name or reference",
+        help="Calculated scenarios are saved to the history under this "
+             "client.",
+        label_visibility="collapsed",
+    ).strip()
+    st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+
+    # Jurisdictions
+    st.markdown("### \U0001f310 Jurisdictions")
+    selected = st.multiselect(
+        "Jurisdictions",
+        options=list(JURISDICTIONS),
+        default=["CN", "UK"],
+        format_func=label,
+        help="Choose which jurisdictions to simulate and compare.",
         label_visibility="collapsed",
+        key="jurisdictions",
     )
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 
@@ -621,11 +455,13 @@ with st.sidebar:
     marriage_years = st.slider(
         "Marriage duration (years)", 0, 50, 10,
         help="How long the marriage lasted.",
+        key="marriage_years",
     )
-    has_children = st.checkbox("Has minor children", value=True)
+    has_children = st.checkbox("Has minor children", value=True,
+                               key="has_children")
     if has_children:
         num_children = st.number_input(
-            "Number of children", 1, 10, 1,
+            "Number of children", 1, 10, 1, key="num_children",
         )
     else:
         num_children = 0
@@ -638,12 +474,35 @@ with st.sidebar:
         "Total assets (\u00a5 RMB)", 0, 100_000_000, 5_000_000,
         step=100_000,
         help="Total value of all combined assets in RMB.",
+        key="total_assets",
     )
+    # Foreign holdings join the pool in CNY at the latest local rates.
+    fx_table = get_table()
+    fx_date = str(fx_table.latest_date)
+    with st.expander("Assets held in other currencies"):
+        foreign = {
+            currency: st.number_input(
+                f"Held in {currency}", 0, 100_000_000, 0, step=10_000,
+                key=f"foreign_{currency}")
+            for currency in fx_table.currencies if currency != BASE_CURRENCY
+        }
+        st.caption(f"Converted to CNY at the {fx_date} rates.")
+    pool_assets = total_assets + float(fx_table.to_base(
+        list(foreign.values()), list(foreign)).sum())
+    display_currency = st.selectbox(
+        "Display currency", fx_table.currencies,
+        help="Amounts are computed in CNY and shown in this currency "
+             f"at the {fx_date} rate; switching does not recalculate.",
+        key="display_currency",
+    )
+    display = fx_table.display(display_currency)
     wife_income = st.number_input(
         "Wife's annual income (\u00a5)", 0, 10_000_000, 0, step=10_000,
+        key="wife_income",
     )
     husband_income = st.number_input(
         "Husband's annual income (\u00a5)", 0, 10_000_000, 300_000, step=10_000,
+        key="husband_income",
     )
 
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
@@ -653,14 +512,16 @@ with st.sidebar:
     wife_is_homemaker = st.checkbox(
         "Wife was full-time homemaker", value=True,
         help="Whether the wife left her career to manage the household.",
+        key="wife_is_homemaker",
     )
     if wife_is_homemaker:
         homemaker_years = st.slider(
             "Years as homemaker", 0, 50, min(8, marriage_years),
+            key="homemaker_years",
         )
         foregone_salary = st.number_input(
             "Wife's pre-homemaker salary (\u00a5/yr)",
-            0, 5_000_000, 120_000, step=10_000,
+            0, 5_000_000, 120_000, step=10_000, key="foregone_salary",
         )
     else:
         homemaker_years = 0
@@ -670,8 +531,11 @@ with st.sidebar:
 
     # Additional Factors
     st.markdown("### \u26a0\ufe0f Additional Factors")
-    husband_has_fault = st.checkbox("Husband at fault (DV, affair, etc.)")
-    home_in_husband_name = st.checkbox("Property registered to husband", value=True)
+    husband_has_fault = st.checkbox("Husband at fault (DV, affair, etc.)",
+                                    key="husband_has_fault")
+    home_in_husband_name = st.checkbox("Property registered to husband",
+                                       value=True,
+                                       key="home_in_husband_name")
 
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 
@@ -687,6 +551,10 @@ with st.sidebar:
 # MAIN AREA
 # ===================================================
 
+def money(amount):
+    return format_money(amount, display)
+
+
 # ── Professional Header ──
 st.markdown("""
 <div class="dashboard-header">
@@ -705,70 +573,100 @@ qf1, qf2, qf3, qf4 = st.columns(4)
 with qf1:
     st.metric("Marriage", f"{marriage_years} years")
 with qf2:
-    st.metric("Total Assets", f"\u00a5 {total_assets:,.0f}")
+    st.metric("Total Assets", money(pool_assets))
 with qf3:
     st.metric("Children", str(num_children) if has_children else "None")
 with qf4:
     st.metric("Homemaker", f"{homemaker_years} yrs" if wife_is_homemaker else "No")
 
 # ── Trigger Calculation ──
+# Only the input key is kept in session_state.  Results, charts and
+# insights come from the session's dataflow graph, which recomputes
+# only what depends on the inputs that changed since the last run.
 if calculate_clicked:
-    cn, uk = calculate_outcomes(
-        total_assets, marriage_years, has_children,
+    st.session_state["scenario_key"] = scenario_key(
+        pool_assets, marriage_years, has_children,
         wife_is_homemaker, homemaker_years,
         home_in_husband_name, husband_has_fault,
     )
-    st.session_state["cn_result"] = cn
-    st.session_state["uk_result"] = uk
     st.session_state["calculated"] = True
+    st.session_state.pop("reopened", None)
 
 calculated = st.session_state.get("calculated", False)
-cn = st.session_state.get("cn_result")
-uk = st.session_state.get("uk_result")
-
-show_china = jurisdiction_choice in ["Compare Both", "China Only"]
-show_uk = jurisdiction_choice in ["Compare Both", "UK Only"]
+result_key = st.session_state.get("scenario_key")
+
+_ctx = get_script_run_ctx()
+evaluation = (SESSION_GRAPHS.get(_ctx.session_id) if _ctx is not None
+              else Evaluation(OUTCOME_GRAPH))
+if result_key:
+    evaluation.set(**dict(zip(SCENARIO_FIELDS, result_key)),
+                   jurisdictions=tuple(selected), display=display)
+    if st.session_state.pop("reopened", None) == input_hash(result_key):
+        stored = HISTORY.results(input_hash(result_key))
+        evaluation.provide("cn", stored["cn"])
+        evaluation.provide("uk", stored["uk"])
+        for code, outcome in stored["outcomes"].items():
+            if code in JURISDICTIONS:
+                evaluation.provide(f"outcome.{code}", outcome)
+    cn, uk = evaluation.get("cn"), evaluation.get("uk")
+    outcomes = {code: evaluation.get(f"outcome.{code}") for code in selected}
+else:
+    cn, uk, outcomes = None, None, {}
+
+# Every calculation is saved to the scenario history with every
+# registered jurisdiction's outcome, so it reopens under any selection.
+if calculate_clicked and result_key:
+    try:
+        HISTORY.record(
+            client or UNASSIGNED, result_key,
+            {"cn": cn, "uk": uk,
+             "outcomes": {code: evaluation.get(f"outcome.{code}")
+                          for code in JURISDICTIONS}},
+            tuple(selected), form_snapshot())
+    except sqlite3.Error as exc:
+        st.warning(f"Scenario not saved to history: {exc}")
+
+if _ctx is not None:
+    RESULT_STORE.touch(_ctx.session_id, result_key,
+                       st.session_state.to_dict())
+
+show_china = "CN" in selected
+show_uk = "UK" in selected
 
 # ===================================================
 # KEY METRICS (The Big Numbers)
 # ===================================================
 
-if calculated and cn and uk and show_china and show_uk:
+if calculated and len(outcomes) >= 2:
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
     st.markdown('<div class="section-label">Key Outcomes</div>',
                 unsafe_allow_html=True)
 
-    gap = uk["total"] - cn["total"]
-    if cn["total"] > 0:
-        gap_ratio = uk["total"] / cn["total"]
-        ratio_text = f"UK awards {gap_ratio:.1f}x what China awards"
+    ranked = sorted(outcomes, key=lambda code: outcomes[code]["total"])
+    low, high = JURISDICTIONS[ranked[0]], JURISDICTIONS[ranked[-1]]
+    gap = outcomes[high.code]["total"] - outcomes[low.code]["total"]
+    if outcomes[low.code]["total"] > 0:
+        gap_ratio = outcomes[high.code]["total"] / outcomes[low.code]["total"]
+        ratio_text = f"{high.name} awards {gap_ratio:.1f}x what {low.name} awards"
     else:
-        ratio_text = "China awards \u00a50"
-
-    m1, m2, m3 = st.columns(3)
-    with m1:
-        st.markdown('<div class="china-header">\U0001f1e8\U0001f1f3 China Outcome</div>',
-                    unsafe_allow_html=True)
-        st.metric(
-            "Wife's Total Share",
-            f"\u00a5 {cn['total']:,.0f}",
-            delta=f"Enforcement: {cn['enforcement_rate']:.0%}",
-            delta_color="off",
-        )
-    with m2:
-        st.markdown('<div class="uk-header">\U0001f1ec\U0001f1e7 UK Outcome</div>',
-                    unsafe_allow_html=True)
-        st.metric(
-            "Wife's Total Share",
-            f"\u00a5 {uk['total']:,.0f}",
-            delta=f"Driver: {uk['driver']}",
-            delta_color="off",
-        )
-    with m3:
+        ratio_text = f"{low.name} awards {money(0)}"
+
+    *metric_columns, gap_column = st.columns(len(outcomes) + 1)
+    for column, (code, outcome) in zip(metric_columns, outcomes.items()):
+        with column:
+            jurisdiction_header(code, f"{JURISDICTIONS[code].name} Outcome")
+            st.metric(
+                "Wife's Total Share",
+                money(outcome['total']),
+                delta=(f"Driver: {uk['driver']}" if code == "UK" else
+                       f"Enforcement: {outcome['enforcement_rate']:.0%}"),
+                delta_color="off",
+            )
+    with gap_column:
         st.markdown(f"""
         <div class="gap-box">
             <div class="gap-title">\u26a0\ufe0f PROTECTION GAP</div>
-            <div class="gap-value">\u00a5 {gap:,.0f}</div>
+            <div class="gap-value">{money(gap)}</div>
             <div class="gap-sub">{ratio_text}</div>
         </div>
         """, unsafe_allow_html=True)
@@ -782,106 +680,145 @@ if calculated and cn and uk and show_china and show_uk:
         "\U0001f4ca Total Comparison", "\U0001f9e9 Component Breakdown"
     ])
     with tab_overview:
-        fig_compare = build_comparison_chart(cn, uk)
+        fig_compare = figure(evaluation.get("chart.comparison"))
         st.plotly_chart(fig_compare, use_container_width=True, config={"displayModeBar": False})
     with tab_breakdown:
-        fig_breakdown = build_breakdown_chart(cn, uk)
+        fig_breakdown = figure(evaluation.get("chart.breakdown"))
         st.plotly_chart(fig_breakdown, use_container_width=True, config={"displayModeBar": False})
 
-    # ── Detailed Breakdown (2-col) ──
+    # ── Detailed Breakdown (2 per row) ──
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
     st.markdown('<div class="section-label">Detailed Breakdown</div>',
                 unsafe_allow_html=True)
 
-    d1, d2 = st.columns(2)
-    with d1:
-        st.markdown('<div class="china-header">\U0001f1e8\U0001f1f3 China Breakdown</div>',
-                    unsafe_allow_html=True)
-        st.markdown(f"""
-| Component | Amount |
-|-----------|--------|
-| Matrimonial Pool | \u00a5 {cn['pool']:,.0f} |
-| Base Share (50%) | \u00a5 {cn['base_share']:,.0f} |
-| Liquidity Discount (\u221220%) | \u2212 \u00a5 {cn['liquidity_discount']:,.0f} |
-| Effective Share | \u00a5 {cn['effective_share']:,.0f} |
-| Housework Compensation | \u00a5 {cn['compensation']:,.0f} |
-| Fault Adjustment | \u00a5 {cn['fault_adjustment']:,.0f} |
-| Children Adjustment | \u00a5 {cn['children_adjustment']:,.0f} |
-| **Total Award** | **\u00a5 {cn['total']:,.0f}** |
-| \U0001f3e0 Housing | {cn['housing']} |
-| \u2696\ufe0f Enforcement | {cn['enforcement_rate']:.0%} |
-        """)
-
-    with d2:
-        st.markdown('<div class="uk-header">\U0001f1ec\U0001f1e7 UK Breakdown</div>',
-                    unsafe_allow_html=True)
-        st.markdown(f"""
-| Component | Amount |
-|-----------|--------|
-| Divisible Pool | \u00a5 {uk['pool']:,.0f} |
-| Sharing Base (50%) | \u00a5 {uk['sharing_base']:,.0f} |
-| Needs Outcome (60%) | \u00a5 {uk['needs_outcome']:,.0f} |
-| Homemaker Compensation | \u00a5 {uk['compensation']:,.0f} |
-| Homemaker Outcome | \u00a5 {uk['homemaker_outcome']:,.0f} |
-| **Total Award** | **\u00a5 {uk['total']:,.0f}** |
-| \U0001f4cc Driver | {uk['driver']} |
-| \U0001f3e0 Housing | {uk['housing']} |
-| \u2696\ufe0f Enforcement | {uk['enforcement_rate']:.0%} |
-        """)
-        st.info(f"\U0001f4dd {uk['mingling_note']}")
-        st.info(f"\U0001f4dd {uk['needs_note']}")
-        if uk["compensation"] > 0:
-            st.info(f"\U0001f4dd {uk['comp_note']}")
+    codes = list(outcomes)
+    for row in range(0, len(codes), 2):
+        for column, code in zip(st.columns(2), codes[row:row + 2]):
+            with column:
+                jurisdiction_header(code,
+                                    f"{JURISDICTIONS[code].name} Breakdown")
+                render_breakdown(code, outcomes[code], cn, uk, display)
 
-    # ── Gap Metrics ──
+    # ── Gap Metrics (each jurisdiction against the first selected) ──
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
     st.markdown('<div class="section-label">Gap Analysis</div>',
                 unsafe_allow_html=True)
-    g1, g2, g3 = st.columns(3)
-    with g1:
-        comp_gap = uk["compensation"] - cn["compensation"]
-        st.metric(
-            "Compensation Gap",
-            f"\u00a5 {comp_gap:,.0f}",
-            delta=f"UK awards \u00a5{comp_gap:,.0f} more",
-            delta_color="normal",
-        )
-    with g2:
-        st.metric(
-            "Enforcement Gap",
-            f"{uk['enforcement_rate'] - cn['enforcement_rate']:.0%}",
-            delta=f"UK {uk['enforcement_rate']:.0%} vs CN {cn['enforcement_rate']:.0%}",
-            delta_color="normal",
-        )
-    with g3:
-        st.metric(
-            "Housing Outcome",
-            "Wife keeps home" if has_children else "Equitable",
-            delta="UK advantage" if has_children else "Both similar",
-            delta_color="normal",
-        )
+    baseline = JURISDICTIONS[codes[0]]
+    gaps = gap_metrics(outcomes, baseline.code)
+    for code in codes[1:]:
+        name = JURISDICTIONS[code].name
+        g1, g2, g3 = st.columns(3)
+        with g1:
+            st.metric(
+                f"{name}: Award Gap",
+                money(float(gaps[code]['total'])),
+                delta=f"vs {baseline.name}",
+                delta_color="off",
+            )
+        with g2:
+            comp_gap = float(gaps[code]["compensation"])
+            st.metric(
+                f"{name}: Compensation Gap",
+                money(comp_gap),
+                delta=f"{name} awards {money(comp_gap)} more",
+                delta_color="normal",
+            )
+        with g3:
+            st.metric(
+                f"{name}: Enforcement Gap",
+                f"{gaps[code]['enforcement']:.0%}",
+                delta=f"{code} {JURISDICTIONS[code].enforcement_rate:.0%} vs "
+                      f"{baseline.code} {baseline.enforcement_rate:.0%}",
+                delta_color="normal",
+            )
+    if show_china and show_uk:
+        g1, _, _ = st.columns(3)
+        with g1:
+            st.metric(
+                "Housing Outcome",
+                "Wife keeps home" if has_children else "Equitable",
+                delta="UK advantage" if has_children else "Both similar",
+                delta_color="normal",
+            )
 
-    # ── MASTER TRANSLATOR ──
-    insights = get_legal_insight(
-        cn_result=cn, uk_result=uk,
-        wife_is_homemaker=wife_is_homemaker,
-        has_children=has_children,
-        marriage_years=marriage_years,
-    )
-    if insights:
+    # The projections, collection model and Master Translator insights
+    # are CN vs UK analyses.
+    if show_china and show_uk:
+        # ── Cash-Flow Projection ──
         st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
-        st.markdown('<div class="section-label">Legal Analysis</div>',
+        st.markdown('<div class="section-label">Cash-Flow Projection</div>',
                     unsafe_allow_html=True)
-        with st.expander("\U0001f4d6 Read the Legal Logic (Why is there a gap?)",
-                         expanded=True):
-            st.markdown(
-                "*Each insight below traces your inputs through real "
-                "statutes and case law to explain **why** the numbers "
-                "differ between jurisdictions.*"
-            )
-            render_legal_insights(insights)
-
-elif calculated:
+        discount_rate = st.slider(
+            "Discount rate (%)", 0.0, 10.0, DEFAULT_PARAMS.discount_rate * 100,
+            step=0.5,
+            help="Used to value future payments in today's money (NPV).",
+        ) / 100
+        horizon = DEFAULT_PARAMS.horizon_years
+        cn_stream = cn_streams(husband_income, num_children)
+        uk_stream = uk_streams(wife_income, husband_income, foregone_salary,
+                               homemaker_years, num_children)
+        cn_flows = schedule(cn["total"], *cn_stream, horizon=horizon)
+        uk_flows = schedule(uk["total"], *uk_stream, horizon=horizon)
+        p1, p2, p3 = st.columns(3)
+        with p1:
+            st.metric(f"China NPV ({horizon} yrs)",
+                      money(float(npv(cn['total'], *cn_stream, horizon, discount_rate))),
+                      delta=f"Child support {money(float(cn_stream[2]))}/yr (Art 1085)",
+                      delta_color="off")
+        with p2:
+            st.metric(f"UK NPV ({horizon} yrs)",
+                      money(float(npv(uk['total'], *uk_stream, horizon, discount_rate))),
+                      delta=f"Periodical {money(float(uk_stream[0]))}/yr "
+                            f"for {int(uk_stream[1])} yrs",
+                      delta_color="off")
+        with p3:
+            st.metric("UK child maintenance",
+                      f"{money(float(uk_stream[2]))}/yr",
+                      delta=f"for {int(uk_stream[3])} yrs", delta_color="off")
+        show_realised = st.checkbox(
+            "Show realised value (collection risk)",
+            help="Expected receipts after payment, arrears, enforcement and "
+                 "write-off, modelled year by year.",
+        )
+        cn_realised = uk_realised = None
+        if show_realised:
+            cn_realised = expected_receipts(cn_flows.total, COLLECTION_MODELS["CN"])[0]
+            uk_realised = expected_receipts(uk_flows.total, COLLECTION_MODELS["UK"])[0]
+            discount = discount_factors(horizon, discount_rate)
+            r1, r2, r3 = st.columns(3)
+            with r1:
+                st.metric("China realised NPV", money(cn_realised @ discount),
+                          delta=collected_delta(cn_realised, cn_flows.total),
+                          delta_color="off")
+            with r2:
+                st.metric("UK realised NPV", money(uk_realised @ discount),
+                          delta=collected_delta(uk_realised, uk_flows.total),
+                          delta_color="off")
+            with r3:
+                st.metric("Realised gap",
+                          money((uk_realised - cn_realised) @ discount))
+        st.plotly_chart(build_cashflow_chart(cn_flows, uk_flows,
+                                             cn_realised, uk_realised,
+                                             display),
+                        use_container_width=True,
+                        config={"displayModeBar": False})
+
+        # ── MASTER TRANSLATOR ──
+        insights = evaluation.get("insights")
+        if insights:
+            st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+            st.markdown('<div class="section-label">Legal Analysis</div>',
+                        unsafe_allow_html=True)
+            with st.expander("\U0001f4d6 Read the Legal Logic (Why is there a gap?)",
+                             expanded=True):
+                st.markdown(
+                    "*Each insight below traces your inputs through real "
+                    "statutes and case law to explain **why** the numbers "
+                    "differ between jurisdictions.*"
+                )
+                render_legal_insights(insights)
+
+elif calculated and outcomes:
     # Single-jurisdiction mode
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 
@@ -890,9 +827,9 @@ elif calculated:
                     unsafe_allow_html=True)
         c1, c2, c3 = st.columns(3)
         with c1:
-            st.metric("Wife's Total Share", f"\u00a5 {cn['total']:,.0f}")
+            st.metric("Wife's Total Share", money(cn['total']))
         with c2:
-            st.metric("Housework Compensation", f"\u00a5 {cn['compensation']:,.0f}")
+            st.metric("Housework Compensation", money(cn['compensation']))
         with c3:
             st.metric("Enforcement Rate", f"{cn['enforcement_rate']:.0%}")
 
@@ -901,23 +838,37 @@ elif calculated:
                     unsafe_allow_html=True)
         u1, u2, u3 = st.columns(3)
         with u1:
-            st.metric("Wife's Total Share", f"\u00a5 {uk['total']:,.0f}")
+            st.metric("Wife's Total Share", money(uk['total']))
         with u2:
-            st.metric("Compensation (Career Loss)", f"\u00a5 {uk['compensation']:,.0f}")
+            st.metric("Compensation (Career Loss)", money(uk['compensation']))
         with u3:
             st.metric("Key Driver", uk["driver"])
 
-    st.info("\U0001f4a1 Select **Compare Both** in the sidebar to see the full gap analysis, "
-            "charts, and legal insights.")
+    for code in [c for c in outcomes if c not in ("CN", "UK")]:
+        outcome = outcomes[code]
+        st.markdown(f'<div class="section-label">{label(code)} Outcome</div>',
+                    unsafe_allow_html=True)
+        o1, o2, o3 = st.columns(3)
+        with o1:
+            st.metric("Wife's Total Share", money(outcome['total']))
+        with o2:
+            st.metric("Compensation", money(outcome['compensation']))
+        with o3:
+            st.metric("Enforcement Rate", f"{outcome['enforcement_rate']:.0%}")
+        st.caption(JURISDICTIONS[code].basis)
+
+    st.info("\U0001f4a1 Select **two or more jurisdictions** in the sidebar to see "
+            "the full gap analysis, charts, and legal insights.")
 
     # Single-jurisdiction insights
     if cn and show_china and not show_uk:
-        dummy_uk = calculate_uk(total_assets, marriage_years, has_children,
+        dummy_uk = calculate_uk(pool_assets, marriage_years, has_children,
                                 wife_is_homemaker, homemaker_years)
         insights = get_legal_insight(cn_result=cn, uk_result=dummy_uk,
                                      wife_is_homemaker=wife_is_homemaker,
                                      has_children=has_children,
-                                     marriage_years=marriage_years)
+                                     marriage_years=marriage_years,
+                                     display=display)
         cn_insights = [i for i in insights
                        if "CN" in i["label"] or "Children" in i["label"]
                        or "Fault" in i["label"]]
@@ -926,13 +877,14 @@ elif calculated:
                 render_legal_insights(cn_insights)
 
     elif uk and show_uk and not show_china:
-        dummy_cn = calculate_china(total_assets, marriage_years, has_children,
+        dummy_cn = calculate_china(pool_assets, marriage_years, has_children,
                                     wife_is_homemaker, homemaker_years,
                                     home_in_husband_name, husband_has_fault)
         insights = get_legal_insight(cn_result=dummy_cn, uk_result=uk,
                                      wife_is_homemaker=wife_is_homemaker,
                                      has_children=has_children,
-                                     marriage_years=marriage_years)
+                                     marriage_years=marriage_years,
+                                     display=display)
         uk_insights = [i for i in insights
                        if "UK" in i["label"] or "Children" in i["label"]
                        or "Long Marriage" in i["label"]]
@@ -940,6 +892,10 @@ elif calculated:
             with st.expander("\U0001f4d6 Legal Insights for Your Scenario"):
                 render_legal_insights(uk_insights)
 
+elif calculated:
+    st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+    st.info("\U0001f4a1 Select at least one jurisdiction in the sidebar.")
+
 else:
     # No calculation yet
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
@@ -956,6 +912,16 @@ else:
     """, unsafe_allow_html=True)
 
 
+# ── Scenario History ──
+st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+# A toggle rather than an expander: collapsed expanders still run their
+# body, and the history listing is only needed when it is shown.
+if st.toggle("\U0001f553 Scenario History", key="show_history"):
+    try:
+        render_history(money)
+    except sqlite3.Error as exc:
+        st.warning(f"Scenario history unavailable: {exc}")
+
 # ── Footer ──
 st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
 st.markdown("""
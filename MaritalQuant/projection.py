@@ -0,0 +1,175 @@
+"""
+MaritalQuant multi-year cash-flow projection.
+
+Turns each outcome into a year-by-year schedule of what the wife
+receives after divorce:
+
+  year 0      lump sum: the engine's total award
+  years 1..   CN  child support under Civil Code Art 1085
+              UK  McFarlane-style periodical payments plus child
+                  maintenance
+
+Periodical payments compensate relationship-generated disadvantage
+(Miller; McFarlane [2006] UKHL 24): a share of the income gap, capped
+at the salary she gave up less what she now earns, for as many years
+as she spent as a homemaker.  Child support is a share of the
+husband's income (assumed non-custodial parent, matching the engines'
+housing outcome) until the children are adults.  All rates are in
+ProjectionParams and are illustrative.
+
+Everything is vectorised over scenarios x years: schedules are
+(scenarios, horizon + 1) arrays, and npv_* compute net present values
+straight from annuity factors without materialising schedules, so
+20-year NPVs for a million clients take well under a second.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+
+ProjectionParams = namedtuple("ProjectionParams", [
+    "horizon_years",
+    "discount_rate",
+    "child_support_years",    # years until the youngest child is an adult
+    "cn_support_rates",       # share of payer income by number of children
+    "uk_support_rates",
+    "periodical_share",       # share of the income gap paid as PP
+    "periodical_term_factor",  # PP years per homemaker year
+], defaults=(
+    20, 0.03, 12,
+    (0.0, 0.25, 0.35, 0.45, 0.50),   # Art 1085 practice: 20-30%, up to 50%
+    (0.0, 0.12, 0.16, 0.19),         # CMS basic rate: 12% / 16% / 19%
+    1 / 3, 1.0,
+))
+
+DEFAULT_PARAMS = ProjectionParams()
+
+CashFlows = namedtuple("CashFlows", "lump_sum periodical child_support total")
+CashFlows.__doc__ = "(scenarios, horizon + 1) arrays of receipts by year."
+
+
+# ===================================================
+# PAYMENT STREAMS
+# ===================================================
+
+def _support_rate(rates, num_children):
+    rates = np.asarray(rates, dtype=np.float64)
+    return rates[np.clip(np.asarray(num_children), 0, len(rates) - 1)]
+
+
+def cn_streams(husband_income, num_children, params=DEFAULT_PARAMS):
+    """(periodical amount, years, child support amount, years) for CN.
+
+    Chinese law has no ongoing spousal maintenance beyond hardship
+    assistance, so the periodical stream is zero.
+    """
+    support = _support_rate(params.cn_support_rates, num_children) \
+        * np.asarray(husband_income, dtype=np.float64)
+    zero = np.zeros_like(support)
+    years = np.where(support > 0, params.child_support_years, 0)
+    return zero, zero.astype(np.int64), support, years
+
+
+def uk_streams(wife_income, husband_income, foregone_salary,
+               homemaker_years, num_children, params=DEFAULT_PARAMS):
+    """(periodical amount, years, child support amount, years) for UK."""
+    wife_income = np.asarray(wife_income, dtype=np.float64)
+    husband_income = np.asarray(husband_income, dtype=np.float64)
+    disadvantage = np.maximum(
+        np.asarray(foregone_salary, dtype=np.float64) - wife_income, 0.0)
+    periodical = np.minimum(
+        np.maximum(husband_income - wife_income, 0.0)
+        * params.periodical_share, disadvantage)
+    periodical_years = np.where(
+        periodical > 0,
+        np.ceil(np.asarray(homemaker_years) * params.periodical_term_factor),
+        0).astype(np.int64)
+    periodical = np.where(periodical_years > 0, periodical, 0.0)
+    support = _support_rate(params.uk_support_rates, num_children) \
+        * husband_income
+    support_years = np.where(support > 0, params.child_support_years, 0)
+    return periodical, periodical_years, support, support_years
+
+
+# ===================================================
+# SCHEDULES AND NPV
+# ===================================================
+
+def discount_factors(horizon, rate) -> np.ndarray:
+    """(1 + rate) ** -t for t = 0..horizon."""
+    return (1.0 + rate) ** -np.arange(horizon + 1, dtype=np.float64)
+
+
+def annuity_factors(horizon, rate) -> np.ndarray:
+    """PV of 1 a year for k years starting in year 1, for k = 0..horizon."""
+    factors = discount_factors(horizon, rate)
+    factors[0] = 0.0
+    return np.cumsum(factors)
+
+
+def schedule(lump_sum, periodical, periodical_years, support, support_years,
+             horizon=DEFAULT_PARAMS.horizon_years) -> CashFlows:
+    """Year-by-year receipts as (scenarios, horizon + 1) arrays."""
+    years = np.arange(horizon + 1)
+    paying = years >= 1
+
+    def stream(amount, duration):
+        active = paying & (years <= np.asarray(duration)[..., None])
+        return np.asarray(amount, dtype=np.float64)[..., None] * active
+
+    lump = np.asarray(lump_sum, dtype=np.float64)[..., None] * (years == 0)
+    periodical = stream(periodical, periodical_years)
+    child_support = stream(support, support_years)
+    return CashFlows(lump, periodical, child_support,
+                     lump + periodical + child_support)
+
+
+def npv(lump_sum, periodical, periodical_years, support, support_years,
+        horizon=DEFAULT_PARAMS.horizon_years,
+        rate=DEFAULT_PARAMS.discount_rate) -> np.ndarray:
+    """NPV of the schedule, via annuity factors (no schedule built)."""
+    annuity = annuity_factors(horizon, rate)
+    return (np.asarray(lump_sum, dtype=np.float64)
+            + periodical * annuity[np.minimum(periodical_years, horizon)]
+            + support * annuity[np.minimum(support_years, horizon)])
+
+
+def schedule_npv(flows, rate=DEFAULT_PARAMS.discount_rate) -> np.ndarray:
+    """NPV of a materialised CashFlows schedule."""
+    return flows.total @ discount_factors(flows.total.shape[-1] - 1, rate)
+
+
+# ===================================================
+# PROJECTIONS
+# ===================================================
+
+def project_cn(cn_total, husband_income, num_children,
+               params=DEFAULT_PARAMS) -> CashFlows:
+    return schedule(cn_total, *cn_streams(husband_income, num_children,
+                                          params),
+                    horizon=params.horizon_years)
+
+
+def project_uk(uk_total, wife_income, husband_income, foregone_salary,
+               homemaker_years, num_children,
+               params=DEFAULT_PARAMS) -> CashFlows:
+    return schedule(uk_total, *uk_streams(wife_income, husband_income,
+                                          foregone_salary, homemaker_years,
+                                          num_children, params),
+                    horizon=params.horizon_years)
+
+
+def npv_cn(cn_total, husband_income, num_children,
+           params=DEFAULT_PARAMS) -> np.ndarray:
+    return npv(cn_total, *cn_streams(husband_income, num_children, params),
+               horizon=params.horizon_years, rate=params.discount_rate)
+
+
+def npv_uk(uk_total, wife_income, husband_income, foregone_salary,
+           homemaker_years, num_children,
+           params=DEFAULT_PARAMS) -> np.ndarray:
+    return npv(uk_total, *uk_streams(wife_income, husband_income,
+                                     foregone_salary, homemaker_years,
+                                     num_children, params),
+               horizon=params.horizon_years, rate=params.discount_rate)
@@ -0,0 +1,586 @@
+"""
+MaritalQuant bulk client reports.
+
+Renders one HTML report per client with what the dashboard shows for
+a calculated scenario: the key metrics, the comparison and breakdown
+charts, the detailed breakdown per jurisdiction and the legal
+insights.
+
+  compute   the parent reads the client CSV and evaluates every
+            outcome at once with the batch engines, then hands the
+            rows to workers in small jobs;
+  render    a ProcessPoolExecutor renders the jobs.  Each worker's
+            initializer prepares the shared assets once: the report
+            CSS, the chart figures as JSON templates (per-report
+            values are patched in, so plotly is not re-run per
+            report) and the KB insight texts that do not depend on
+            the scenario;
+  resume    reports are written to a temporary name and renamed into
+            place, and every finished report is appended to
+            manifest.jsonl with a hash of its inputs.  A rerun skips
+            clients whose report exists for the same inputs, so an
+            interrupted run picks up where it stopped.
+
+plotly.js is written once to the output directory and the reports load
+it from there, so they work offline.  The reports carry a print
+stylesheet; print them to PDF from a browser.
+
+Client CSV columns:
+  client, total_assets, marriage_years, has_children, wife_is_homemaker,
+  homemaker_years, home_in_husband_name, husband_has_fault
+
+  Booleans are true/false, yes/no or 1/0 in any case and a blank cell is
+  false, as in ledger.py.  Amounts must be non-negative numbers and years
+  non-negative whole numbers.  A client with an unreadable value gets no
+  report; it is logged and recorded as failed in the manifest, and the
+  other clients are still rendered.
+
+Usage (from the MaritalQuant directory):
+  python reports.py clients.csv --out reports/ --workers 8
+  python reports.py clients.csv --out reports/ --currency GBP \\
+      --jurisdictions CN UK HK
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.offline
+
+from batch import insight_flags_batch, to_dicts
+from charts import build_breakdown_chart, build_comparison_chart
+from engine import (
+    SCENARIO_FIELDS, ChinaResult, Insight, UKResult, insight_params,
+    render_insight,
+)
+from fx import format_money, get_table
+from jurisdictions import (
+    JURISDICTIONS, SUMMARY_FIELDS, calculate_outcomes, label,
+)
+from ledger import parse_bools
+from legal_data import KB_VERSION
+
+
+log = logging.getLogger("reports")
+
+MANIFEST = "manifest.jsonl"
+PLOTLY_JS = "plotly.min.js"
+DEFAULT_JOB_SIZE = 32
+PROGRESS_SECONDS = 5.0
+
+BOOL_FIELDS = ("has_children", "wife_is_homemaker", "home_in_husband_name",
+               "husband_has_fault")
+
+ReportJob = namedtuple("ReportJob", [
+    "client", "key", "path", "scenario", "outcomes", "flags",
+])
+ReportJob.__doc__ = "One report's inputs, plain Python values only."
+
+ReportResult = namedtuple("ReportResult", "client key path error")
+
+REPORT_CSS = """
+body { font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
+       color: #0f172a; max-width: 960px; margin: 32px auto;
+       padding: 0 24px; }
+.report-header { background: linear-gradient(135deg, #0f172a 0%,
+                 #1e3a5f 50%, #1d4ed8 100%); color: #ffffff;
+                 border-radius: 16px; padding: 28px 36px; }
+.report-header h1 { margin: 0; font-size: 1.8rem; }
+.report-header p { margin: 6px 0 0; color: #cbd5e1; }
+.section-label { font-size: 0.8rem; font-weight: 700; color: #64748b;
+                 text-transform: uppercase; letter-spacing: 0.08em;
+                 margin: 28px 0 10px; }
+.metrics { display: flex; flex-wrap: wrap; gap: 12px; }
+.metric { flex: 1 1 180px; border: 1px solid #e2e8f0; border-radius: 14px;
+          padding: 16px 20px; background: #f8fafc; }
+.metric .metric-label { font-size: 0.75rem; font-weight: 600;
+                        color: #64748b; text-transform: uppercase; }
+.metric .metric-value { font-size: 1.4rem; font-weight: 800; }
+.jurisdiction-header { color: #ffffff; border-radius: 10px;
+                       padding: 8px 14px; font-weight: 700; }
+table { border-collapse: collapse; width: 100%; margin: 8px 0 16px; }
+td, th { border-bottom: 1px solid #e2e8f0; padding: 6px 8px;
+         text-align: left; }
+td.amount { text-align: right; font-variant-numeric: tabular-nums; }
+.insight { border-left: 4px solid #3b82f6; background: #eff6ff;
+           border-radius: 8px; padding: 10px 16px; margin: 10px 0; }
+.insight.warning { border-color: #f59e0b; background: #fffbeb; }
+.insight.success { border-color: #22c55e; background: #f0fdf4; }
+.note { color: #475569; font-size: 0.85rem; }
+@media print {
+  body { margin: 0; max-width: none; }
+  .chart, .insight, table { break-inside: avoid; }
+  .page-break { break-before: page; }
+}
+"""
+
+# Rows of the detailed breakdown tables; the rest use SUMMARY_FIELDS.
+CN_BREAKDOWN = (
+    ("Matrimonial Pool", "pool"),
+    ("Base Share (50%)", "base_share"),
+    ("Liquidity Discount (\u221220%)", "liquidity_discount"),
+    ("Effective Share", "effective_share"),
+    ("Housework Compensation", "compensation"),
+    ("Fault Adjustment", "fault_adjustment"),
+    ("Children Adjustment", "children_adjustment"),
+    ("Total Award", "total"),
+)
+UK_BREAKDOWN = (
+    ("Divisible Pool", "pool"),
+    ("Sharing Base (50%)", "sharing_base"),
+    ("Needs Outcome (60%)", "needs_outcome"),
+    ("Homemaker Compensation", "compensation"),
+    ("Homemaker Outcome", "homemaker_outcome"),
+    ("Total Award", "total"),
+)
+SUMMARY_BREAKDOWN = (
+    ("Divisible Pool", "pool"),
+    ("Sharing Base", "sharing"),
+    ("Compensation", "compensation"),
+    ("Adjustments", "adjustments"),
+    ("Total Award", "total"),
+)
+
+
+# ===================================================
+# WORKER ASSETS
+# ===================================================
+
+# Set once per worker process by init_worker.
+_ASSETS = {}
+
+
+def _chart_template(fig) -> dict:
+    """Trace dicts to patch per report, plus the layout pre-serialised."""
+    spec = json.loads(fig.to_json())
+    return {"data": spec["data"], "layout": json.dumps(spec["layout"])}
+
+
+def init_worker(codes, display):
+    """Prepare the assets every report in this worker shares."""
+    placeholder = {code: dict.fromkeys(SUMMARY_FIELDS, 1.0) for code in codes}
+    _ASSETS.update(
+        codes=tuple(codes),
+        display=display,
+        head=(f"<meta charset=\"utf-8\">"
+              f"<style>{REPORT_CSS}</style>"
+              f"<script src=\"{PLOTLY_JS}\"></script>"),
+        comparison=_chart_template(build_comparison_chart(placeholder,
+                                                           display)),
+        breakdown=_chart_template(build_breakdown_chart(placeholder,
+                                                         display)),
+        insights={int(code): render_insight(int(code), (), KB_VERSION)
+                  for code in (Insight.UK_NON_FINANCIAL,
+                               Insight.CHILDREN_WELFARE, Insight.FAULT)},
+    )
+
+
+# ===================================================
+# RENDERING
+# ===================================================
+
+def _money(amount):
+    return html.escape(format_money(amount, _ASSETS["display"]))
+
+
+def _markdown(text) -> str:
+    """The small Markdown subset the KB texts use, as HTML."""
+    text = html.escape(text, quote=False)
+    text = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", text)
+    text = re.sub(r"\*(.+?)\*", r"<em>\1</em>", text)
+    return "".join(f"<p>{para}</p>" for para in text.split("\n\n"))
+
+
+def _figure(template, div_id, traces) -> str:
+    """A chart template with per-trace value patches, as a plot script."""
+    data = [{**trace, **patch}
+            for trace, patch in zip(template["data"], traces)]
+    return (f"<div class=\"chart\" id=\"{div_id}\"></div><script>"
+            f"Plotly.newPlot(\"{div_id}\", {json.dumps(data)}, "
+            f"{template['layout']}, {{displayModeBar: false}});</script>")
+
+
+def _charts(outcomes) -> str:
+    display = _ASSETS["display"]
+    symbol, rate = display.symbol, display.rate
+    codes = _ASSETS["codes"]
+    # Trace order follows charts.py: comparison has one trace per
+    # jurisdiction; breakdown one per (component, jurisdiction).
+    comparison = []
+    for code in codes:
+        total = outcomes[code]["total"] / rate
+        comparison.append({"x": [total], "text": [f"{symbol}{total:,.0f}"]})
+    breakdown = []
+    for component in ("sharing", "compensation", "adjustments"):
+        for code in codes:
+            value = max(0, outcomes[code][component]) / rate
+            breakdown.append({"y": [value], "text": [
+                f"{symbol}{value:,.0f}" if value > 0 else ""]})
+    return (_figure(_ASSETS["comparison"], "comparison", comparison)
+            + _figure(_ASSETS["breakdown"], "breakdown", breakdown))
+
+
+def _table(rows, values) -> str:
+    body = "".join(
+        f"<tr><td>{html.escape(name)}</td>"
+        f"<td class=\"amount\">{_money(values[field])}</td></tr>"
+        for name, field in rows)
+    rate = values["enforcement_rate"]
+    return (f"<table>{body}<tr><td>\u2696\ufe0f Enforcement</td>"
+            f"<td class=\"amount\">{rate:.0%}</td></tr></table>")
+
+
+def _breakdown(code, outcome) -> str:
+    jurisdiction = JURISDICTIONS[code]
+    header = (f"<div class=\"jurisdiction-header\" "
+              f"style=\"background: {jurisdiction.header};\">"
+              f"{html.escape(label(code))} Breakdown</div>")
+    if code == "CN":
+        notes = [f"\U0001f3e0 {outcome['housing']}"]
+        return header + _table(CN_BREAKDOWN, outcome) + "".join(
+            f"<p class=\"note\">{html.escape(note)}</p>" for note in notes)
+    if code == "UK":
+        notes = [f"\U0001f4cc {outcome['driver']}",
+                 f"\U0001f3e0 {outcome['housing']}",
+                 outcome["mingling_note"], outcome["needs_note"]]
+        if outcome["compensation"] > 0:
+            notes.append(outcome["comp_note"])
+        return header + _table(UK_BREAKDOWN, outcome) + "".join(
+            f"<p class=\"note\">{html.escape(note)}</p>" for note in notes)
+    return (header + _table(SUMMARY_BREAKDOWN, outcome)
+            + f"<p class=\"note\">{html.escape(jurisdiction.basis)}</p>")
+
+
+def _insights(job) -> str:
+    cn, uk = job.outcomes["CN"], job.outcomes["UK"]
+    parts = []
+    for code in Insight:
+        if not job.flags & code:
+            continue
+        insight = _ASSETS["insights"].get(int(code))
+        if insight is None:
+            insight = render_insight(int(code), insight_params(
+                int(code), cn, uk, job.scenario["marriage_years"]),
+                KB_VERSION, _ASSETS["display"])
+        parts.append(f"<div class=\"insight {insight['level']}\">"
+                     f"<strong>{html.escape(insight['label'])}</strong>"
+                     f"{_markdown(insight['body'])}</div>")
+    return "".join(parts)
+
+
+def render_report(job) -> str:
+    """The HTML report for one client."""
+    scenario = job.scenario
+    codes = _ASSETS["codes"]
+    totals = {code: job.outcomes[code]["total"] for code in codes}
+    metrics = [("Total Assets", _money(scenario["total_assets"])),
+               ("Marriage", f"{scenario['marriage_years']} years")]
+    metrics += [(f"{label(code)} Award", _money(totals[code]))
+                for code in codes]
+    if len(codes) >= 2:
+        metrics.append(("Award Gap", _money(max(totals.values())
+                                            - min(totals.values()))))
+    metric_html = "".join(
+        f"<div class=\"metric\"><div class=\"metric-label\">"
+        f"{html.escape(name)}</div><div class=\"metric-value\">{value}"
+        f"</div></div>" for name, value in metrics)
+    client = html.escape(str(job.client))
+    return (
+        f"<!DOCTYPE html><html><head><title>MaritalQuant report: {client}"
+        f"</title>{_ASSETS['head']}</head><body>"
+        f"<div class=\"report-header\"><h1>\u2696\ufe0f MaritalQuant "
+        f"report: {client}</h1><p>Amounts in "
+        f"{_ASSETS['display'].currency}; knowledge base {KB_VERSION}</p>"
+        f"</div>"
+        f"<div class=\"section-label\">Key Outcomes</div>"
+        f"<div class=\"metrics\">{metric_html}</div>"
+        f"<div class=\"section-label\">Comparison</div>"
+        f"{_charts(job.outcomes)}"
+        f"<div class=\"section-label page-break\">Detailed Breakdown</div>"
+        f"{''.join(_breakdown(code, job.outcomes[code]) for code in codes)}"
+        f"<div class=\"section-label\">Legal Analysis</div>"
+        f"{_insights(job)}"
+        f"</body></html>")
+
+
+def _write_atomic(path, text):
+    part = f"{path}.part"
+    with open(part, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(part, path)
+
+
+def render_jobs(jobs) -> list:
+    """Render and write a batch of reports; failures do not stop it."""
+    results = []
+    for job in jobs:
+        try:
+            _write_atomic(job.path, render_report(job))
+            results.append(ReportResult(job.client, job.key, job.path, None))
+        except Exception as exc:  # noqa: BLE001 - reported per client
+            results.append(ReportResult(job.client, job.key, job.path,
+                                        f"{type(exc).__name__}: {exc}"))
+    return results
+
+
+# ===================================================
+# PLANNING
+# ===================================================
+
+def read_clients(path) -> pd.DataFrame:
+    """The client CSV with typed scenario columns and an "error" column.
+
+    A row with an unreadable value keeps its place with zeroed scenario
+    columns; its "error" names the bad cells (None on valid rows).
+    """
+    df = pd.read_csv(path, dtype={"client": str})
+    missing = [c for c in ("client",) + SCENARIO_FIELDS
+               if c not in df.columns]
+    if missing:
+        raise KeyError(f"client file has no column(s): {', '.join(missing)}")
+    if df["client"].duplicated().any():
+        dupes = sorted(set(df["client"][df["client"].duplicated()]))
+        raise ValueError(f"duplicate client id(s): {', '.join(dupes[:5])}")
+
+    errors = [[] for _ in range(len(df))]
+    columns = {}
+    for name in SCENARIO_FIELDS:
+        raw = df[name]
+        if name in BOOL_FIELDS:
+            values, invalid = parse_bools(raw)
+        else:
+            values = pd.to_numeric(raw, errors="coerce").to_numpy(
+                dtype=np.float64)
+            invalid = ~(np.isfinite(values) & (values >= 0))
+            if name != "total_assets":
+                invalid |= np.floor(values) != values
+        for i in np.flatnonzero(invalid):
+            text = "" if pd.isna(raw.iat[i]) else str(raw.iat[i])
+            errors[i].append(f"{name}={text!r}")
+        values = np.where(invalid, 0, values)
+        columns[name] = (values.astype(np.float64) if name == "total_assets"
+                         else values.astype(bool) if name in BOOL_FIELDS
+                         else values.astype(np.int64))
+    df = df.assign(**columns)
+    df["error"] = pd.Series([f"invalid {', '.join(bad)}" if bad else None
+                             for bad in errors], index=df.index, dtype=object)
+    return df
+
+
+def report_name(client) -> str:
+    return re.sub(r"[^\w.-]", "_", str(client)) + ".html"
+
+
+def input_key(scenario, codes, display) -> str:
+    """Hash of everything a report's content depends on."""
+    payload = json.dumps([scenario, list(codes), display.currency,
+                          display.rate, KB_VERSION], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def read_manifest(path) -> dict:
+    """{client: key} of the reports finished by earlier runs."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:   # a line cut off by a crash
+                continue
+            if entry.get("error") is None:
+                done[entry["client"]] = entry["key"]
+            else:
+                done.pop(entry["client"], None)
+    return done
+
+
+def plan_jobs(df, out_dir, codes, display, job_size=DEFAULT_JOB_SIZE,
+              force=False):
+    """(jobs, skipped, rejected) for a read_clients() frame.
+
+    jobs are ReportJob lists for clients still to render; rejected are
+    failed ReportResults for the rows read_clients could not read.
+    """
+    out_dir = Path(out_dir)
+    names = df["client"].map(report_name)
+    if names.duplicated().any():
+        raise ValueError("client ids collide after making them file names: "
+                         + ", ".join(sorted(set(df["client"][
+                             names.duplicated(keep=False)]))[:5]))
+    rejected = [ReportResult(client, None, str(out_dir / name), error)
+                for client, name, error in zip(df["client"], names,
+                                               df["error"])
+                if error is not None]
+    # read_clients typed these columns, so the records are plain Python
+    # floats, ints and bools.
+    scenarios = df[list(SCENARIO_FIELDS)].to_dict("records")
+    keys = [input_key(s, codes, display) for s in scenarios]
+    done = {} if force else read_manifest(out_dir / MANIFEST)
+    todo = [i for i, (client, key, name, error) in enumerate(
+        zip(df["client"], keys, names, df["error"]))
+        if error is None
+        and (done.get(client) != key or not (out_dir / name).exists())]
+    skipped = len(df) - len(todo) - len(rejected)
+    if not todo:
+        return [], skipped, rejected
+
+    rows = df.iloc[todo]
+    columns = [rows[name].to_numpy() for name in SCENARIO_FIELDS]
+    outcomes = calculate_outcomes(*columns, codes=("CN", "UK") + tuple(
+        code for code in codes if code not in ("CN", "UK")))
+    flags = insight_flags_batch(
+        outcomes["CN"], outcomes["UK"], rows["wife_is_homemaker"].to_numpy(),
+        rows["has_children"].to_numpy(), rows["marriage_years"].to_numpy())
+    per_row = {"CN": to_dicts(outcomes["CN"], ChinaResult),
+               "UK": to_dicts(outcomes["UK"], UKResult)}
+    for code in outcomes:
+        if code not in per_row:
+            rate = JURISDICTIONS[code].enforcement_rate
+            lists = {name: outcomes[code][name].tolist()
+                     for name in SUMMARY_FIELDS}
+            per_row[code] = [dict(zip(lists, values), enforcement_rate=rate)
+                             for values in zip(*lists.values())]
+    for code in ("CN", "UK"):
+        # The summary components the charts read.
+        for row, sharing, adjustments in zip(
+                per_row[code], outcomes[code]["sharing"].tolist(),
+                outcomes[code]["adjustments"].tolist()):
+            row["sharing"], row["adjustments"] = sharing, adjustments
+
+    jobs = [ReportJob(df["client"].iat[i], keys[i],
+                      str(out_dir / names.iat[i]), scenarios[i],
+                      {code: per_row[code][j] for code in per_row},
+                      int(flags[j]))
+            for j, i in enumerate(todo)]
+    return ([jobs[start:start + job_size]
+             for start in range(0, len(jobs), job_size)], skipped, rejected)
+
+
+# ===================================================
+# RUN
+# ===================================================
+
+def generate_reports(clients_path, out_dir, codes=("CN", "UK"),
+                     currency="CNY", workers=1, job_size=DEFAULT_JOB_SIZE,
+                     force=False) -> dict:
+    """Render every client's report into `out_dir`; resumable.
+
+    Returns counts of rendered, skipped and failed reports; clients
+    whose rows cannot be read count as failed.
+    """
+    unknown = [code for code in codes if code not in JURISDICTIONS]
+    if unknown:
+        raise KeyError(f"unknown jurisdiction(s): {', '.join(unknown)}")
+    display = get_table().display(currency)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if not (out_dir / PLOTLY_JS).exists():
+        _write_atomic(out_dir / PLOTLY_JS, plotly.offline.get_plotlyjs())
+
+    df = read_clients(clients_path)
+    batches, skipped, rejected = plan_jobs(df, out_dir, codes, display,
+                                           job_size, force)
+    total = sum(len(batch) for batch in batches)
+    log.info("%d clients: %d to render, %d already done, %d unreadable",
+             len(df), total, skipped, len(rejected))
+    counts = {"rendered": 0, "skipped": skipped, "failed": 0}
+    if not total and not rejected:
+        return counts
+
+    started = last_log = time.perf_counter()
+    with open(out_dir / MANIFEST, "a", encoding="utf-8") as manifest:
+        def record(results):
+            for result in results:
+                manifest.write(json.dumps(result._asdict()) + "\n")
+                if result.error is None:
+                    counts["rendered"] += 1
+                else:
+                    counts["failed"] += 1
+                    log.error("report for %s failed: %s", result.client,
+                              result.error)
+            manifest.flush()
+            nonlocal last_log
+            now = time.perf_counter()
+            finished = counts["rendered"] + counts["failed"] - len(rejected)
+            if total and (now - last_log >= PROGRESS_SECONDS
+                          or finished == total):
+                last_log = now
+                log.info("%d/%d reports (%.0f/s, %d failed)", finished,
+                         total, finished / (now - started), counts["failed"])
+
+        record(rejected)
+        if not total:
+            return counts
+
+        if workers <= 1:
+            init_worker(codes, display)
+            for batch in batches:
+                record(render_jobs(batch))
+            return counts
+
+        # Keep a bounded number of jobs in flight so the parent does not
+        # pickle the whole portfolio up front.
+        pending = iter(batches)
+        with ProcessPoolExecutor(workers, initializer=init_worker,
+                                 initargs=(codes, display)) as pool:
+            running = set()
+            try:
+                while True:
+                    for batch in pending:
+                        running.add(pool.submit(render_jobs, batch))
+                        if len(running) >= 2 * workers:
+                            break
+                    if not running:
+                        break
+                    finished, running = wait(running,
+                                             return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        record(future.result())
+            except KeyboardInterrupt:
+                pool.shutdown(wait=False, cancel_futures=True)
+                log.warning("interrupted after %d reports; rerun to resume",
+                            counts["rendered"])
+                raise
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("clients", help="client CSV")
+    parser.add_argument("--out", default="reports")
+    parser.add_argument("--jurisdictions", nargs="+", default=["CN", "UK"])
+    parser.add_argument("--currency", default="CNY",
+                        help="display currency (fx.py rate table)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--job-size", type=int, default=DEFAULT_JOB_SIZE)
+    parser.add_argument("--force", action="store_true",
+                        help="re-render reports that are already done")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        counts = generate_reports(args.clients, args.out,
+                                  tuple(args.jurisdictions), args.currency,
+                                  args.workers, args.job_size, args.force)
+    except KeyboardInterrupt:
+        return 130
+    log.info("done: %(rendered)d rendered, %(skipped)d skipped, "
+             "%(failed)d failed", counts)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
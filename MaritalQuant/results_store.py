@@ -0,0 +1,396 @@
+"""
+MaritalQuant memory-mapped results store.
+
+Persists a parameter sweep as one raw little-endian file per column
+plus a small meta.json, and answers filtered queries without loading
+the columns into RAM:
+
+  * sorted indexes on total_assets and marriage_years
+    (<col>.idx row ids in value order, <col>.sorted the values), built
+    with an out-of-core bucket sort, so they can be built for sweeps
+    larger than memory.  Bucket boundaries are sample quantiles, so a
+    bucket holds about BUCKET_ROWS rows, except that every row of one
+    heavy value (low-cardinality columns such as marriage_years) lands
+    in a single bucket; those rows are copied through in chunks rather
+    than sorted, keeping the build's memory near BUCKET_ROWS rows;
+  * bitmap indexes (np.packbits) on the four boolean inputs.
+
+iter_query() reads indexes, bitmaps and columns one block at a time
+(QUERY_BLOCK ids from a sorted index, chunk_size rows when scanning),
+so its memory is bounded by the block size however many rows match;
+query() and fetch() return whole results in memory.
+
+Columns mirror columnar.py: the scenario inputs, cn_<field> and
+uk_<field> for every result field (text fields as int8 TextCodes),
+gap and insight_flags.
+
+Usage:
+  store = ResultsStore.build("sweep.mq", scenarios)      # any iterable
+  store = ResultsStore.open("sweep.mq")
+  ids = store.query(has_children=True, homemaker_years={"ge": 5},
+                    gap={"gt": 1_000_000})
+  rows = store.fetch(ids, ["total_assets", "cn_total", "uk_total"])
+"""
+
+import json
+import os
+
+import numpy as np
+
+from batch import DEFAULT_CHUNK_SIZE, iter_outcome_chunks
+from engine import SCENARIO_FIELDS, ChinaResult, UKResult
+
+
+SORTED_INDEX_COLUMNS = ("total_assets", "marriage_years")
+BITMAP_COLUMNS = ("has_children", "wife_is_homemaker",
+                  "home_in_husband_name", "husband_has_fault")
+# Rows per sort bucket; bounds memory while building sorted indexes.
+BUCKET_ROWS = 4_000_000
+# Ids gathered per step when answering a query from a sorted index.
+QUERY_BLOCK = 1 << 20
+# Use an index only when it narrows the candidates below this fraction;
+# otherwise a sequential scan is faster than random gathers.
+INDEX_SELECTIVITY = 0.25
+
+
+def _column_dtypes():
+    dtypes = {
+        "total_assets": np.dtype("<f8"),
+        "marriage_years": np.dtype("<i2"),
+        "has_children": np.dtype("?"),
+        "wife_is_homemaker": np.dtype("?"),
+        "homemaker_years": np.dtype("<i2"),
+        "home_in_husband_name": np.dtype("?"),
+        "husband_has_fault": np.dtype("?"),
+    }
+    for prefix, record_type in (("cn", ChinaResult), ("uk", UKResult)):
+        for name in record_type._fields:
+            dtypes[f"{prefix}_{name}"] = (
+                np.dtype("i1") if name in record_type._text_fields
+                else np.dtype("<f8"))
+    dtypes["gap"] = np.dtype("<f8")
+    dtypes["insight_flags"] = np.dtype("u1")
+    return dtypes
+
+
+COLUMN_DTYPES = _column_dtypes()
+
+
+def _chunk_columns(chunk):
+    columns = {name: chunk.inputs[name] for name in SCENARIO_FIELDS}
+    for prefix, result in (("cn", chunk.cn), ("uk", chunk.uk)):
+        for name, values in result.items():
+            columns[f"{prefix}_{name}"] = values
+    columns["gap"] = chunk.uk["total"] - chunk.cn["total"]
+    columns["insight_flags"] = chunk.flags
+    return columns
+
+
+def _predicate_mask(values, condition):
+    """Evaluate one query condition against an array of column values."""
+    if isinstance(condition, dict):
+        mask = np.ones(len(values), dtype=bool)
+        for op, bound in condition.items():
+            if op == "gt":
+                mask &= values > bound
+            elif op == "ge":
+                mask &= values >= bound
+            elif op == "lt":
+                mask &= values < bound
+            elif op == "le":
+                mask &= values <= bound
+            elif op == "eq":
+                mask &= values == bound
+            else:
+                raise ValueError(f"unknown comparison {op!r}")
+        return mask
+    if isinstance(condition, tuple):
+        low, high = condition
+        mask = np.ones(len(values), dtype=bool)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return mask
+    return values == condition
+
+
+def _index_bounds(sorted_values, condition):
+    """Slice [start, stop) of a sorted index satisfying `condition`."""
+    start, stop = 0, len(sorted_values)
+    if isinstance(condition, dict):
+        bounds = condition
+    elif isinstance(condition, tuple):
+        bounds = {"ge": condition[0], "le": condition[1]}
+    else:
+        bounds = {"eq": condition}
+    for op, bound in bounds.items():
+        if bound is None:
+            continue
+        if op in ("gt", "le"):
+            pos = int(np.searchsorted(sorted_values, bound, side="right"))
+        else:
+            pos = int(np.searchsorted(sorted_values, bound, side="left"))
+        if op in ("gt", "ge"):
+            start = max(start, pos)
+        elif op in ("lt", "le"):
+            stop = min(stop, pos)
+        elif op == "eq":
+            start = max(start, pos)
+            stop = min(stop, int(np.searchsorted(sorted_values, bound,
+                                                 side="right")))
+        else:
+            raise ValueError(f"unknown comparison {op!r}")
+    return start, max(start, stop)
+
+
+class ResultsStore:
+    """Read side of a sweep directory written by ResultsStore.build."""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.rows = meta["rows"]
+        self._dtypes = {name: np.dtype(dtype)
+                        for name, dtype in meta["columns"].items()}
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def columns(self):
+        return tuple(self._dtypes)
+
+    # ---------------------------------------------------------- build --
+
+    @classmethod
+    def build(cls, path, scenarios, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Evaluate `scenarios` in chunks and persist columns + indexes."""
+        os.makedirs(path, exist_ok=True)
+        files = {name: open(os.path.join(path, f"{name}.col"), "wb")
+                 for name in COLUMN_DTYPES}
+        rows = 0
+        try:
+            for chunk in iter_outcome_chunks(scenarios, chunk_size):
+                for name, values in _chunk_columns(chunk).items():
+                    np.asarray(values, COLUMN_DTYPES[name]).tofile(files[name])
+                rows += len(chunk.flags)
+        finally:
+            for fh in files.values():
+                fh.close()
+        meta = {"rows": rows,
+                "columns": {name: dtype.str
+                            for name, dtype in COLUMN_DTYPES.items()},
+                "sorted_indexes": list(SORTED_INDEX_COLUMNS),
+                "bitmap_indexes": list(BITMAP_COLUMNS)}
+        store = cls(path, meta)
+        for name in BITMAP_COLUMNS:
+            store._build_bitmap(name, chunk_size)
+        for name in SORTED_INDEX_COLUMNS:
+            store._build_sorted_index(name, chunk_size)
+        with open(os.path.join(path, "meta.json"), "w",
+                  encoding="utf-8") as fh:
+            json.dump(meta, fh, indent=2)
+        return store
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as fh:
+            return cls(path, json.load(fh))
+
+    def _file(self, suffix):
+        return os.path.join(self.path, suffix)
+
+    def _build_bitmap(self, name, chunk_size):
+        # Chunks are multiples of 8 rows so packed bytes line up.
+        step = max(8, chunk_size - chunk_size % 8)
+        values = self.column(name)
+        with open(self._file(f"{name}.bitmap"), "wb") as fh:
+            for start in range(0, self.rows, step):
+                np.packbits(values[start:start + step]).tofile(fh)
+
+    def _build_sorted_index(self, name, chunk_size):
+        """Out-of-core bucket sort of row ids by column value."""
+        values = self.column(name)
+        if self.rows == 0:
+            for suffix in ("idx", "sorted"):
+                open(self._file(f"{name}.{suffix}"), "wb").close()
+            return
+        sample = np.sort(values[::max(1, self.rows // 1_000_000)])
+        buckets = max(1, -(-self.rows // BUCKET_ROWS))
+        boundaries = np.unique(
+            sample[np.linspace(0, len(sample) - 1, buckets + 1)
+                   .astype(np.int64)[1:-1]])
+
+        # Pass 1: bucket sizes.
+        counts = np.zeros(len(boundaries) + 1, dtype=np.int64)
+        for start in range(0, self.rows, chunk_size):
+            bucket = np.searchsorted(boundaries,
+                                     values[start:start + chunk_size],
+                                     side="right")
+            counts += np.bincount(bucket, minlength=len(counts))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+
+        # Pass 2: scatter row ids into their bucket (stable by row id).
+        idx = np.lib.format.open_memmap(
+            self._file(f"{name}.idx.npy"), mode="w+", dtype=np.int64,
+            shape=(self.rows,))
+        fill = offsets[:-1].copy()
+        for start in range(0, self.rows, chunk_size):
+            chunk = values[start:start + chunk_size]
+            bucket = np.searchsorted(boundaries, chunk, side="right")
+            order = np.argsort(bucket, kind="stable")
+            sorted_bucket = bucket[order]
+            group_start = np.searchsorted(sorted_bucket, sorted_bucket,
+                                          side="left")
+            rank = np.arange(len(order)) - group_start
+            idx[fill[sorted_bucket] + rank] = start + order
+            fill += np.bincount(bucket, minlength=len(fill))
+
+        # Pass 3: sort each bucket by value in memory.
+        sorted_values = np.lib.format.open_memmap(
+            self._file(f"{name}.sorted.npy"), mode="w+", dtype=values.dtype,
+            shape=(self.rows,))
+        for b in range(len(counts)):
+            lo, hi = offsets[b], offsets[b + 1]
+            if lo == hi:
+                continue
+            if hi - lo > BUCKET_ROWS and b > 0:
+                lo = self._copy_heavy_value(values, idx, sorted_values,
+                                            lo, hi, boundaries[b - 1],
+                                            chunk_size)
+            ids = np.asarray(idx[lo:hi])
+            bucket_values = values[ids]
+            order = np.argsort(bucket_values, kind="stable")
+            idx[lo:hi] = ids[order]
+            sorted_values[lo:hi] = bucket_values[order]
+        idx.flush()
+        sorted_values.flush()
+        del idx, sorted_values
+        for suffix in ("idx", "sorted"):
+            os.replace(self._file(f"{name}.{suffix}.npy"),
+                       self._file(f"{name}.{suffix}"))
+
+    @staticmethod
+    def _copy_heavy_value(values, idx, sorted_values, lo, hi, heavy,
+                          chunk_size) -> int:
+        """Move bucket rows equal to `heavy` to its front, in chunks.
+
+        Pass 2 left them in row-id order, which is already their sorted
+        order.  Returns where the remaining (unsorted) rows now start.
+        """
+        write, rest = lo, []
+        for start in range(lo, hi, chunk_size):
+            ids = np.array(idx[start:min(hi, start + chunk_size)])
+            same = values[ids] == heavy
+            stop = write + int(same.sum())
+            # write <= start: only slots already read are overwritten.
+            idx[write:stop] = ids[same]
+            sorted_values[write:stop] = heavy
+            write = stop
+            rest.append(ids[~same])
+        idx[write:hi] = np.concatenate(rest)
+        return write
+
+    # ---------------------------------------------------------- read ---
+
+    def column(self, name) -> np.ndarray:
+        """Read-only memory map of one column."""
+        if name not in self._dtypes:
+            raise KeyError(name)
+        if self.rows == 0:
+            return np.empty(0, self._dtypes[name])
+        return np.memmap(self._file(f"{name}.col"), dtype=self._dtypes[name],
+                         mode="r", shape=(self.rows,))
+
+    def _sorted_index(self, name):
+        if self.rows == 0:
+            return np.empty(0, np.int64), np.empty(0, self._dtypes[name])
+        idx = np.load(self._file(f"{name}.idx"), mmap_mode="r")
+        values = np.load(self._file(f"{name}.sorted"), mmap_mode="r")
+        return idx, values
+
+    def _bitmap(self, name):
+        return np.memmap(self._file(f"{name}.bitmap"), dtype=np.uint8,
+                         mode="r")
+
+    def _bitmap_test(self, name, ids, wanted):
+        bits = (self._bitmap(name)[ids >> 3] >> (7 - (ids & 7))) & 1
+        return bits.astype(bool) == bool(wanted)
+
+    def iter_query(self, chunk_size=DEFAULT_CHUNK_SIZE, **conditions):
+        """Yield arrays of matching row ids, block by block.
+
+        Conditions are keyword arguments per column: a scalar means
+        equality, `(low, high)` an inclusive range (None for open) and
+        a dict uses gt/ge/lt/le/eq.  Memory is bounded by the block
+        size, so result sets larger than RAM can be streamed.
+        """
+        for name in conditions:
+            if name not in self._dtypes:
+                raise KeyError(f"unknown column {name!r}")
+        if self.rows == 0:
+            return
+
+        best = None
+        for name in SORTED_INDEX_COLUMNS:
+            if name in conditions:
+                idx, values = self._sorted_index(name)
+                start, stop = _index_bounds(values, conditions[name])
+                if best is None or stop - start < best[2] - best[1]:
+                    best = (idx, start, stop, name)
+
+        if best is not None and \
+                best[2] - best[1] <= self.rows * INDEX_SELECTIVITY:
+            idx, start, stop, used = best
+            rest = {k: v for k, v in conditions.items() if k != used}
+            for lo in range(start, stop, QUERY_BLOCK):
+                ids = np.sort(idx[lo:min(stop, lo + QUERY_BLOCK)])
+                mask = self._match(ids, rest)
+                if mask.any():
+                    yield ids[mask]
+            return
+
+        # Sequential scan; bitmap conditions are applied first so the
+        # remaining columns are only compared for surviving rows.
+        for start in range(0, self.rows, chunk_size):
+            ids = np.arange(start, min(self.rows, start + chunk_size))
+            mask = self._match(ids, conditions, contiguous=True)
+            if mask.any():
+                yield ids[mask]
+
+    def _match(self, ids, conditions, contiguous=False):
+        mask = np.ones(len(ids), dtype=bool)
+        for name, condition in conditions.items():
+            if name in BITMAP_COLUMNS and not isinstance(condition,
+                                                         (dict, tuple)):
+                mask &= self._bitmap_test(name, ids, condition)
+        for name, condition in conditions.items():
+            if name in BITMAP_COLUMNS and not isinstance(condition,
+                                                         (dict, tuple)):
+                continue
+            if not mask.any():
+                break
+            column = self.column(name)
+            if contiguous:
+                values = column[ids[0]:ids[-1] + 1]
+                mask &= _predicate_mask(values, condition)
+            else:
+                live = ids[mask]
+                mask[mask] = _predicate_mask(column[live], condition)
+        return mask
+
+    def query(self, **conditions) -> np.ndarray:
+        """All matching row ids, ascending (materialised in memory)."""
+        blocks = list(self.iter_query(**conditions))
+        if not blocks:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(blocks))
+
+    def count(self, **conditions) -> int:
+        return sum(len(block) for block in self.iter_query(**conditions))
+
+    def fetch(self, ids, columns=None) -> dict:
+        """Gather `columns` (default: all) for the given row ids."""
+        ids = np.asarray(ids, dtype=np.int64)
+        return {name: np.asarray(self.column(name)[ids])
+                for name in (columns or self.columns)}
@@ -0,0 +1,149 @@
+"""
+MaritalQuant shared result store and per-session memory accounting.
+
+Sessions keep only a small scenario key (a tuple of the seven engine
+inputs) in st.session_state.  RESULT_STORE caches CN/UK results once,
+process wide: identical scenarios share one entry, and results
+that only idle sessions were showing are evicted with them; anything
+else ages out of the LRU.  The dashboard's dataflow
+graph (dataflow.py) reads its records from here; misses are computed
+with backends.calculate_one.
+
+The store also records how many bytes each live session holds so
+operators can see per-session and total footprint.  touch() only keeps
+a reference to the latest state snapshot; it is measured when
+memory_report() asks, not on every rerun.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from backends import calculate_one
+
+
+def scenario_key(total_assets, marriage_years, has_children,
+                 wife_is_homemaker, homemaker_years,
+                 home_in_husband_name, husband_has_fault):
+    """Hashable key for one set of calculate_outcomes inputs."""
+    return (
+        total_assets, int(marriage_years), bool(has_children),
+        bool(wife_is_homemaker), int(homemaker_years),
+        bool(home_in_husband_name), bool(husband_has_fault),
+    )
+
+
+def deep_sizeof(obj, _seen=None) -> int:
+    """Approximate bytes reachable from `obj` (shared objects counted once)."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, _seen) + deep_sizeof(v, _seen)
+                    for k, v in obj.items())
+    elif isinstance(obj, tuple):
+        # tuple.__iter__: result records iterate their keys, like a dict.
+        size += sum(deep_sizeof(item, _seen) for item in tuple.__iter__(obj))
+    elif isinstance(obj, (list, set, frozenset)):
+        size += sum(deep_sizeof(item, _seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), _seen)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, name), _seen)
+                    for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+class ResultStore:
+    """Process-wide LRU of scenario results with idle-session eviction."""
+
+    def __init__(self, max_entries=4096, idle_seconds=30 * 60,
+                 sweep_interval=60):
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self._results = OrderedDict()   # scenario key -> (cn, uk)
+        # session id -> [key, last_seen, state, bytes or None if unmeasured]
+        self._sessions = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def results(self, key):
+        """Return (cn, uk) for `key`, computing and caching on a miss."""
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                return cached
+        cached = calculate_one(*key)
+        with self._lock:
+            self._results[key] = cached
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return cached
+
+    def touch(self, session_id, key, state=None, now=None):
+        """Record that `session_id` is active and the state it holds."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._sessions[session_id] = [key, now, state,
+                                          0 if state is None else None]
+        if now - self._last_sweep >= self.sweep_interval:
+            self.evict_idle(now)
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_idle(self, now=None) -> int:
+        """Drop idle sessions and any results only they referenced.
+
+        Results that no session currently shows (earlier reruns, other
+        processes' warm-up) are left to the LRU bound.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            idle = [sid for sid, (_, seen, _, _) in self._sessions.items()
+                    if now - seen > self.idle_seconds]
+            idle_keys = {self._sessions.pop(sid)[0] for sid in idle}
+            live_keys = {entry[0] for entry in self._sessions.values()}
+            stale = [key for key in idle_keys - live_keys
+                     if key in self._results]
+            for key in stale:
+                del self._results[key]
+        return len(stale)
+
+    def memory_report(self) -> dict:
+        """Bytes held per session and in total, plus the shared cache."""
+        with self._lock:
+            unmeasured = [(sid, state) for sid, (_, _, state, nbytes)
+                          in self._sessions.items() if nbytes is None]
+        # Size snapshots outside the lock; skip any replaced meanwhile.
+        measured = [(sid, state, deep_sizeof(state))
+                    for sid, state in unmeasured]
+        with self._lock:
+            for sid, state, nbytes in measured:
+                entry = self._sessions.get(sid)
+                if entry is not None and entry[2] is state:
+                    entry[3] = nbytes
+            sessions = {sid: nbytes or 0
+                        for sid, (_, _, _, nbytes) in self._sessions.items()}
+            cache_bytes = deep_sizeof(self._results)
+            entries = len(self._results)
+        return {
+            "sessions": sessions,
+            "session_count": len(sessions),
+            "session_bytes_total": sum(sessions.values()),
+            "cache_entries": entries,
+            "cache_bytes": cache_bytes,
+            "total_bytes": sum(sessions.values()) + cache_bytes,
+        }
+
+
+RESULT_STORE = ResultStore()
@@ -0,0 +1,66 @@
+"""API bulk backpressure."""
+
+import asyncio
+import json
+import threading
+
+import api
+
+
+async def post(port, path, payload):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return head.decode("latin-1"), json.loads(body)
+
+
+def test_saturated_bulk_path_answers_503(monkeypatch):
+    release = threading.Event()
+    real = api.evaluate_columnar
+
+    def slow(scenarios):
+        release.wait(10)
+        return real(scenarios)
+
+    # Only the columnar bulk path is slowed; single requests still use
+    # api.evaluate through the micro-batcher.
+    monkeypatch.setattr(api, "evaluate_columnar", slow)
+
+    async def scenario():
+        batcher = api.MicroBatcher()
+        batcher.start()
+        server_api = api.ApiServer(batcher, max_bulk=100,
+                                   max_bulk_concurrent=1)
+        server = await asyncio.start_server(server_api.handle_connection,
+                                            "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        bulk = {"scenarios": [api._SAMPLE_SCENARIO] * 3,
+                "format": "columns"}
+        try:
+            first = asyncio.create_task(post(port, "/v1/outcomes/bulk", bulk))
+            await asyncio.sleep(0.2)
+            busy_head, busy = await post(port, "/v1/outcomes/bulk", bulk)
+            single_head, _ = await post(port, "/v1/outcomes",
+                                        api._SAMPLE_SCENARIO)
+            release.set()
+            first_head, first_body = await first
+        finally:
+            release.set()
+            server.close()
+            await batcher.stop()
+            server_api.close()
+        return busy_head, busy, single_head, first_head, first_body
+
+    busy_head, busy, single_head, first_head, first_body = asyncio.run(
+        scenario())
+    assert busy_head.startswith("HTTP/1.1 503")
+    assert "Retry-After: 1" in busy_head
+    assert "error" in busy
+    assert single_head.startswith("HTTP/1.1 200")
+    assert first_head.startswith("HTTP/1.1 200")
+    assert len(first_body["results"]["cn"]["total"]) == 3
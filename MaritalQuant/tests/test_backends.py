@@ -0,0 +1,104 @@
+"""Differential tests: every compute backend matches the scalar engine."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from backends import (
+    BACKENDS, ENV_VAR, PYTHON_MAX_ROWS, calculate, calculate_one,
+    compare_columns, random_inputs, select_backend,
+)
+from batch import as_columns
+from engine import calculate_outcomes
+from lookup import MAX_TABLE_ASSETS, MAX_YEARS
+
+
+FAST_BACKENDS = ("numpy", "numba", "table")
+
+# Zero and tiny pools, both sides of the 10M needs threshold, the
+# largest in-table pool and one beyond it (the table falls back).
+EDGE_ASSETS = (0.0, 0.01, 9_999_999.99, 10_000_000.0, 10_000_000.01,
+               MAX_TABLE_ASSETS, MAX_TABLE_ASSETS * 10)
+# Both sides of the 10-year mingling rule and of the table's year range.
+EDGE_YEARS = (0, 1, 10, 11, MAX_YEARS, MAX_YEARS + 1, 100)
+
+
+def edge_grid():
+    """Every combination of edge amounts, years and boolean inputs."""
+    rows = [(assets, years, children, homemaker, hm_years, home, fault)
+            for assets, years, hm_years in itertools.product(
+                EDGE_ASSETS, EDGE_YEARS, EDGE_YEARS)
+            for children, homemaker, home, fault in itertools.product(
+                (False, True), repeat=4)]
+    return as_columns(*zip(*rows))
+
+
+def seeded_grid():
+    return as_columns(*random_inputs(20_000, seed=1234))
+
+
+def backend(name):
+    if name not in BACKENDS:
+        pytest.skip(f"{name} backend is not installed")
+    return BACKENDS[name]
+
+
+@pytest.mark.parametrize("grid", [edge_grid, seeded_grid],
+                         ids=["edges", "seeded"])
+@pytest.mark.parametrize("name", FAST_BACKENDS)
+def test_backend_matches_python(name, grid):
+    inputs = grid()
+    expected_cn, expected_uk = BACKENDS["python"](inputs)
+    cn, uk = backend(name)(inputs)
+    assert compare_columns(expected_cn, cn, 0.0) == []
+    assert compare_columns(expected_uk, uk, 0.0) == []
+
+
+@pytest.mark.parametrize("name", FAST_BACKENDS)
+def test_backend_output_layout(name):
+    inputs = seeded_grid()
+    expected = BACKENDS["python"](inputs)
+    actual = backend(name)(inputs)
+    for want, got in zip(expected, actual):
+        assert list(got) == list(want)
+        for column in want:
+            assert got[column].dtype == want[column].dtype
+            assert got[column].shape == want[column].shape
+
+
+def test_select_backend(monkeypatch):
+    monkeypatch.delenv(ENV_VAR, raising=False)
+    assert select_backend(1) == "python"
+    assert select_backend(PYTHON_MAX_ROWS + 1) == "numpy"
+    assert select_backend(1, backend="table") == "table"
+    monkeypatch.setenv(ENV_VAR, "table")
+    assert select_backend(10**6) == "table"
+    with pytest.raises(ValueError):
+        select_backend(1, backend="nope")
+
+
+def test_calculate_matches_scalar_engine():
+    cn, uk = calculate(5_000_000.0, 12, True, True, 8, True, False)
+    expected_cn, expected_uk = calculate_outcomes(5_000_000.0, 12, True,
+                                                  True, 8, True, False)
+    assert cn["total"].tolist() == [expected_cn.total]
+    assert uk["total"].tolist() == [expected_uk.total]
+
+
+@pytest.mark.parametrize("scenario", [
+    (5_000_000.0, 12, True, True, 8, True, False),
+    (0.0, 0, False, False, 0, False, False),
+    # Off the lookup table's grid: served by its batch-engine fallback.
+    (MAX_TABLE_ASSETS * 10, MAX_YEARS + 1, True, True, 70, False, True),
+])
+@pytest.mark.parametrize("name", ("python",) + FAST_BACKENDS)
+def test_calculate_one_returns_scalar_records(name, scenario):
+    backend(name)
+    assert calculate_one(*scenario, backend=name) \
+        == calculate_outcomes(*scenario)
+
+
+def test_fractional_years_rejected():
+    with pytest.raises(ValueError):
+        calculate(np.ones(3), [1, 2.5, 3], False, False, 0, False, False)
@@ -0,0 +1,105 @@
+"""Concealment scanner: planted bursts, related parties, windows, chunking."""
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+import concealment
+from concealment import Signal, scan
+
+FILING = np.datetime64("2015-03-01")
+START = FILING - 4 * 365
+
+
+def normal_spending(days=4 * 365, payees=40, per_day=20, seed=0):
+    """About 400k/day of outflows spread over established payees."""
+    rng = np.random.default_rng(seed)
+    count = days * per_day
+    date = START + np.repeat(np.arange(days), per_day)
+    counterparty = np.array([f"payee {i}" for i in range(payees)],
+                            dtype=object)[rng.integers(0, payees, count)]
+    amount = -rng.uniform(10_000, 30_000, count).round(2)
+    return date, counterparty, amount
+
+
+def table(*parts):
+    date = np.concatenate([p[0] for p in parts]).astype("datetime64[D]")
+    counterparty = np.concatenate([np.asarray(p[1], dtype=object)
+                                   for p in parts])
+    amount = np.concatenate([np.asarray(p[2], dtype=np.float64)
+                             for p in parts])
+    order = np.random.default_rng(1).permutation(len(date))
+    return pa.table({"date": pa.array(date[order], pa.date32()),
+                     "counterparty": counterparty[order],
+                     "amount": amount[order]})
+
+
+def planted(payee="New Payee", last_day=FILING, days=5, transfers=100,
+            amount=20_000):
+    date = last_day - np.arange(transfers) % days
+    return date, [payee] * transfers, np.full(transfers, -float(amount))
+
+
+def flagged(report):
+    parties = report.counterparties
+    return set(parties.name[parties.flagged])
+
+
+def test_burst_to_new_payee_on_a_busy_account():
+    report = scan(table(normal_spending(), planted()).to_batches(),
+                  filing_date=FILING)
+    assert flagged(report) == {"New Payee"}
+    assert report.concealed_amount == pytest.approx(2_000_000)
+    i = list(report.counterparties.name).index("New Payee")
+    assert report.counterparties.signals[i] == (Signal.BURST
+                                                | Signal.NEW_COUNTERPARTY)
+
+
+def test_related_party():
+    # An established relative paid 5k a month, then 60k over the year.
+    months = START + np.arange(0, 4 * 365, 30)
+    regular = (months, ["Mother"] * len(months), np.full(len(months), -5e3))
+    extra = (FILING - np.arange(0, 360, 30), ["Mother"] * 12,
+             np.full(12, -5e3))
+    data = table(normal_spending(), regular, extra)
+    assert "Mother" not in flagged(scan(data.to_batches(), FILING))
+    report = scan(data.to_batches(), FILING, related=["Mother"])
+    assert flagged(report) == {"Mother"}
+    i = list(report.counterparties.name).index("Mother")
+    assert report.counterparties.signals[i] & Signal.RELATED_PARTY
+
+
+def test_filing_date_window():
+    old_burst = planted(last_day=FILING - 800)
+    data = table(normal_spending(), old_burst)
+    # Outside the two-year lookback before this filing date ...
+    assert flagged(scan(data.to_batches(), FILING)) == set()
+    # ... inside it for an earlier filing, and later rows are ignored.
+    report = scan(data.to_batches(), FILING - 790)
+    assert flagged(report) == {"New Payee"}
+    assert report.concealed_amount == pytest.approx(2_000_000)
+
+
+def test_chunk_size_invariance(monkeypatch):
+    data = table(normal_spending(), planted(),
+                 planted("Cousin", FILING - 100, transfers=10,
+                         amount=30_000))
+    reference = scan(data.to_batches(), FILING, related=["Cousin"])
+    monkeypatch.setattr(concealment, "_COMPACT_CELLS", 1_000)
+    for rows in (997, 5_000, 100_000):
+        report = scan(data.to_batches(max_chunksize=rows), FILING,
+                      related=["Cousin"])
+        assert report.rows == reference.rows
+        assert report.concealed_amount == pytest.approx(
+            reference.concealed_amount, rel=1e-12)
+        order = np.argsort(report.counterparties.name)
+        ref_order = np.argsort(reference.counterparties.name)
+        for field in ("name", "signals", "flagged", "first_day"):
+            np.testing.assert_array_equal(
+                getattr(report.counterparties, field)[order],
+                getattr(reference.counterparties, field)[ref_order])
+        np.testing.assert_allclose(
+            report.counterparties.lookback_outflow[order],
+            reference.counterparties.lookback_outflow[ref_order],
+            rtol=1e-12)
+    assert flagged(reference) == {"New Payee", "Cousin"}
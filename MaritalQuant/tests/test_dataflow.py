@@ -0,0 +1,88 @@
+"""Dataflow graph: what each input change recomputes, and provide()."""
+
+import pytest
+
+import dataflow
+from backends import calculate_one
+from dataflow import OUTCOME_GRAPH, Evaluation
+from engine import SCENARIO_FIELDS
+from fx import get_table
+
+KEY = (5_000_000.0, 12, True, True, 8, True, False)
+TOP = ("chart.comparison", "chart.breakdown", "insights")
+
+
+@pytest.fixture
+def evaluation():
+    evaluation = Evaluation(OUTCOME_GRAPH)
+    evaluation.set(**dict(zip(SCENARIO_FIELDS, KEY)),
+                   jurisdictions=("CN", "UK", "HK"),
+                   display=get_table().display("CNY"))
+    evaluate(evaluation)
+    return evaluation
+
+
+def evaluate(evaluation):
+    for name in TOP:
+        evaluation.get(name)
+    return set(evaluation.recomputed)
+
+
+def test_fault_recomputes_only_its_dependents(evaluation):
+    assert evaluation.set(husband_has_fault=True) == ["husband_has_fault"]
+    recomputed = evaluate(evaluation)
+    # The records are re-fetched and every node reading the CN record
+    # re-runs; the UK record comes back equal, so early cut-off stops
+    # there, and no other jurisdiction reads the fault input.
+    assert recomputed == {
+        "records", "cn", "uk", "cn.compensation", "cn.fault_adjustment",
+        "cn.total", "outcome.CN", "outcome.CN.total", "insight_flags",
+        *(f"flag.{code}" for code in ("CHILDREN_WELFARE",
+                                      "CN_COMPENSATION_GAP", "FAULT",
+                                      "LONG_MARRIAGE", "UK_NON_FINANCIAL")),
+        "insight.FAULT", "insights", "chart.comparison", "chart.breakdown",
+    }
+    assert evaluation.set(husband_has_fault=True) == []
+    assert evaluate(evaluation) == set()
+
+
+CHARTS = {"chart.comparison", "chart.breakdown"}
+
+
+@pytest.mark.parametrize("inputs, rebuilt", [
+    ({"jurisdictions": ("CN", "UK")}, CHARTS),
+    # The gap insight quotes amounts, so it follows the display.
+    ({"display": get_table().display("GBP")},
+     CHARTS | {"insight.CN_COMPENSATION_GAP", "insights"}),
+])
+def test_selection_and_display_rebuild_only_their_nodes(evaluation, inputs,
+                                                        rebuilt):
+    evaluation.set(**inputs)
+    assert evaluate(evaluation) == rebuilt
+
+
+def test_provide_suppresses_recomputation(evaluation, monkeypatch):
+    key = KEY[:-1] + (True,)
+    records = calculate_one(*key)
+
+    def fail(key):
+        raise AssertionError("records should have been provided")
+
+    monkeypatch.setattr(dataflow.RESULT_STORE, "results", fail)
+    evaluation.set(husband_has_fault=True)
+    evaluation.provide("records", records)
+    recomputed = evaluate(evaluation)
+    assert "records" not in recomputed
+    assert "outcome.CN" in recomputed
+    assert evaluation.get("cn") == records[0]
+
+    # Providing the value the graph already holds changes nothing
+    # downstream, even though an input it depends on moved.
+    evaluation.set(husband_has_fault=False)
+    evaluation.provide("records", records)
+    assert evaluate(evaluation) == set()
+
+
+def test_provide_rejects_unknown_nodes(evaluation):
+    with pytest.raises(KeyError, match="not a graph node"):
+        evaluation.provide("husband_has_fault", True)
@@ -0,0 +1,28 @@
+"""Forum selection over the registered jurisdictions."""
+
+import numpy as np
+
+from forum import FORUMS, evaluate_forums, random_portfolio
+from jurisdictions import JURISDICTIONS, calculate_outcomes
+
+
+def test_every_registered_forum_is_ranked():
+    portfolio = random_portfolio(2_000, seed=3)
+    values = evaluate_forums(*portfolio)
+    assert values.forums == tuple(code for code in JURISDICTIONS
+                                  if code in FORUMS)
+    assert "HK" in values.forums
+    outcomes = calculate_outcomes(*portfolio[:7])
+    for j, code in enumerate(values.forums):
+        np.testing.assert_array_equal(values.award[:, j],
+                                      outcomes[code]["total"])
+    hk = values.forums.index("HK")
+    assert (values.best == hk).any()
+    assert not values.available[~portfolio[10], hk].any()
+
+
+def test_hk_unavailable_without_connection():
+    portfolio = random_portfolio(500, seed=5)
+    values = evaluate_forums(*portfolio[:10])
+    for code in ("HK", "SCT"):
+        assert not values.available[:, values.forums.index(code)].any()
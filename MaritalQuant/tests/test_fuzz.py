@@ -0,0 +1,28 @@
+"""A bounded run of the differential fuzzer."""
+
+import fuzz
+from backends import BACKENDS
+
+
+def test_fast_paths_agree_with_scalar_engine():
+    failures = fuzz.run(scenarios=40_000, seed=7, chunk_size=20_000,
+                        max_seconds=30.0)
+    assert failures == {}
+
+
+def test_mismatch_is_found_and_shrunk(monkeypatch):
+    def broken(inputs):
+        cn, uk = BACKENDS["numpy"](inputs)
+        # Off by a yuan once the pool passes the needs threshold.
+        cn["total"] = cn["total"] + (inputs["total_assets"] > 10_000_000)
+        return cn, uk
+
+    monkeypatch.setitem(BACKENDS, "broken", broken)
+    failures = fuzz.run(scenarios=5_000, seed=7, chunk_size=5_000,
+                        paths=("broken",))
+    assert list(failures) == ["broken"]
+    scenario = failures["broken"]
+    assert scenario[0] > 10_000_000
+    # Shrinking leaves nothing but the triggering pool.
+    assert scenario[1:] == (0, False, False, 0, False, False)
+    assert fuzz.disagrees("broken", scenario) == ["cn.total"]
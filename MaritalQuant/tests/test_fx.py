@@ -0,0 +1,77 @@
+"""FX table lookups, conversion, caching and the engines' GBP rule."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch import calculate_uk_batch
+from engine import UK_HOMEMAKER_RATE_GBP, calculate_uk, uk_homemaker_rate
+from fx import FxTable, get_table
+
+
+RATES = pd.DataFrame({
+    "date": ["2020-01-01", "2020-01-01", "2021-01-01", "2022-01-01"],
+    "currency": ["GBP", "USD", "GBP", "hkd"],
+    "rate": [9.0, 7.0, 8.5, 0.9],
+})
+
+
+@pytest.fixture
+def table():
+    return FxTable.from_frame(RATES)
+
+
+def test_rates_forward_fill_across_dates(table):
+    rates = table.lookup(["GBP", "GBP", "USD", "USD", "CNY"],
+                         ["2020-06-30", "2023-05-01", "2021-03-01",
+                          "2022-01-01", "2020-01-01"])
+    np.testing.assert_array_equal(rates, [9.0, 8.5, 7.0, 7.0, 1.0])
+    assert table.lookup("gbp") == 8.5   # latest, any case
+
+
+def test_unknown_currency_raises_key_error(table):
+    with pytest.raises(KeyError, match="XYZ"):
+        table.lookup(["GBP", "XYZ"])
+
+
+def test_date_before_first_rate_raises(table):
+    with pytest.raises(ValueError, match="before the first"):
+        table.lookup("GBP", "2019-12-31")
+
+
+def test_currency_not_yet_quoted_raises(table):
+    with pytest.raises(ValueError, match="quoted"):
+        table.lookup("HKD", "2021-06-01")
+
+
+def test_convert_round_trips(table):
+    amounts = np.array([100_000.0, 2_500.5, 0.0, 1e9])
+    currencies = ["GBP", "USD", "HKD", "GBP"]
+    there = table.convert(amounts, currencies, "USD", "2022-06-01")
+    back = table.convert(there, "USD", currencies, "2022-06-01")
+    np.testing.assert_allclose(back, amounts, rtol=1e-12)
+    np.testing.assert_array_equal(table.to_base(amounts, "CNY"), amounts)
+
+
+def test_get_table_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "rates.csv"
+    RATES.to_csv(path, index=False)
+    first = get_table(path)
+    assert get_table(path) is first
+    RATES.assign(rate=RATES["rate"] * 2).to_csv(path, index=False)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = get_table(path)
+    assert second is not first
+    assert second.lookup("GBP") == 17.0
+
+
+def test_uk_homemaker_rate_is_sterling_converted_to_cny():
+    rate = UK_HOMEMAKER_RATE_GBP * float(get_table().lookup("GBP"))
+    assert uk_homemaker_rate() == rate
+    assert calculate_uk(50_000_000, 12, False, True, 8).compensation \
+        == 8 * rate
+    assert calculate_uk_batch(50_000_000, 12, False, True, 8)[
+        "compensation"][0] == 8 * rate
@@ -0,0 +1,99 @@
+"""Scenario history: the shared connection and versioned input hashes."""
+
+import sqlite3
+import threading
+
+import history
+from engine import calculate_outcomes
+from history import ScenarioHistory
+from jurisdictions import JURISDICTIONS, register
+
+
+def test_threads_share_one_connection(tmp_path, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+
+    def counting_connect(*args, **kwargs):
+        opened.append(args[0])
+        return connect(*args, **kwargs)
+
+    monkeypatch.setattr(history.sqlite3, "connect", counting_connect)
+    store = ScenarioHistory(tmp_path / "history.sqlite3")
+    key = (5_000_000.0, 10, True, True, 8, False, False)
+    cn, uk = calculate_outcomes(*key)
+    results = {"cn": cn, "uk": uk, "outcomes": {}}
+
+    def rerun(i):
+        # Each Streamlit rerun is a fresh thread.
+        store.record(f"client {i % 3}", key, results, ("CN", "UK"))
+        store.list(limit=5)
+
+    for batch in range(5):
+        threads = [threading.Thread(target=rerun, args=(batch * 8 + i,))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(opened) == 1
+    page = store.list(limit=100)
+    assert len(page) == 40
+    assert len({entry.id for entry in page}) == 40
+    assert set(store.clients()) == {"client 0", "client 1", "client 2"}
+    store.close()
+
+
+def test_path_change_reopens(tmp_path, monkeypatch):
+    store = ScenarioHistory()
+    key = (1_000_000.0, 5, False, False, 0, False, False)
+    cn, uk = calculate_outcomes(*key)
+    results = {"cn": cn, "uk": uk, "outcomes": {}}
+    monkeypatch.setenv(history.ENV_VAR, str(tmp_path / "a.sqlite3"))
+    store.record("A", key, results)
+    monkeypatch.setenv(history.ENV_VAR, str(tmp_path / "b.sqlite3"))
+    assert store.list() == []
+    store.record("B", key, results)
+    assert store.clients() == ["B"]
+    store.close()
+
+
+def test_rule_changes_change_the_hash(tmp_path):
+    store = ScenarioHistory(tmp_path / "history.sqlite3")
+    key = (2_000_000.0, 12, True, True, 5, False, False)
+    cn, uk = calculate_outcomes(*key)
+    store.record("A", key, {"cn": cn, "uk": uk, "outcomes": {}})
+    (entry,) = store.list()
+    assert entry.input_hash == history.input_hash(key)
+
+    hk = JURISDICTIONS["HK"]
+    register(hk._replace(rates={**hk.rates, "sharing": 0.45}))
+    try:
+        # The old entry no longer matches, so a reopen recomputes.
+        assert entry.input_hash != history.input_hash(key)
+    finally:
+        register(hk)
+    assert entry.input_hash == history.input_hash(key)
+    store.close()
+
+
+def test_conflicting_payload_replaces_the_old_one(tmp_path):
+    store = ScenarioHistory(tmp_path / "history.sqlite3")
+    key = (2_000_000.0, 12, True, True, 5, False, False)
+    cn, uk = calculate_outcomes(*key)
+    store.record("A", key, {"cn": cn, "uk": uk, "outcomes": {"X": 1}})
+    store.record("A", key, {"cn": cn, "uk": uk, "outcomes": {"X": 2}})
+    assert store.results(history.input_hash(key))["outcomes"] == {"X": 2}
+    store.close()
+
+
+def test_entries_are_typed(tmp_path):
+    store = ScenarioHistory(tmp_path / "history.sqlite3")
+    key = (3_000_000.0, 4, True, False, 0, True, False)
+    cn, uk = calculate_outcomes(*key)
+    store.record("A", key, {"cn": cn, "uk": uk, "outcomes": {}}, ("CN", "HK"))
+    store.record("B", key, {"cn": cn, "uk": uk, "outcomes": {}})
+    b, a = store.list()
+    assert history.entry_key(a) == key
+    assert a.has_children is True and a.husband_has_fault is False
+    assert a.jurisdictions == ("CN", "HK") and b.jurisdictions == ()
+    store.close()
@@ -0,0 +1,48 @@
+"""Jurisdiction registry: rates, summaries and record summaries."""
+
+import numpy as np
+
+from backends import random_inputs
+from engine import calculate_outcomes as engine_outcomes
+from jurisdictions import (
+    JURISDICTIONS, calculate_outcomes, record_summary, register, summaries,
+    summary,
+)
+
+
+def scenarios(count=200, seed=11):
+    columns = random_inputs(count, seed)
+    return [tuple(column[i].item() for column in columns)
+            for i in range(count)]
+
+
+def test_record_summary_matches_calculator():
+    for scenario in scenarios():
+        cn, uk = engine_outcomes(*scenario)
+        assert record_summary("CN", cn) == summary("CN", *scenario)
+        assert record_summary("UK", uk) == summary("UK", *scenario[:5])
+
+
+def test_summaries_match_summary():
+    fields = {code: jurisdiction.inputs
+              for code, jurisdiction in JURISDICTIONS.items()}
+    names = JURISDICTIONS["CN"].inputs
+    for scenario in scenarios(50):
+        values = dict(zip(names, scenario))
+        expected = {code: summary(code, *(values[name] for name in inputs))
+                    for code, inputs in fields.items()}
+        assert summaries(*scenario) == expected
+
+
+def test_rates_come_from_the_registry():
+    columns = random_inputs(1_000, 2)
+    hk = JURISDICTIONS["HK"]
+    before = calculate_outcomes(*columns, codes=("HK",))["HK"]["total"]
+    try:
+        register(hk._replace(rates={**hk.rates, "sharing": 0.40}))
+        after = calculate_outcomes(*columns, codes=("HK",))["HK"]["total"]
+    finally:
+        register(hk)
+    assert (after <= before).all() and (after < before).any()
+    np.testing.assert_array_equal(
+        calculate_outcomes(*columns, codes=("HK",))["HK"]["total"], before)
@@ -0,0 +1,53 @@
+"""Ledger loading and pool classification."""
+
+import io
+
+import pandas as pd
+import pytest
+
+from ledger import parse_bools, pools, read_ledger
+
+
+LEDGER_CSV = """\
+household,description,value,acquired,source,owner,designated,is_home
+h1,flat,1000000,2015-01-01,earned,joint,false,true
+h1,savings,300000,2016-01-01,earned,wife,0,
+h1,gift from parents,500000,2017-01-01,gift,husband,,no
+h1,inheritance,200000,2018-01-01,inheritance,wife,yes,FALSE
+"""
+
+
+def read(text):
+    return read_ledger(io.StringIO(text))
+
+
+def test_blank_flags_are_false():
+    ledger = read(LEDGER_CSV)
+    assert ledger.designated.tolist() == [False, False, False, True]
+    assert ledger.is_home.tolist() == [True, False, False, False]
+    pool = pools(ledger, "2012-05-01", 12)
+    # The undesignated gift (blank cell) stays joint; only the
+    # designated inheritance is separate.
+    assert pool.cn_joint.tolist() == [1_800_000.0]
+    assert pool.cn_separate.tolist() == [200_000.0]
+
+
+def test_unknown_flag_is_rejected():
+    with pytest.raises(ValueError, match="designated"):
+        read(LEDGER_CSV.replace(",yes,FALSE", ",maybe,FALSE"))
+
+
+def test_parse_bools():
+    series = pd.Series(["True", " no ", "1", None, "0.0", "Y", True, 0])
+    values, invalid = parse_bools(series)
+    assert values.tolist() == [True, False, True, False, False, False,
+                               True, False]
+    assert invalid.tolist() == [False] * 5 + [True, False, False]
+
+
+def test_missing_acquired_date_is_rejected():
+    text = LEDGER_CSV.replace("2016-01-01", "").replace("2018-01-01",
+                                                        "someday")
+    with pytest.raises(ValueError, match=r"acquired .* 2 row\(s\): "
+                                         r"1 \(nan\), 3 \('someday'\)"):
+        read(text)
@@ -0,0 +1,36 @@
+"""Population summaries: merging chunks, empty populations, the CLI."""
+
+import json
+
+import pytest
+
+from population import (
+    iter_population, main, merge_summaries, summarise_chunk,
+    summarise_population,
+)
+
+
+def test_chunks_merge_to_the_whole():
+    merged = summarise_population(2_500, seed=3, chunk_size=1_000)
+    chunks = [summarise_chunk(chunk)
+              for chunk in iter_population(2_500, seed=3, chunk_size=1_000)]
+    assert merge_summaries(chunks) == merged
+    assert merged["households"] == 2_500
+    assert sum(merged["gap_histogram"]) == 2_500
+    assert merged["gap_mean"] == pytest.approx(merged["gap_sum"] / 2_500)
+
+
+def test_empty_population():
+    empty = merge_summaries([])
+    assert empty["households"] == 0
+    assert empty["gap_mean"] == 0.0 and empty["uk_higher_share"] == 0.0
+    assert set(empty["gap_histogram"]) == {0}
+    assert summarise_population(0) == empty
+
+
+def test_cli_writes_utf8_json(tmp_path, capsys):
+    out = tmp_path / "summary.json"
+    assert main(["--households", "500", "--out", str(out)]) == 0
+    assert "500 households" in capsys.readouterr().out
+    with open(out, encoding="utf-8") as f:
+        assert json.load(f)["households"] == 500
@@ -0,0 +1,76 @@
+"""Client CSV parsing and per-client failures in bulk reports."""
+
+import io
+import json
+
+import pytest
+
+from engine import calculate_outcomes
+from fx import get_table
+from reports import MANIFEST, generate_reports, plan_jobs, read_clients
+
+
+CLIENTS_CSV = """\
+client,total_assets,marriage_years,has_children,wife_is_homemaker,\
+homemaker_years,home_in_husband_name,husband_has_fault
+a,5000000,10,no,False,0,,0
+b,5000000,12,yes,TRUE,8,1,true
+c,5000000,,no,no,0,no,no
+d,5000000,7.5,maybe,no,0,no,no
+"""
+
+
+def read(text=CLIENTS_CSV):
+    return read_clients(io.StringIO(text))
+
+
+def test_flags_parse_like_the_ledger():
+    df = read()
+    assert df["has_children"].tolist() == [False, True, False, False]
+    assert df["wife_is_homemaker"].tolist() == [False, True, False, False]
+    assert df["home_in_husband_name"].tolist() == [False, True, False, False]
+    assert df["husband_has_fault"].tolist() == [False, True, False, False]
+    assert df["error"].tolist()[:2] == [None, None]
+    assert "marriage_years=''" in df["error"].iat[2]
+    assert "marriage_years='7.5'" in df["error"].iat[3]
+    assert "has_children='maybe'" in df["error"].iat[3]
+
+
+def test_jobs_use_the_parsed_columns(tmp_path):
+    batches, skipped, rejected = plan_jobs(
+        read(), tmp_path, ("CN", "UK"), get_table().display("CNY"))
+    jobs = [job for batch in batches for job in batch]
+    assert [job.client for job in jobs] == ["a", "b"]
+    assert [result.client for result in rejected] == ["c", "d"]
+    assert skipped == 0
+    cn, uk = calculate_outcomes(5_000_000, 10, False, False, 0, False, False)
+    assert jobs[0].outcomes["CN"]["total"] == cn["total"]
+    assert jobs[0].outcomes["UK"]["total"] == uk["total"]
+    assert jobs[0].scenario["has_children"] is False
+
+
+def test_bad_rows_do_not_stop_the_run(tmp_path):
+    pytest.importorskip("plotly")
+    clients = tmp_path / "clients.csv"
+    clients.write_text(CLIENTS_CSV)
+    counts = generate_reports(clients, tmp_path / "out")
+    assert counts == {"rendered": 2, "skipped": 0, "failed": 2}
+    with open(tmp_path / "out" / MANIFEST, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    errors = {entry["client"]: entry["error"] for entry in entries}
+    assert errors["a"] is None and errors["b"] is None
+    assert errors["c"].startswith("invalid ")
+    assert (tmp_path / "out" / "a.html").exists()
+    assert not (tmp_path / "out" / "c.html").exists()
+
+
+def test_insight_amounts_follow_the_display_currency(tmp_path):
+    pytest.importorskip("plotly")
+    clients = tmp_path / "clients.csv"
+    clients.write_text(CLIENTS_CSV)
+    generate_reports(clients, tmp_path / "out", currency="GBP")
+    text = (tmp_path / "out" / "b.html").read_text(encoding="utf-8")
+    analysis = text[text.index("Legal Analysis"):]
+    assert "compensation gap" in analysis
+    assert "<strong>£ " in analysis
+    assert "<strong>¥" not in analysis
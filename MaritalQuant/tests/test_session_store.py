@@ -0,0 +1,44 @@
+"""Result store: idle eviction keeps shared results, sizing is lazy."""
+
+import session_store
+from session_store import ResultStore
+
+
+def key(total):
+    return (float(total), 10, True, True, 8, False, False)
+
+
+def test_idle_sweep_drops_only_the_idle_sessions_results():
+    store = ResultStore(idle_seconds=10, sweep_interval=1e9)
+    for total in (1e6, 2e6, 3e6, 4e6):
+        store.results(key(total))
+    store.touch("idle", key(1e6), now=0)
+    store.touch("shares", key(2e6), now=0)
+    store.touch("live", key(2e6), now=100)
+    store.touch("also live", key(3e6), now=100)
+    assert store.evict_idle(now=105) == 1
+    # 1e6 was only the idle session's; 2e6 is still shown by "live";
+    # 4e6 belongs to no session and stays until the LRU pushes it out.
+    assert set(store._results) == {key(2e6), key(3e6), key(4e6)}
+    assert set(store.memory_report()["sessions"]) == {"live", "also live"}
+
+
+def test_touch_defers_sizing_to_the_report(monkeypatch):
+    calls = []
+    real = session_store.deep_sizeof
+
+    def counting(obj, _seen=None):
+        if _seen is None:
+            calls.append(obj)
+        return real(obj, _seen)
+
+    monkeypatch.setattr(session_store, "deep_sizeof", counting)
+    store = ResultStore(sweep_interval=1e9)
+    state = {"client": "A", "total_assets": 5e6}
+    for _ in range(50):
+        store.touch("s", key(1e6), state)
+    assert calls == []
+    first = store.memory_report()
+    assert first["sessions"]["s"] > 0
+    store.memory_report()
+    assert calls.count(state) == 1